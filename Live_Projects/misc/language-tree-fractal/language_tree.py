@@ -1,6 +1,17 @@
-import turtle
-import random
+import argparse
+import functools
 import math
+import os
+import random
+import sys
+import time
+from xml.sax.saxutils import escape
+
+from tree_data import FORMATS as DATA_FORMATS, from_nested, open_hierarchy
+from tree_layout import (FAN_MAX_LEAVES, LAYOUT_KINDS, LEVELS, TRUNK_BASE, compute_layout, default_cache_dir,
+                         level, load_layout)
+
+# turtle (Tk) is imported only by the turtle backend, so svg/png renders run headless
 
 # Hierarchical language data with sub-families (branches on branches!)
 LANGUAGES = {
@@ -193,231 +204,245 @@ FAMILY_COLORS = {
     "Uralic": "#96CEB4"
 }
 
-def setup_screen():
+BACKGROUND = "#0a0a15"
+CANVAS_SIZE = 2400  # scrollable turtle canvas and SVG/PNG page; grows with big layouts
+OUTPUT_FORMATS = ["turtle", "view", "svg", "png"]
+LANGUAGE_DEPTH = 3  # root → family → subfamily → language
+STATS_CHILDREN = 30  # --stats lists this many children of the root
+
+@functools.lru_cache(maxsize=1)
+def builtin_tree():
+    """LANGUAGES as a tree_data node table, built once per run"""
+    return from_nested(LANGUAGES)
+
+def count_total_languages(tree=None):
+    """Count total number of languages (nodes three levels down, counted when the table is built)"""
+    return (tree or builtin_tree()).count_at_depth(LANGUAGE_DEPTH)
+
+def canvas_size(layout):
+    """Square canvas that holds the layout plus the title and legend"""
+    return max(CANVAS_SIZE, 2 * math.ceil(layout.extent() + 250))
+
+def title_y(layout):
+    """Title baseline, clear of the top of the tree; the legend mirrors it below"""
+    return max(650, layout.extent() + 120)
+
+def tree_geometry(rng=None, layout=None, subtitle=None):
+    """Turn the tree layout into lines, dots and labels.
+
+    Returns a list of primitives in drawing order, in turtle coordinates
+    (origin at the centre, y up):
+      ("line", x1, y1, x2, y2, width, color)
+      ("dot", x, y, diameter, color)
+      ("text", x, y, text, (family, size, style), color)
+    Backends only replay the list, so every output format draws the same tree.
+    `layout` is a tree_layout.TreeLayout (computed here when omitted).
+    `subtitle` replaces the built-in tree's language count under the title.
+    Pass a random.Random as `rng` to add the background stars.
+    """
+    if layout is None:
+        layout = compute_layout(LANGUAGES, FAMILY_COLORS)
+    names, palette, parent, depth = layout.names, layout.palette, layout.parent, layout.depth
+    x, y, label_x, label_y, color = layout.x, layout.y, layout.label_x, layout.label_y, layout.color
+
+    show = layout.show
+
+    # Central trunk (fan layout), then every branch in preorder: its line, its leaf dot, its label.
+    # Labels the layout could not fit without overlaps are left out.
+    items = []
+    if layout.kind == "fan":
+        items.append(("line", *TRUNK_BASE, x[0], y[0], LEVELS[0].width, palette[color[0]]))
+    for i in range(1, len(layout)):
+        spec, p, c = level(depth[i]), parent[i], palette[color[i]]
+        items.append(("line", x[p], y[p], x[i], y[i], spec.width, c))
+        if layout.is_leaf(i):
+            items.append(("dot", x[i], y[i], 6, c))
+        if show[i]:
+            items.append(("text", label_x[i], label_y[i], names[i], spec.font, c))
+
+    # Title and legend
+    if subtitle is None:
+        subtitle = f"{count_total_languages()} Languages • 4 Levels of Branching"
+    top = title_y(layout)
+    items.append(("text", 0, top, "Hierarchical Global Language Tree", ("Arial", 24, "bold"), "#FFFFFF"))
+    items.append(("text", 0, top - 30, subtitle, ("Arial", 12, "normal"), "#FFFFFF"))
+    items.append(("text", 0, -top - 200, "Root → Family → Subfamily → Language → Common Words", ("Arial", 10, "italic"), "#FFFFFF"))
+
+    if rng is not None:
+        items.extend(star_geometry(rng, canvas_size(layout) / CANVAS_SIZE))
+    return items
+
+def star_geometry(rng, scale=1):
+    """Subtle background stars, spread over a canvas `scale` times the default size"""
+    stars = []
+    for _ in range(60):  # More stars for larger canvas
+        x = rng.randint(-1100, 1100) * scale  # Wider range for scrollable area
+        y = rng.randint(-800, 600) * scale
+        size = rng.randint(2, 4)
+        stars.append(("dot", x, y, size, "#FFFFFF"))
+    return stars
+
+# ---------------------------------------------------------------------------
+# Turtle backend (interactive window, needs Tk and a display)
+
+def setup_screen(size=CANVAS_SIZE):
     """Initialize the turtle screen with dark background and scrolling"""
+    import turtle
     screen = turtle.Screen()
     screen.setup(width=1920, height=1080)  # Larger window
-    screen.screensize(2400, 2400)  # Enable scrolling with larger canvas
-    screen.bgcolor("#0a0a15")
+    screen.screensize(size, size)  # Enable scrolling with larger canvas
+    screen.bgcolor(BACKGROUND)
     screen.title("Hierarchical Global Language Tree - 100+ Languages (Scroll to explore)")
     screen.tracer(0)
     return screen
 
 def create_turtle():
     """Create and configure the drawing turtle"""
+    import turtle
     t = turtle.Turtle()
     t.speed(0)
     t.hideturtle()
     return t
 
-def count_total_languages():
-    """Count total number of languages"""
-    total = 0
-    for family in LANGUAGES.values():
-        for subfamily in family.values():
-            if isinstance(subfamily, dict) and any(isinstance(v, list) for v in subfamily.values()):
-                total += len(subfamily)
-    return total
+def draw_items(t, items):
+    """Replay geometry primitives with a turtle"""
+    for item in items:
+        kind = item[0]
+        t.penup()
+        if kind == "line":
+            _, x1, y1, x2, y2, width, color = item
+            t.goto(x1, y1)
+            t.pensize(width)
+            t.pencolor(color)
+            t.pendown()
+            t.goto(x2, y2)
+        elif kind == "dot":
+            _, x, y, size, color = item
+            t.goto(x, y)
+            t.dot(size, color)
+        else:
+            _, x, y, text, font, color = item
+            t.goto(x, y)
+            t.pencolor(color)
+            t.write(text, align="center", font=font)
 
-def draw_language_tree(screen):
+def draw_language_tree(screen, layout=None, subtitle=None):
     """Draw the complete hierarchical language tree"""
+    import turtle
     t = create_turtle()
-    
-    # Draw central trunk
-    t.penup()
-    t.goto(0, -300)  # Move trunk up significantly
-    t.setheading(90)
-    t.pendown()
-    t.pensize(15)
-    t.pencolor("#5C4033")
-    t.forward(120)  # Taller trunk
-    
-    trunk_top = t.position()
-    
-    # Get language families
-    families = list(LANGUAGES.keys())
-    num_families = len(families)
-    
-    # Draw each language family in a circular pattern
-    for i, family in enumerate(families):
-        angle = 360 / num_families * i - 90
-        
-        t.penup()
-        t.goto(trunk_top)
-        t.setheading(angle)
-        t.pendown()
-        
-        color = FAMILY_COLORS[family]
-        
-        # Draw family branch
-        t.pensize(9)
-        t.pencolor(color)
-        branch_length = 120  # Longer branches
-        t.forward(branch_length)
-        
-        # Label family
-        family_pos = t.position()
-        family_heading = t.heading()
-        t.penup()
-        
-        text_angle = angle
-        if 90 < angle < 270:
-            text_angle = angle + 180
-        
-        t.setheading(text_angle)
-        t.forward(20)
-        t.write(family, align="center", font=("Arial", 11, "bold"))
-        t.goto(family_pos)
-        t.setheading(family_heading)
-        t.pendown()
-        
-        # Draw subfamily branches
-        subfamilies = list(LANGUAGES[family].keys())
-        num_subfamilies = len(subfamilies)
-        
-        for j, subfamily in enumerate(subfamilies):
-            spread_angle = 80  # Wider spread
-            subfamily_angle = spread_angle / (num_subfamilies + 1) * (j + 1) - spread_angle / 2
-            
-            t.penup()
-            t.goto(family_pos)
-            t.setheading(family_heading + subfamily_angle)
-            t.pendown()
-            
-            t.pensize(6)
-            subfamily_length = 95  # Longer subfamily branches
-            t.forward(subfamily_length)
-            
-            # Label subfamily
-            subfamily_pos = t.position()
-            subfamily_heading = t.heading()
-            t.penup()
-            
-            text_angle = family_heading + subfamily_angle
-            if 90 < text_angle % 360 < 270:
-                text_angle += 180
-            
-            t.setheading(text_angle)
-            t.forward(12)
-            t.write(subfamily, align="center", font=("Arial", 9, "bold"))
-            t.goto(subfamily_pos)
-            t.setheading(subfamily_heading)
-            t.pendown()
-            
-            # Draw individual language branches
-            languages = list(LANGUAGES[family][subfamily].keys())
-            num_langs = len(languages)
-            
-            for k, lang in enumerate(languages):
-                lang_spread = 70  # Wider language spread
-                lang_angle = lang_spread / (num_langs + 1) * (k + 1) - lang_spread / 2
-                
-                t.penup()
-                t.goto(subfamily_pos)
-                t.setheading(subfamily_heading + lang_angle)
-                t.pendown()
-                
-                t.pensize(3.5)
-                lang_length = 70  # Longer language branches
-                t.forward(lang_length)
-                
-                # Label language
-                lang_pos = t.position()
-                lang_heading = t.heading()
-                t.penup()
-                
-                text_angle = subfamily_heading + lang_angle
-                if 90 < text_angle % 360 < 270:
-                    text_angle += 180
-                
-                t.setheading(text_angle)
-                t.forward(10)  # More space for text
-                t.write(lang, align="center", font=("Arial", 8, "normal"))  # Larger font
-                t.goto(lang_pos)
-                t.setheading(lang_heading)
-                t.pendown()
-                
-                # Draw word branches
-                words = LANGUAGES[family][subfamily][lang]
-                num_words = len(words)
-                
-                for m, word in enumerate(words):
-                    word_spread = 60  # Even wider word spread for more space
-                    word_angle = word_spread / (num_words + 1) * (m + 1) - word_spread / 2
-                    
-                    t.penup()
-                    t.goto(lang_pos)
-                    t.setheading(lang_heading + word_angle)
-                    t.pendown()
-                    
-                    t.pensize(1.5)
-                    word_length = 45  # Even longer word branches for more space
-                    t.forward(word_length)
-                    
-                    # Draw dot and label word
-                    t.dot(6, color)
-                    word_pos = t.position()
-                    t.penup()
-                    
-                    text_angle = lang_heading + word_angle
-                    if 90 < text_angle % 360 < 270:
-                        text_angle += 180
-                    
-                    t.setheading(text_angle)
-                    t.forward(12)  # More space between dot and text
-                    t.write(word, align="center", font=("Arial", 7, "normal"))  # Larger font for words
-                    t.goto(word_pos)
-                    t.pendown()
-        
-        # Update display periodically
-        if i % 2 == 0:
-            turtle.update()
-    
-    # Add title and info
-    t.penup()
-    t.goto(0, 650)  # Much higher position
-    t.pencolor("#FFFFFF")
-    t.write("Hierarchical Global Language Tree", align="center", 
-            font=("Arial", 24, "bold"))
-    
-    t.goto(0, 620)
-    total_langs = count_total_languages()
-    t.write(f"{total_langs} Languages • 4 Levels of Branching", align="center", 
-            font=("Arial", 12, "normal"))
-    
-    t.goto(0, 595)
-    t.write("⬆️⬇️ Use arrow keys or mouse to scroll and explore", align="center", 
-            font=("Arial", 10, "italic"))
-    
-    # Add legend at bottom
-    t.goto(0, -850)  # Much lower position for scrollable area
-    t.write("Root → Family → Subfamily → Language → Common Words", align="center", 
-            font=("Arial", 10, "italic"))
-    
+    if layout is None:
+        layout = compute_layout(LANGUAGES, FAMILY_COLORS)
+    draw_items(t, tree_geometry(layout=layout, subtitle=subtitle))
+    draw_items(t, [("text", 0, title_y(layout) - 55, "⬆️⬇️ Use arrow keys or mouse to scroll and explore", ("Arial", 10, "italic"), "#FFFFFF")])
     turtle.update()
 
-def add_decorative_elements(screen):
+def add_decorative_elements(screen, scale=1):
     """Add subtle glow effects"""
-    glow = turtle.Turtle()
-    glow.hideturtle()
-    glow.speed(0)
-    glow.penup()
-    
-    for _ in range(60):  # More stars for larger canvas
-        x = random.randint(-1100, 1100)  # Wider range for scrollable area
-        y = random.randint(-800, 600)
-        size = random.randint(2, 4)
-        glow.goto(x, y)
-        glow.dot(size, "#FFFFFF")
-    
+    import turtle
+    draw_items(create_turtle(), star_geometry(random, scale))
     turtle.update()
 
-def main():
-    """Main function to run the fractal drawer"""
-    screen = setup_screen()
-    
-    total_langs = count_total_languages()
-    
+# ---------------------------------------------------------------------------
+# File backends (headless, no Tk)
+
+def svg_document(items, size=CANVAS_SIZE):
+    """Geometry primitives -> SVG text, centred on the page with y pointing up"""
+    half = size / 2
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="{-half:g} {-half:g} {size} {size}">',
+        f'<rect x="{-half:g}" y="{-half:g}" width="{size}" height="{size}" fill="{BACKGROUND}"/>',
+        '<g stroke-linecap="round" text-anchor="middle">',
+    ]
+    for item in items:
+        kind = item[0]
+        if kind == "line":
+            _, x1, y1, x2, y2, width, color = item
+            out.append(f'<line x1="{x1:.2f}" y1="{-y1:.2f}" x2="{x2:.2f}" y2="{-y2:.2f}" '
+                       f'stroke="{color}" stroke-width="{width:g}"/>')
+        elif kind == "dot":
+            _, x, y, size_, color = item
+            out.append(f'<circle cx="{x:.2f}" cy="{-y:.2f}" r="{size_ / 2:g}" fill="{color}"/>')
+        else:
+            _, x, y, text, (family, points, style), color = item
+            weight = ' font-weight="bold"' if style == "bold" else ""
+            slant = ' font-style="italic"' if style == "italic" else ""
+            out.append(f'<text x="{x:.2f}" y="{-y:.2f}" font-family="{family}" font-size="{points}pt"'
+                       f'{weight}{slant} fill="{color}">{escape(text)}</text>')
+    out.append("</g>")
+    out.append("</svg>")
+    return "\n".join(out) + "\n"
+
+def write_svg(items, path, size=CANVAS_SIZE):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(svg_document(items, size))
+
+def write_png(items, path, size=CANVAS_SIZE):
+    """Rasterize the SVG document; needs the optional cairosvg package"""
+    try:
+        import cairosvg
+    except ImportError:
+        sys.exit("PNG output needs cairosvg (pip install cairosvg); use --format svg for a dependency-free render.")
+    cairosvg.svg2png(bytestring=svg_document(items, size).encode("utf-8"), write_to=path)
+
+WRITERS = {
+    "svg": write_svg,
+    "png": write_png,
+}
+
+def render_file(fmt, path, layout, seed=None, subtitle=None):
+    """Render the tree headlessly to `path`; returns the number of primitives drawn"""
+    items = tree_geometry(random.Random(seed), layout, subtitle)
+    WRITERS[fmt](items, path, canvas_size(layout))
+    return len(items)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hierarchical global language tree fractal")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="turtle draws the whole tree in a window; view opens the zoomable viewer, "
+                             "which draws only what is on screen; svg and png are written headlessly "
+                             "(default: from --output's extension, else turtle)")
+    parser.add_argument("-o", "--output", help="Output file for svg/png (default: language_tree.<format>)")
+    parser.add_argument("--seed", type=int, help="Random seed for the background stars")
+    parser.add_argument("--data", help="Hierarchy file to draw instead of the built-in languages "
+                                       "(.json nested like LANGUAGES, .csv/.tsv parent,child edges, .nwk Newick)")
+    parser.add_argument("--data-format", choices=sorted(set(DATA_FORMATS.values())),
+                        help="Format of --data when its extension does not say")
+    parser.add_argument("--root", help='Draw only this subtree, as a path of names: "Indo-European/Germanic"')
+    parser.add_argument("--max-depth", type=int, help="Cut the tree this many levels below the root")
+    parser.add_argument("--stats", action="store_true", help="Print node and leaf counts and exit")
+    parser.add_argument("--layout", choices=LAYOUT_KINDS, default="auto",
+                        help="fan: the classic fixed-angle tree; radial: wedges sized by leaf count, "
+                             "with overlapping labels dropped; auto: fan up to %d leaves (default)" % FAN_MAX_LEAVES)
+    parser.add_argument("--cache-dir", default=default_cache_dir(),
+                        help="Where compiled --data files and computed layouts are kept (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-read --data and recompute the layout")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        ext = os.path.splitext(args.output or "")[1].lower().lstrip(".")
+        args.format = ext if ext in WRITERS else "turtle"
+    if args.format in WRITERS and not args.output:
+        args.output = f"language_tree.{args.format}"
+    return args
+
+def print_stats(tree, root=0):
+    """Counts straight from the node table; nothing below the root's children is read"""
+    print(f"🌳 {tree.name(root) or 'All'}: {tree.descendants(root) + 1:,} nodes, {tree.leaves[root]:,} leaves")
+    if root == 0:
+        print("   Nodes per level: " + ", ".join(f"{c:,}" for c in tree.depth_counts))
+    children = list(tree.children(root))
+    for child in children[:STATS_CHILDREN]:
+        print(f"  • {tree.name(child)}: {tree.descendants(child):,} descendants, {tree.leaves[child]:,} leaves")
+    if len(children) > STATS_CHILDREN:
+        print(f"  … and {len(children) - STATS_CHILDREN:,} more")
+
+def run_turtle(layout, tree, root=0, subtitle=None):
+    """Draw the tree in an interactive turtle window"""
+    size = canvas_size(layout)
+    screen = setup_screen(size)
+
+    total_langs = count_total_languages(tree) if root == 0 else f"{tree.leaves[root]:,} leaves of"
+
     print("=" * 70)
     print("HIERARCHICAL GLOBAL LANGUAGE TREE FRACTAL")
     print("=" * 70)
@@ -426,21 +451,21 @@ def main():
     print("   Use arrow keys or drag with mouse to explore the entire tree")
     print("\nHierarchy Levels:")
     print("  1️⃣  Root (trunk)")
-    print("  2️⃣  Language Families (11 families)")
+    print(f"  2️⃣  Language Families ({sum(1 for _ in tree.children(root))} families)")
     print("  3️⃣  Subfamilies (branches on branches!)")
     print("  4️⃣  Individual Languages")
     print("  5️⃣  Common Words (leaf nodes)")
-    
+
     print("\n📊 Language Distribution by Family:")
-    for family in LANGUAGES.keys():
-        subfamily_count = len(LANGUAGES[family])
-        lang_count = sum(len(LANGUAGES[family][sf]) for sf in LANGUAGES[family])
-        print(f"  • {family}: {subfamily_count} subfamilies, {lang_count} languages")
-    
+    for family in tree.children(root):
+        subfamilies = list(tree.children(family))
+        lang_count = sum(1 for sf in subfamilies for _ in tree.children(sf))
+        print(f"  • {tree.name(family)}: {len(subfamilies)} subfamilies, {lang_count} languages")
+
     print("\n✨ Building the tree (this may take a moment)...")
-    draw_language_tree(screen)
-    add_decorative_elements(screen)
-    
+    draw_language_tree(screen, layout, subtitle)
+    add_decorative_elements(screen, size / CANVAS_SIZE)
+
     print("\n🎉 Complete!")
     print("\n🖱️  TIP: You can scroll using:")
     print("   • Arrow keys (↑ ↓ ← →)")
@@ -450,5 +475,40 @@ def main():
     screen.update()
     screen.exitonclick()
 
+def main(argv=None):
+    """Main function to run the fractal drawer"""
+    args = parse_args(argv)
+    start = time.perf_counter()
+    cache_dir = None if args.no_cache else args.cache_dir
+    try:
+        tree = open_hierarchy(args.data, args.data_format, cache_dir) if args.data else builtin_tree()
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot load {args.data}: {e}")
+    try:
+        root = tree.find(args.root) if args.root else 0
+    except KeyError:
+        sys.exit(f"No node at {args.root!r} (give a path of names from the top, e.g. Indo-European/Germanic)")
+    if args.stats:
+        print_stats(tree, root)
+        return
+    view = tree.subtree(root, args.max_depth)
+    layout = load_layout(view, FAMILY_COLORS, cache_dir, args.layout)
+    subtitle = None
+    if args.data or args.root or args.max_depth is not None:
+        name = tree.name(root)
+        subtitle = f"{name + ' • ' if name else ''}{layout.leaves[0]:,} Leaves • {max(layout.depth)} Levels of Branching"
+    if args.format == "turtle":
+        run_turtle(layout, tree, root, subtitle)
+        return
+    if args.format == "view":
+        from tree_viewer import run_viewer
+        run_viewer(layout, "Hierarchical Global Language Tree",
+                   subtitle or f"{count_total_languages()} Languages • 4 Levels of Branching")
+        return
+    count = render_file(args.format, args.output, layout, args.seed, subtitle)
+    elapsed = (time.perf_counter() - start) * 1000
+    source = "cached layout" if layout.from_cache else "fresh layout"
+    print(f"🌳 Wrote {args.output} ({len(layout):,} nodes, {count:,} elements, {source}) in {elapsed:.1f} ms")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,108 @@
+"""
+Spatial Index
+-------------
+A uniform grid over axis-aligned boxes, for the language tree.
+- Boxes are (x0, y0, x1, y1) with x0 <= x1 and y0 <= y1.
+- Each box is filed under every grid cell it touches, so a query only looks at
+  the boxes in the cells the query box covers.
+- With cells about the size of a typical box, insert and query are O(1) per
+  box, so checking n labels for collisions is close to linear.
+- Long thin items (tree branches) can be filed along their path instead:
+  only the cells the segments actually cross, not every cell of the box.
+"""
+
+import math
+from typing import Container, List, Dict, Hashable, Iterable, Iterator, Sequence, Tuple
+
+Box = Tuple[float, float, float, float]
+
+
+def intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class GridIndex:
+    """Items with bounding boxes, bucketed by `cell`-sized squares."""
+
+    def __init__(self, cell: float):
+        self.cell = float(cell)
+        self.cells: Dict[Tuple[int, int], List[Hashable]] = {}
+        self.boxes: Dict[Hashable, Box] = {}
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _keys(self, box: Box) -> Iterator[Tuple[int, int]]:
+        c = self.cell
+        gx0, gx1 = math.floor(box[0] / c), math.floor(box[2] / c)
+        gy0, gy1 = math.floor(box[1] / c), math.floor(box[3] / c)
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                yield gx, gy
+
+    def _segment_keys(self, x0: float, y0: float, x1: float, y1: float) -> List[Tuple[int, int]]:
+        """Cells a segment passes through, column by column."""
+        c = self.cell
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        gx0, gx1 = math.floor(x0 / c), math.floor(x1 / c)
+        if gx0 == gx1:
+            ga, gb = math.floor(y0 / c), math.floor(y1 / c)
+            return [(gx0, gy) for gy in range(min(ga, gb), max(ga, gb) + 1)]
+        slope = (y1 - y0) / (x1 - x0)
+        keys = []
+        ya = y0
+        for gx in range(gx0, gx1 + 1):
+            yb = y1 if gx == gx1 else y0 + ((gx + 1) * c - x0) * slope
+            ga, gb = math.floor(ya / c), math.floor(yb / c)
+            keys.extend((gx, gy) for gy in range(min(ga, gb), max(ga, gb) + 1))
+            ya = yb
+        return keys
+
+    def insert(self, item: Hashable, box: Box) -> None:
+        self.boxes[item] = box
+        for key in self._keys(box):
+            self.cells.setdefault(key, []).append(item)
+
+    def insert_path(self, item: Hashable, points: Sequence[Tuple[float, float]]) -> None:
+        """File `item` under the cells its polyline crosses; queries still test its bounding box."""
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        box = self.boxes[item] = (min(xs), min(ys), max(xs), max(ys))
+        c = self.cell
+        if math.floor(box[2] / c) - math.floor(box[0] / c) < 2 and math.floor(box[3] / c) - math.floor(box[1] / c) < 2:
+            keys: Iterable[Tuple[int, int]] = self._keys(box)   # at most four cells: the path crosses most of them anyway
+        else:
+            keys = set()
+            for (x0, y0), (x1, y1) in zip(points, points[1:]):
+                keys.update(self._segment_keys(x0, y0, x1, y1))
+        for key in keys:
+            self.cells.setdefault(key, []).append(item)
+
+    def subset(self, items: Container[Hashable]) -> "GridIndex":
+        """A grid with the same cells holding only `items`, without recomputing any cells."""
+        sub = GridIndex(self.cell)
+        sub.boxes = {item: box for item, box in self.boxes.items() if item in items}
+        for key, bucket in self.cells.items():
+            kept = [item for item in bucket if item in items]
+            if kept:
+                sub.cells[key] = kept
+        return sub
+
+    def query(self, box: Box) -> List[Hashable]:
+        """Items whose boxes intersect `box`, each once, in insertion order per cell."""
+        found, seen = [], set()
+        for key in self._keys(box):
+            for item in self.cells.get(key, ()):
+                if item not in seen:
+                    seen.add(item)
+                    if intersects(box, self.boxes[item]):
+                        found.append(item)
+        return found
+
+    def overlaps(self, box: Box) -> bool:
+        """Whether any stored box intersects `box`; stops at the first hit."""
+        for key in self._keys(box):
+            for item in self.cells.get(key, ()):
+                if intersects(box, self.boxes[item]):
+                    return True
+        return False
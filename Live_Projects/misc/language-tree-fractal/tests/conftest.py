@@ -0,0 +1,6 @@
+"""The modules under test sit one directory up, next to language_tree.py."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
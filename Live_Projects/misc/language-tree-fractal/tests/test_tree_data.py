@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import language_tree
+import tree_data
+
+SOURCES = {
+    "tree.json": '{"Germanic": {"English": ["water", "fire"], "German": ["Wasser"]}, "Uralic": ["vesi"]}',
+    "tree.nwk": "(((water,fire)English,(Wasser)German)Germanic,(vesi)Uralic);",
+    "tree.csv": "parent,child\nGermanic,English\nEnglish,water\nEnglish,fire\nGermanic,German\n"
+                "German,Wasser\nUralic,vesi\n",
+}
+PREORDER = ["Germanic", "English", "water", "fire", "German", "Wasser", "Uralic", "vesi"]
+
+
+@pytest.fixture(params=sorted(SOURCES))
+def source(request, tmp_path):
+    path = tmp_path / request.param
+    path.write_text(SOURCES[request.param], encoding="utf-8")
+    return str(path)
+
+
+def test_every_format_gives_the_same_table(source):
+    names, parent, depth, end = tree_data.parse(source).subtree().table()
+    assert names[1:] == PREORDER
+    assert depth == [0, 1, 2, 3, 3, 2, 3, 1, 2]
+    assert parent[1:] == [0, 1, 2, 2, 1, 5, 0, 7]
+    assert end[0] == len(names)
+
+
+def test_compiled_table_is_mapped_on_the_next_open(source, tmp_path):
+    first = tree_data.open_hierarchy(source, cache_dir=str(tmp_path / "cache"))
+    again = tree_data.open_hierarchy(source, cache_dir=str(tmp_path / "cache"))
+    assert isinstance(again.offsets, memoryview)
+    assert again.subtree().table() == first.subtree().table()
+    assert again.count_at_depth(3) == 3 and again.levels() == 4
+
+
+def test_root_and_max_depth_read_only_that_part(source):
+    tree = tree_data.parse(source)
+    germanic = tree.find("Germanic")
+    names, _, depth, _ = tree.subtree(germanic, max_depth=1).table()
+    assert names == ["Germanic", "English", "German"] and depth == [0, 1, 1]
+    with pytest.raises(KeyError):
+        tree.find("Germanic/Dutch")
+
+
+def test_builtin_languages_round_trip_through_json(tmp_path):
+    path = tmp_path / "languages.json"
+    path.write_text(json.dumps(language_tree.LANGUAGES), encoding="utf-8")
+    assert tree_data.parse(str(path)).subtree().table() == language_tree.builtin_tree().subtree().table()
+
+
+def test_csv_cycle_is_rejected(tmp_path):
+    path = tmp_path / "cycle.csv"
+    path.write_text("a,b\nb,c\nc,b\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        tree_data.parse(str(path))
@@ -0,0 +1,75 @@
+import itertools
+
+import pytest
+
+from spatial_index import intersects
+from tree_layout import compute_layout, label_size, level
+from tree_viewer import MAX_ZOOM, Camera, ViewModel
+
+# 6 families x 6 subfamilies x 8 languages x 5 words, in the radial layout
+DATA = {f"Family {f}": {f"Branch {f}.{b}": {f"Lang {f}.{b}.{l}": [f"w{f}{b}{l}{w}" for w in range(5)]
+                                               for l in range(8)}
+                         for b in range(6)}
+        for f in range(6)}
+
+
+@pytest.fixture(scope="module")
+def view():
+    return ViewModel(compute_layout(DATA, {}, kind="radial"))
+
+
+def fitted(view, width=1200, height=800):
+    camera = Camera(width, height)
+    camera.fit(view.layout.extent())
+    return camera
+
+
+def label_box(view, camera, i):
+    layout = view.layout
+    sx, sy = camera.to_screen(layout.label_x[i], layout.label_y[i])
+    w, h = label_size(layout.names[i], level(layout.depth[i]).font)
+    return sx - w / 2, sy - h, sx + w / 2, sy
+
+
+def test_detail_grows_with_zoom(view):
+    fit = fitted(view).scale
+    scales = [fit * 2 ** k for k in range(-14, 8)] + [MAX_ZOOM]
+    depths = [view.lod_depth(s) for s in scales]
+    assert depths == sorted(depths)
+    assert depths[0] == 1 and depths[-1] == view.max_depth == 4
+    assert view.lod_depth(fit) == 4   # a tree this small is drawn to its leaves once it fits the window
+    # Families are always drawn; a deeper level is thinned before it is drawn in full
+    assert all(view.thinning(1, s) == 1 for s in scales)
+    leaf_k = [view.thinning(4, s) for s in scales]
+    assert leaf_k[0] == 0 and any(k > 1 for k in leaf_k) and leaf_k[-1] == 1
+    assert all(a == 0 or b == 0 or b <= a for a, b in zip(leaf_k, leaf_k[1:]))
+
+
+def centred_on(view, camera, depth, scale):
+    """Cameras at `scale` over a few nodes of `depth`, where there is something to label."""
+    layout = view.layout
+    nodes = [i for i in range(1, len(layout)) if layout.depth[i] == depth]
+    for i in nodes[::max(1, len(nodes) // 3)]:
+        camera.scale, camera.cx, camera.cy = scale, layout.x[i], layout.y[i]
+        yield camera
+
+
+def test_labels_never_overlap(view):
+    camera = fitted(view)
+    fit = camera.scale
+    for depth, zoom in [(1, 1), (1, 3), (2, 10), (3, 40), (4, 100)]:
+        for camera in centred_on(view, camera, depth, min(fit * zoom, MAX_ZOOM)):
+            shown = view.labels(camera, view.branches(camera))
+            assert shown
+            boxes = [label_box(view, camera, i) for i in shown]
+            assert not any(intersects(a, b) for a, b in itertools.combinations(boxes, 2))
+
+
+def test_labels_on_screen_are_kept_first(view):
+    camera = next(centred_on(view, fitted(view), 2, fitted(view).scale * 10))
+    nodes = view.branches(camera)
+    first = view.labels(camera, nodes)
+    # Nudge the view: everything shown before that still fits stays, even if a bigger subtree now competes
+    camera.cx -= 5 / camera.scale
+    again = view.labels(camera, nodes, keep=first)
+    assert first and set(first) <= set(again)
@@ -0,0 +1,462 @@
+"""
+Language Tree Data
+------------------
+Hierarchies for language_tree.py from files: nested JSON, CSV edge lists and Newick.
+- Files are parsed as a stream into a compact preorder node table. JSON and
+  Newick go through a chunked tokenizer; CSV is read row by row. Each node
+  stores its parent, depth, subtree end and leaf count, and names go into one
+  UTF-8 blob. A node's subtree is the contiguous row range [i, end[i]), so
+  descendant counts come free: end[i] - i - 1.
+- The table is compiled once into a .ltree file in the cache directory. The
+  file is keyed by the source's path, size and modification time. Later runs
+  map it with mmap: opening reads only the header, the counts are already
+  there, and only the rows of the subtree being drawn are read.
+- LANGUAGES goes through the same table (from_nested), so its counts are also
+  computed once.
+
+JSON: one object per internal node, shaped like LANGUAGES. Arrays hold leaf
+names, and a null, scalar or {} value is a leaf. CSV: `parent,child` rows in
+any order, with an optional header row, and an empty parent marks a root.
+More than one root gets an unnamed root above them. Newick: the first tree in
+the file; branch lengths and [comments] are ignored.
+"""
+
+import array
+import csv
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import re
+import sys
+from typing import List, Dict, Iterator, Optional, Tuple
+
+TREE_VERSION = 1
+CHUNK = 1 << 16
+FORMATS = {
+    ".json": "json",
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".nwk": "newick",
+    ".newick": "newick",
+    ".tre": "newick",
+    ".tree": "newick",
+}
+INT_COLUMNS = ("parent", "depth", "end", "leaves")
+
+JSON_TOKEN = re.compile(r'\s*(?:([{}\[\]:,])|"((?:[^"\\]|\\.)*)"|([^\s{}\[\]:,"]+))')
+# punctuation | branch length | [comment] | 'quoted label' | bare label
+NEWICK_TOKEN = re.compile(r"\s*(?:([(),;])|:\s*[^\s(),;:\[\]']*|\[[^\]]*\]|'((?:[^']|'')*)'|([^\s(),;:\[\]']+))")
+
+
+class Hierarchy:
+    """Preorder node table. Columns are arrays (built in memory) or views into a mapped .ltree file."""
+
+    def __init__(self, header: Dict, columns: Dict, offsets, blob, keep=None):
+        self.n = header["n"]
+        self.key = header["key"]
+        self.depth_counts: List[int] = header["depth_counts"]
+        self.parent, self.depth, self.end, self.leaves = (columns[c] for c in INT_COLUMNS)
+        self.offsets = offsets    # names[i] is blob[offsets[i]:offsets[i + 1]]
+        self.blob = blob
+        self._keep = keep         # the open mmap behind the views
+
+    @classmethod
+    def from_columns(cls, names: List[str], parent, depth, end, key: str) -> "Hierarchy":
+        n = len(names)
+        leaves = array.array("i", (1 if end[i] == i + 1 else 0 for i in range(n)))
+        for i in range(n - 1, 0, -1):
+            leaves[parent[i]] += leaves[i]
+        depth_counts = [0] * (max(depth) + 1)
+        for d in depth:
+            depth_counts[d] += 1
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = array.array("q", itertools.accumulate(map(len, encoded), initial=0))
+        header = {"n": n, "key": key, "depth_counts": depth_counts}
+        columns = {"parent": parent, "depth": depth, "end": end, "leaves": leaves}
+        return cls(header, columns, offsets, b"".join(encoded))
+
+    def __len__(self) -> int:
+        return self.n
+
+    def name(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def descendants(self, i: int = 0) -> int:
+        return self.end[i] - i - 1
+
+    def levels(self) -> int:
+        return len(self.depth_counts)
+
+    def count_at_depth(self, depth: int) -> int:
+        return self.depth_counts[depth] if depth < len(self.depth_counts) else 0
+
+    def children(self, i: int) -> Iterator[int]:
+        j, stop = i + 1, self.end[i]
+        while j < stop:
+            yield j
+            j = self.end[j]
+
+    def find(self, path: str) -> int:
+        """Row of the node at `path` ("Indo-European/Germanic"). Raises KeyError."""
+        node = 0
+        for part in (p for p in path.split("/") if p):
+            node = next((c for c in self.children(node) if self.name(c) == part), None)
+            if node is None:
+                raise KeyError(path)
+        return node
+
+    def subtree(self, root: int = 0, max_depth: Optional[int] = None) -> "Subtree":
+        return Subtree(self, root, max_depth)
+
+    def save(self, path: str) -> None:
+        header = {"version": TREE_VERSION, "byteorder": sys.byteorder, "n": self.n, "key": self.key,
+                  "depth_counts": self.depth_counts, "blob": len(self.blob)}
+        line = json.dumps(header).encode("utf-8")
+        line += b" " * (-(len(line) + 1) % 8) + b"\n"    # columns start 8-byte aligned
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(line)
+            f.write(array.array("q", self.offsets).tobytes())
+            for c in INT_COLUMNS:
+                f.write(array.array("i", getattr(self, c)).tobytes())
+            f.write(self.blob)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Hierarchy":
+        """Map a compiled .ltree file. Raises OSError or ValueError if it is missing, stale or truncated."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = json.loads(mm.readline())
+        if header.get("version") != TREE_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path}: stale tree file")
+        n, pos = header["n"], mm.tell()
+        if mm.size() != pos + 8 * (n + 1) + 4 * n * len(INT_COLUMNS) + header["blob"]:
+            raise ValueError(f"{path}: truncated")
+        view = memoryview(mm)
+        offsets = view[pos:pos + 8 * (n + 1)].cast("q")
+        pos += 8 * (n + 1)
+        columns = {}
+        for c in INT_COLUMNS:
+            columns[c] = view[pos:pos + 4 * n].cast("i")
+            pos += 4 * n
+        return cls(header, columns, offsets, view[pos:], keep=mm)
+
+
+class Subtree:
+    """Rows [root, end[root]) of a hierarchy, cut `max_depth` levels below the root.
+
+    This is what tree_layout lays out; only these rows are ever read.
+    """
+
+    def __init__(self, tree: Hierarchy, root: int = 0, max_depth: Optional[int] = None):
+        self.tree = tree
+        self.root = root
+        self.max_depth = max_depth
+
+    @property
+    def key(self) -> str:
+        return f"{self.tree.key}:{self.root}:{self.max_depth}"
+
+    def table(self) -> Tuple[List[str], List[int], List[int], List[int]]:
+        """names, parent, depth and end lists, renumbered from 0 in preorder."""
+        tree, d0 = self.tree, self.tree.depth[self.root]
+        names: List[str] = []
+        parent: List[int] = []
+        depth: List[int] = []
+        open_nodes: List[Tuple[int, int]] = []   # (end row in the tree, new index) of the current ancestors
+        i, stop = self.root, tree.end[self.root]
+        while i < stop:
+            while open_nodes and open_nodes[-1][0] <= i:
+                open_nodes.pop()
+            new, d = len(names), tree.depth[i] - d0
+            names.append(tree.name(i))
+            parent.append(open_nodes[-1][1] if open_nodes else -1)
+            depth.append(d)
+            if self.max_depth is not None and d >= self.max_depth:
+                i = tree.end[i]          # cut here: the node becomes a leaf and its rows are skipped
+            else:
+                open_nodes.append((tree.end[i], new))
+                i += 1
+        size = [1] * len(names)
+        for j in range(len(names) - 1, 0, -1):
+            size[parent[j]] += size[j]
+        return names, parent, depth, [j + s for j, s in enumerate(size)]
+
+
+class TreeBuilder:
+    """Collects open/close events, in preorder, into node columns."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.parent = array.array("i")
+        self.depth = array.array("i")
+        self.end = array.array("i")
+        self._open: List[int] = []
+
+    def open(self, name: str) -> None:
+        if not self._open and self.names:
+            raise ValueError("more than one root")
+        self.names.append(name)
+        self.parent.append(self._open[-1] if self._open else -1)
+        self.depth.append(len(self._open))
+        self.end.append(0)
+        self._open.append(len(self.names) - 1)
+
+    def close(self, name: Optional[str] = None) -> None:
+        if not self._open:
+            raise ValueError("unbalanced close")
+        i = self._open.pop()
+        self.end[i] = len(self.names)
+        if name is not None:
+            self.names[i] = name
+
+    def leaf(self, name: str) -> None:
+        self.open(name)
+        self.close()
+
+    def finish(self, key: str) -> Hierarchy:
+        if self._open:
+            raise ValueError("unexpected end of input")
+        if not self.names:
+            raise ValueError("no nodes")
+        return Hierarchy.from_columns(self.names, self.parent, self.depth, self.end, key)
+
+
+def stream_tokens(f, pattern) -> Iterator:
+    """Regex matches over a text file read CHUNK characters at a time."""
+    buf, pos, eof = "", 0, False
+    while True:
+        m = pattern.match(buf, pos)
+        if m is None or (m.end() == len(buf) and not eof):   # a token at the edge may continue in the next chunk
+            if eof:
+                if buf[pos:].strip():
+                    raise ValueError(f"cannot parse near {buf[pos:pos + 40]!r}")
+                return
+            chunk = f.read(CHUNK)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        pos = m.end()
+        yield m
+
+
+def json_events(f, b: TreeBuilder) -> None:
+    def tokens():
+        for m in stream_tokens(f, JSON_TOKEN):
+            punct, string, bare = m.groups()
+            if punct:
+                yield punct, None
+            elif string is not None:
+                yield "str", json.loads(f'"{string}"') if "\\" in string else string
+            else:
+                yield "bare", bare
+
+    it = tokens()
+    if next(it, (None,))[0] != "{":
+        raise ValueError("a JSON hierarchy must be an object at the top level")
+    b.open("")
+    stack = ["{"]
+    for kind, value in it:
+        if not stack:
+            raise ValueError("data after the top-level object")
+        if kind == ",":
+            continue
+        if stack[-1] == "{":
+            if kind == "}":
+                b.close()
+                stack.pop()
+                continue
+            if kind != "str" or next(it, (None,))[0] != ":":
+                raise ValueError("expected \"name\": value")
+            vkind, v = next(it, (None, None))
+            if vkind in ("{", "["):
+                b.open(value)
+                stack.append(vkind)
+            elif vkind in ("str", "bare"):
+                b.leaf(value)
+            else:
+                raise ValueError(f"bad value for {value!r}")
+        elif kind == "]":
+            b.close()
+            stack.pop()
+        elif kind == "str" or (kind == "bare" and value != "null"):
+            b.leaf(value)
+        elif kind != "bare":
+            raise ValueError("arrays may only hold leaf names")
+    if stack:
+        raise ValueError("unexpected end of input")
+
+
+def newick_events(f, b: TreeBuilder) -> None:
+    expect = True      # a node may start here: after '(' or ',' and at the beginning
+    pending = False    # a ')' whose node may still be followed by its label
+    for m in stream_tokens(f, NEWICK_TOKEN):
+        punct, quoted, bare = m.groups()
+        if quoted is not None or bare is not None:
+            label = quoted.replace("''", "'") if quoted is not None else bare.replace("_", " ")
+            if pending:
+                b.close(label)
+                pending = False
+            elif expect:
+                b.leaf(label)
+                expect = False
+            else:
+                raise ValueError(f"unexpected label {label!r}")
+            continue
+        if punct is None:
+            continue     # branch length or comment
+        if pending:
+            b.close()
+            pending = False
+        if punct == "(":
+            if not expect:
+                raise ValueError("unexpected '('")
+            b.open("")
+        elif punct in ",);":
+            if expect:
+                b.leaf("")
+            expect = punct == ","
+            pending = punct == ")"
+            if punct == ";":
+                return
+    if pending:
+        b.close()
+
+
+def csv_events(f, b: TreeBuilder, delimiter: str = ",") -> None:
+    ids: Dict[str, int] = {}
+    names: List[str] = []
+    parent = array.array("i")
+
+    def intern(name: str) -> int:
+        i = ids.setdefault(name, len(names))
+        if i == len(names):
+            names.append(name)
+            parent.append(-1)
+        return i
+
+    swap = False
+    for lineno, row in enumerate(csv.reader(f, delimiter=delimiter), 1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) < 2:
+            raise ValueError(f"line {lineno}: expected parent{delimiter}child")
+        p, c = row[0].strip(), row[1].strip()
+        if lineno == 1 and {p.lower(), c.lower()} == {"parent", "child"}:
+            swap = p.lower() == "child"
+            continue
+        if swap:
+            p, c = c, p
+        child = intern(c)
+        if p:
+            par = intern(p)
+            if parent[child] not in (-1, par):
+                raise ValueError(f"line {lineno}: {c!r} has two parents")
+            parent[child] = par
+    # children in order of first appearance, as linked lists
+    first = array.array("i", [-1]) * len(names)
+    last = array.array("i", [-1]) * len(names)
+    nxt = array.array("i", [-1]) * len(names)
+    for c, p in enumerate(parent):
+        if p >= 0:
+            if first[p] < 0:
+                first[p] = c
+            else:
+                nxt[last[p]] = c
+            last[p] = c
+    roots = [i for i, p in enumerate(parent) if p < 0]
+    if len(roots) != 1:
+        b.open("")
+    for r in roots:
+        b.open(names[r])
+        stack = [first[r]]
+        while stack:
+            c = stack[-1]
+            if c < 0:
+                stack.pop()
+                b.close()
+                continue
+            stack[-1] = nxt[c]
+            b.open(names[c])
+            stack.append(first[c])
+    if len(roots) != 1:
+        b.close()
+    if len(b.names) - (len(roots) != 1) != len(names):
+        raise ValueError("the edges contain a cycle")
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"cannot tell the format of {path!r} (use one of: {', '.join(sorted(set(FORMATS.values())))})")
+    return FORMATS[ext]
+
+
+def parse(path: str, fmt: Optional[str] = None, key: str = "") -> Hierarchy:
+    """Parse a hierarchy file into an in-memory table. Raises ValueError on bad input."""
+    fmt = fmt or detect_format(path)
+    b = TreeBuilder()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            json_events(f, b)
+        elif fmt == "newick":
+            newick_events(f, b)
+        elif fmt == "csv":
+            csv_events(f, b, "\t" if path.lower().endswith(".tsv") else ",")
+        else:
+            raise ValueError(f"unknown format {fmt!r}")
+    return b.finish(key or source_key(path, fmt))
+
+
+def source_key(path: str, fmt: str) -> str:
+    st = os.stat(path)
+    blob = f"{TREE_VERSION}\0{fmt}\0{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def open_hierarchy(path: str, fmt: Optional[str] = None, cache_dir: Optional[str] = None) -> Hierarchy:
+    """The compiled table for `path`, compiling it first if the source is new or changed.
+
+    cache_dir=None parses into memory every time.
+    """
+    fmt = fmt or detect_format(path)
+    key = source_key(path, fmt)
+    if cache_dir is None:
+        return parse(path, fmt, key)
+    compiled = os.path.join(cache_dir, f"tree-{key}.ltree")
+    try:
+        return Hierarchy.load(compiled)
+    except (OSError, ValueError, KeyError):
+        pass
+    tree = parse(path, fmt, key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tree.save(compiled)
+    except OSError:
+        pass     # only costs the next run a parse
+    return tree
+
+
+def from_nested(data: Dict) -> Hierarchy:
+    """A LANGUAGES-style nested dict as a table; the root is unnamed."""
+    b = TreeBuilder()
+    b.open("")
+    stack = [iter(data.items())]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            b.close()
+            continue
+        name, sub = item
+        b.open(str(name))
+        if isinstance(sub, dict):
+            stack.append(iter(sub.items()))
+        else:
+            for word in sub or ():
+                b.leaf(str(word))
+            b.close()
+    blob = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return b.finish(hashlib.blake2b(blob.encode("utf-8"), digest_size=10).hexdigest())
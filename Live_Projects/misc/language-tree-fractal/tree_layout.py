@@ -0,0 +1,316 @@
+"""
+Language Tree Layout
+--------------------
+Geometry for language_tree.py, computed once and shared by every renderer.
+- The tree (the nested LANGUAGES dict, or a tree_data.Subtree loaded from a
+  file) is read once into a flat node table. Nodes are in depth-first
+  preorder, so a node's parent comes before it and its subtree is the
+  contiguous range [i, end[i]).
+- Columns are typed arrays (array.array): parent, depth, end, color index,
+  heading, branch end (x, y) and label anchor (x, y). Names and the color
+  palette are plain lists.
+- Two layouts fill the same table. "fan" is the original look: fixed spreads
+  and branch lengths per depth, computed one column pass per depth. "radial"
+  gives each subtree a wedge proportional to its leaf count and puts each depth
+  on a ring. The rings are spaced so the outermost one has room for every
+  leaf. "auto" picks the fan for small trees and radial beyond FAN_MAX_LEAVES.
+- Radial labels go through collision detection. In priority order (shallow
+  first, then bigger subtrees), a label is shown only if its estimated box
+  misses every label already placed; a spatial_index.GridIndex keeps that
+  check near-linear. The fan keeps every label.
+- Tables are cached on disk under a hash of the data, colors and layout
+  parameters. A re-render of unchanged data loads the columns and skips layout.
+"""
+
+import array
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import unicodedata
+from typing import List, Dict, NamedTuple, Optional, Tuple
+
+from spatial_index import GridIndex
+from tree_data import from_nested
+
+LAYOUT_VERSION = 2     # part of the cache key; bump when the layout changes
+LAYOUT_KINDS = ["auto", "fan", "radial"]
+TRUNK_BASE = (0.0, -300.0)
+TRUNK_COLOR = "#5C4033"
+FAN_MAX_LEAVES = 1000  # auto: past this many leaves the fixed fan angles overlap
+LEAF_SPACING = 10.0    # radial: arc length per leaf on the outermost ring
+MIN_RING = 120.0       # radial: smallest distance between depth rings
+PX_PER_PT = 4 / 3      # label size estimates: font points -> canvas units
+GRID_CELL = 64.0       # collision grid cell, about one label wide
+# families with no entry in the color map, in turn
+FALLBACK_COLORS = ["#FF6B6B", "#4ECDC4", "#FFE66D", "#95E1D3", "#FF8C42", "#A8E6CF", "#C77DFF", "#FF85C0"]
+
+
+class Level(NamedTuple):
+    length: float      # branch length from the parent
+    width: float       # pen width of the branch
+    spread: float      # fan of the children around the parent's heading, degrees
+    offset: float      # label distance past the branch end
+    font: tuple
+
+
+# Per depth; deeper levels reuse the last entry. The root is the top of the trunk,
+# and families are spread over the full circle starting straight down.
+LEVELS = [
+    Level(120, 15, 360, 0, ("Arial", 12, "bold")),      # root (trunk)
+    Level(120, 9, 80, 20, ("Arial", 11, "bold")),       # family
+    Level(95, 6, 70, 12, ("Arial", 9, "bold")),         # subfamily
+    Level(70, 3.5, 60, 10, ("Arial", 8, "normal")),     # language
+    Level(45, 1.5, 60, 12, ("Arial", 7, "normal")),     # word
+]
+
+COLUMNS = {
+    "parent": "i",
+    "depth": "b",
+    "end": "i",
+    "color": "H",
+    "leaves": "i",
+    "show": "b",      # 1: draw the node's label
+    "heading": "d",
+    "x": "d",
+    "y": "d",
+    "label_x": "d",
+    "label_y": "d",
+}
+
+
+def level(depth: int) -> Level:
+    return LEVELS[min(depth, len(LEVELS) - 1)]
+
+
+class TreeLayout:
+    """Flat node table: one entry per node in every column, node 0 is the root."""
+
+    def __init__(self, names: List[str], palette: List[str], columns: Dict[str, array.array], kind: str):
+        self.names = names
+        self.palette = palette
+        self.kind = kind
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        self.from_cache = False
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def is_leaf(self, i: int) -> bool:
+        return self.end[i] == i + 1
+
+    def extent(self) -> float:
+        """Largest distance from the centre along either axis, labels included."""
+        return max(max(map(abs, col), default=0.0) for col in (self.x, self.y, self.label_x, self.label_y))
+
+    def save(self, path: str) -> None:
+        header = {"version": LAYOUT_VERSION, "kind": self.kind, "byteorder": sys.byteorder, "n": len(self),
+                  "names": self.names, "palette": self.palette}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            for name in COLUMNS:
+                getattr(self, name).tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeLayout":
+        """Raises OSError or ValueError on a missing, stale or truncated file."""
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != LAYOUT_VERSION:
+                raise ValueError(f"{path}: layout version {header.get('version')}")
+            n = header["n"]
+            columns = {}
+            for name, code in COLUMNS.items():
+                col = array.array(code)
+                try:
+                    col.fromfile(f, n)
+                except EOFError:
+                    raise ValueError(f"{path}: truncated") from None
+                if header["byteorder"] != sys.byteorder:
+                    col.byteswap()
+                columns[name] = col
+        layout = cls(header["names"], header["palette"], columns, header["kind"])
+        layout.from_cache = True
+        return layout
+
+
+def flatten(data, colors: Dict[str, str]):
+    """Node table for `data` -> names, palette and the parent, depth, end, color, rank and sibling-count lists.
+
+    `data` is a LANGUAGES-style nested dict or a tree_data.Subtree. A family
+    (depth 1) takes its color from `colors`, or the next FALLBACK_COLORS entry,
+    and passes it to its whole subtree.
+    """
+    if isinstance(data, dict):
+        data = from_nested(data).subtree()
+    names, parent, depth, end = data.table()
+    n = len(names)
+    palette = [TRUNK_COLOR]
+    color, rank, counts = [0] * n, [0] * n, [0] * n
+    fallback = itertools.cycle(FALLBACK_COLORS)
+    for i in range(1, n):
+        p = parent[i]
+        rank[i] = counts[p]
+        counts[p] += 1
+        if depth[i] == 1:
+            hex_color = colors.get(names[i]) or next(fallback)
+            if hex_color not in palette:
+                palette.append(hex_color)
+            color[i] = palette.index(hex_color)
+        else:
+            color[i] = color[p]
+    siblings = [counts[p] if i else 1 for i, p in enumerate(parent)]
+    return names, palette, parent, depth, end, color, rank, siblings
+
+
+def leaf_counts(parent: List[int], end: List[int]) -> List[int]:
+    leaves = [1 if e == i + 1 else 0 for i, e in enumerate(end)]
+    for i in range(len(parent) - 1, 0, -1):
+        leaves[parent[i]] += leaves[i]
+    return leaves
+
+
+def label_size(text: str, font: tuple) -> Tuple[float, float]:
+    """Rough (width, height) of a label: 0.6 em per character, 1 em for wide (CJK) ones."""
+    em = font[1] * PX_PER_PT
+    ems = sum(1.0 if unicodedata.east_asian_width(ch) in "WF" else 0.6 for ch in text)
+    return ems * em, em
+
+
+def fan_positions(names, parent, depth, rank, siblings, leaves):
+    """Fixed spreads and lengths per depth; one pass over the columns per depth."""
+    n = len(parent)
+    heading = [90.0] * n
+    x = [TRUNK_BASE[0]] * n
+    y = [TRUNK_BASE[1] + LEVELS[0].length] * n
+    label_x, label_y = x[:], y[:]
+    by_depth: Dict[int, List[int]] = {}
+    for i in range(1, n):
+        by_depth.setdefault(depth[i], []).append(i)
+    for d in sorted(by_depth):
+        nodes = by_depth[d]
+        spec, spread = level(d), level(d - 1).spread
+        ps = [parent[i] for i in nodes]
+        if d == 1:
+            hs = [spread / siblings[i] * rank[i] - 90 for i in nodes]
+        else:
+            hs = [heading[p] + spread / (siblings[i] + 1) * (rank[i] + 1) - spread / 2 for i, p in zip(nodes, ps)]
+        rads = [math.radians(h) for h in hs]
+        xs = [x[p] + spec.length * math.cos(a) for p, a in zip(ps, rads)]
+        ys = [y[p] + spec.length * math.sin(a) for p, a in zip(ps, rads)]
+        # labels sit past the branch end, flipped so they never read upside down
+        flips = [math.radians(h + 180) if 90 < h % 360 < 270 else a for h, a in zip(hs, rads)]
+        lxs = [px + spec.offset * math.cos(a) for px, a in zip(xs, flips)]
+        lys = [py + spec.offset * math.sin(a) for py, a in zip(ys, flips)]
+        for col, values in ((heading, hs), (x, xs), (y, ys), (label_x, lxs), (label_y, lys)):
+            for i, v in zip(nodes, values):
+                col[i] = v
+    return heading, x, y, label_x, label_y
+
+
+def radial_positions(names, parent, depth, rank, siblings, leaves):
+    """Wedges proportional to leaf count, one ring per depth, root at the origin."""
+    n = len(parent)
+    rings = max(depth) or 1
+    ring = max(MIN_RING, leaves[0] * LEAF_SPACING / (2 * math.pi * rings))
+    unit = 360.0 / max(leaves[0], 1)
+    heading, x, y = [90.0] * n, [0.0] * n, [0.0] * n
+    label_x, label_y = [0.0] * n, [0.0] * n
+    free = [0.0] * n     # next unclaimed angle inside each node's wedge
+    free[0] = -90.0
+    for i in range(1, n):   # preorder: a parent, then its children left to right
+        p = parent[i]
+        start, width = free[p], leaves[i] * unit
+        free[p] = start + width
+        free[i] = start
+        h = heading[i] = start + width / 2
+        a = math.radians(h)
+        cos_a, sin_a = math.cos(a), math.sin(a)
+        r = depth[i] * ring
+        x[i], y[i] = r * cos_a, r * sin_a
+        # push the label box just clear of the node, outward along the branch
+        spec = level(depth[i])
+        w, ht = label_size(names[i], spec.font)
+        label_x[i] = x[i] + cos_a * (spec.offset + w / 2 * abs(cos_a))
+        label_y[i] = y[i] + sin_a * (spec.offset + ht / 2 * abs(sin_a)) - ht / 2
+    return heading, x, y, label_x, label_y
+
+
+POSITIONS = {
+    "fan": fan_positions,
+    "radial": radial_positions,
+}
+
+
+def cull_labels(names, depth, leaves, label_x, label_y) -> List[int]:
+    """1 for each label that fits without touching an earlier one, else 0."""
+    show = [0] * len(names)
+    grid = GridIndex(GRID_CELL)
+    for i in sorted(range(1, len(names)), key=lambda i: (depth[i], -leaves[i])):
+        w, h = label_size(names[i], level(depth[i]).font)
+        box = (label_x[i] - w / 2, label_y[i], label_x[i] + w / 2, label_y[i] + h)
+        if not grid.overlaps(box):
+            grid.insert(i, box)
+            show[i] = 1
+    return show
+
+
+def compute_layout(data, colors: Dict[str, str], kind: str = "auto") -> TreeLayout:
+    """Lay out the whole tree with the `kind` layout ("auto" picks by leaf count)."""
+    names, palette, parent, depth, end, color, rank, siblings = flatten(data, colors)
+    leaves = leaf_counts(parent, end)
+    if kind == "auto":
+        kind = "fan" if leaves[0] <= FAN_MAX_LEAVES else "radial"
+    heading, x, y, label_x, label_y = POSITIONS[kind](names, parent, depth, rank, siblings, leaves)
+    if kind == "fan":
+        show = [1] * len(names)
+    else:
+        show = cull_labels(names, depth, leaves, label_x, label_y)
+    show[0] = 0   # the root has no name
+    values = {"parent": parent, "depth": depth, "end": end, "color": color, "leaves": leaves, "show": show,
+              "heading": heading, "x": x, "y": y, "label_x": label_x, "label_y": label_y}
+    return TreeLayout(names, palette, {k: array.array(code, values[k]) for k, code in COLUMNS.items()}, kind)
+
+
+def data_key(data, colors: Dict[str, str], kind: str = "auto") -> str:
+    """Hash of everything the layout depends on (dict order included: it sets the angles).
+
+    A tree_data.Subtree contributes its own key instead of its contents.
+    """
+    params = [LAYOUT_VERSION, kind, TRUNK_BASE, LEVELS, FAN_MAX_LEAVES, LEAF_SPACING, MIN_RING, PX_PER_PT,
+              FALLBACK_COLORS]
+    source = data if isinstance(data, dict) else data.key
+    blob = json.dumps([params, colors, source], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=10).hexdigest()
+
+
+def default_cache_dir() -> str:
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "language_tree")
+
+
+def load_layout(data, colors: Dict[str, str], cache_dir: Optional[str] = None,
+                kind: str = "auto") -> TreeLayout:
+    """The cached layout for this data if there is one, else compute it (and cache it).
+
+    cache_dir=None disables the cache. A cache that cannot be written only costs the next run a recompute.
+    """
+    if cache_dir is None:
+        return compute_layout(data, colors, kind)
+    path = os.path.join(cache_dir, f"layout-{data_key(data, colors, kind)}.bin")
+    try:
+        return TreeLayout.load(path)
+    except (OSError, ValueError, KeyError):
+        pass
+    layout = compute_layout(data, colors, kind)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        layout.save(path)
+    except OSError as e:
+        print(f"Layout cache not written ({e})", file=sys.stderr)
+    return layout
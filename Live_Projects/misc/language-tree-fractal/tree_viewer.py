@@ -0,0 +1,300 @@
+"""
+Language Tree Viewer
+--------------------
+Interactive pan and zoom over a tree layout, for `language_tree.py --format view`.
+- Only what is inside the window (plus a small margin) is drawn. Each depth
+  has its own spatial_index.GridIndex, with each branch filed along its path,
+  and every frame queries the viewport in those grids.
+- Level of detail comes from each depth's typical node spacing, measured once.
+  A depth whose nodes are MIN_NODE_PX apart on screen is drawn in full.
+  Closer than that, only every k-th node is drawn (k a power of two, up to
+  MAX_THINNING), which keeps the density visible at about MIN_NODE_PX
+  spacing. Each k has its own grid, so a thinned query never touches the
+  skipped nodes. Closer still, the depth is not looked up at all, so zoomed
+  out the word leaves and other fine levels cost nothing. Labels keep their
+  screen size. A depth's labels appear once its nodes are
+  LABEL_NODE_PX apart, and overlapping labels are dropped in a screen-space
+  grid. Labels already on screen win ties, so nothing flickers.
+- Redraws are incremental. A drag moves the canvas items and a zoom scales
+  them, both inside Tk. Then only the nodes that enter or leave the view, or
+  the level of detail, are created or deleted.
+
+The view-independent part (ViewModel) needs no Tk; TreeViewer is the Tk shell.
+"""
+
+import math
+import time
+from typing import List, Dict, Iterable, Set, Tuple
+
+from spatial_index import Box, GridIndex
+from tree_layout import TRUNK_BASE, LEVELS, TreeLayout, label_size, level
+
+MIN_NODE_PX = 2.0       # draw a depth in full once its nodes are this far apart on screen
+MAX_THINNING = 64       # below that, draw every k-th node of the depth, for k up to this (a power of two)
+LABEL_NODE_PX = 14.0    # label a depth once its nodes are this far apart on screen
+MARGIN_PX = 64          # drawn past the window edge, so short drags need no new items
+LABEL_CELL_PX = 64      # screen-space grid for label collisions
+ZOOM_STEP = 1.25
+MAX_ZOOM = 50.0         # screen pixels per layout unit
+PAN_STEP_PX = 120
+FRAME_MS = 16           # pan/zoom events are coalesced into one redraw per frame
+DOT_PX = 6
+BACKGROUND = "#0a0a15"
+
+
+class Camera:
+    """Layout (y up) <-> window (y down) transform: centre (cx, cy), `scale` pixels per unit."""
+
+    def __init__(self, width: int, height: int, cx: float = 0.0, cy: float = 0.0, scale: float = 1.0):
+        self.width, self.height = width, height
+        self.cx, self.cy, self.scale = cx, cy, scale
+
+    def to_screen(self, x: float, y: float) -> Tuple[float, float]:
+        return (x - self.cx) * self.scale + self.width / 2, self.height / 2 - (y - self.cy) * self.scale
+
+    def to_world(self, sx: float, sy: float) -> Tuple[float, float]:
+        return (sx - self.width / 2) / self.scale + self.cx, self.cy - (sy - self.height / 2) / self.scale
+
+    def viewport(self, margin_px: float = 0) -> Box:
+        half_w = (self.width / 2 + margin_px) / self.scale
+        half_h = (self.height / 2 + margin_px) / self.scale
+        return self.cx - half_w, self.cy - half_h, self.cx + half_w, self.cy + half_h
+
+    def fit(self, extent: float) -> None:
+        self.cx, self.cy = 0.0, 0.0
+        self.scale = min(self.width, self.height) / (2.1 * max(extent, 1.0))
+
+
+def median(values: List[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+class ViewModel:
+    """What to draw for a camera: the viewport query and level of detail, without Tk."""
+
+    def __init__(self, layout: TreeLayout):
+        self.layout = layout
+        x, y, lx, ly, parent, depth = layout.x, layout.y, layout.label_x, layout.label_y, layout.parent, layout.depth
+        by_depth: Dict[int, List[int]] = {}
+        for i in range(1, len(layout)):
+            by_depth.setdefault(depth[i], []).append(i)
+        self.max_depth = max(by_depth, default=0)
+        # typical distance between neighbouring nodes (consecutive in preorder) and branch length, per depth
+        self.spacing = [0.0] * (self.max_depth + 1)
+        self.grids: List[List[GridIndex]] = [[]]   # [depth][j]: every 2**j-th node of the depth
+        for d in range(1, self.max_depth + 1):
+            nodes = by_depth.get(d, [])
+            gaps = [math.hypot(x[b] - x[a], y[b] - y[a]) for a, b in zip(nodes, nodes[1:])]
+            self.spacing[d] = median([g for g in gaps if g > 0])
+            reach = median([math.hypot(x[i] - x[parent[i]], y[i] - y[parent[i]]) for i in nodes])
+            pyramid, k = [], 1
+            while k <= MAX_THINNING and (k == 1 or k // 2 < len(nodes)):
+                # a path crosses two or three cells; a cell holds about sixteen drawn nodes
+                cell = max(16 * k * self.spacing[d], reach, 1.0)
+                if pyramid and pyramid[-1].cell == cell:
+                    grid = pyramid[-1].subset(set(nodes[::k]))
+                else:
+                    grid = GridIndex(cell)
+                    for i in nodes[::k]:
+                        p = parent[i]
+                        grid.insert_path(i, ((x[p], y[p]), (x[i], y[i]), (lx[i], ly[i])))
+                pyramid.append(grid)
+                k *= 2
+            self.grids.append(pyramid)
+
+    def thinning(self, depth: int, scale: float) -> int:
+        """Draw every k-th node of `depth` at `scale`: 1 is all of them, 0 none. Families are always drawn."""
+        gap = self.spacing[depth] * scale
+        if depth == 1 or gap >= MIN_NODE_PX:
+            return 1
+        k = 1 << math.ceil(math.log2(MIN_NODE_PX / gap)) if gap > 0 else MAX_THINNING * 2
+        return k if k <= MAX_THINNING else 0
+
+    def lod_depth(self, scale: float) -> int:
+        """Deepest depth drawn, fully or thinned, at `scale`."""
+        d = 1
+        while d < self.max_depth and self.thinning(d + 1, scale):
+            d += 1
+        return d
+
+    def branches(self, camera: Camera) -> Set[int]:
+        """Nodes whose branch (or label anchor) is in view at a drawn depth, thinned where dense."""
+        box = camera.viewport(MARGIN_PX)
+        nodes: Set[int] = set()
+        for d in range(1, self.lod_depth(camera.scale) + 1):
+            pyramid = self.grids[d]
+            nodes.update(pyramid[min(self.thinning(d, camera.scale).bit_length() - 1, len(pyramid) - 1)].query(box))
+        return nodes
+
+    def labels(self, camera: Camera, nodes: Iterable[int], keep: Iterable[int] = ()) -> List[int]:
+        """Labels to show among `nodes`: at labelled depths, on screen, and not overlapping.
+
+        Labels in `keep` (already shown) are placed first, then shallow and big subtrees.
+        """
+        layout, keep = self.layout, set(keep)
+        depth, leaves, names = layout.depth, layout.leaves, layout.names
+        labelled = {d for d in range(1, self.max_depth + 1)
+                    if d == 1 or self.spacing[d] * camera.scale >= LABEL_NODE_PX}
+        candidates = [i for i in nodes if depth[i] in labelled and names[i]]
+        candidates.sort(key=lambda i: (i not in keep, depth[i], -leaves[i]))
+        grid = GridIndex(LABEL_CELL_PX)
+        shown = []
+        for i in candidates:
+            sx, sy = camera.to_screen(layout.label_x[i], layout.label_y[i])
+            if not (-MARGIN_PX <= sx <= camera.width + MARGIN_PX and -MARGIN_PX <= sy <= camera.height + MARGIN_PX):
+                continue
+            w, h = label_size(names[i], level(depth[i]).font)
+            box = (sx - w / 2, sy - h, sx + w / 2, sy)     # text hangs above its anchor
+            if not grid.overlaps(box):
+                grid.insert(i, box)
+                shown.append(i)
+        return shown
+
+
+class TreeViewer:
+    """Tk window: drag to pan, wheel or +/- to zoom, arrows to pan, Home to reset."""
+
+    def __init__(self, layout: TreeLayout, title: str, subtitle: str, width: int = 1600, height: int = 1000):
+        import tkinter as tk
+        self.layout = layout
+        self.model = ViewModel(layout)
+        self.root = tk.Tk()
+        self.root.title(title)
+        self.canvas = tk.Canvas(self.root, width=width, height=height, background=BACKGROUND, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.camera = Camera(width, height)
+        self.camera.fit(layout.extent())
+        self.lines: Dict[int, int] = {}
+        self.dots: Dict[int, int] = {}
+        self.texts: Dict[int, int] = {}
+        self._pending = None
+        self._rescaled = False
+        self._drag = (0, 0)
+        self.canvas.create_text(width / 2, 24, text=title, fill="#FFFFFF", font=("Arial", 18, "bold"), tags="hud")
+        self.canvas.create_text(width / 2, 48, text=subtitle, fill="#FFFFFF", font=("Arial", 11, "normal"),
+                                tags="hud")
+        self.status = self.canvas.create_text(10, height - 10, anchor="sw", fill="#888888",
+                                              font=("Arial", 9, "normal"), tags="hud")
+        self.bind()
+        self.reset()
+
+    def bind(self) -> None:
+        c = self.canvas
+        c.bind("<ButtonPress-1>", lambda e: setattr(self, "_drag", (e.x, e.y)))
+        c.bind("<B1-Motion>", self.on_drag)
+        c.bind("<MouseWheel>", lambda e: self.zoom(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        c.bind("<Button-4>", lambda e: self.zoom(ZOOM_STEP, e.x, e.y))
+        c.bind("<Button-5>", lambda e: self.zoom(1 / ZOOM_STEP, e.x, e.y))
+        c.bind("<Configure>", self.on_resize)
+        r = self.root
+        r.bind("<Left>", lambda e: self.pan(PAN_STEP_PX, 0))
+        r.bind("<Right>", lambda e: self.pan(-PAN_STEP_PX, 0))
+        r.bind("<Up>", lambda e: self.pan(0, PAN_STEP_PX))
+        r.bind("<Down>", lambda e: self.pan(0, -PAN_STEP_PX))
+        for key in ("<plus>", "<equal>", "<KP_Add>"):
+            r.bind(key, lambda e: self.zoom(ZOOM_STEP, self.camera.width / 2, self.camera.height / 2))
+        for key in ("<minus>", "<KP_Subtract>"):
+            r.bind(key, lambda e: self.zoom(1 / ZOOM_STEP, self.camera.width / 2, self.camera.height / 2))
+        r.bind("<Home>", lambda e: self.reset())
+
+    # -- camera moves: transform what is on the canvas now, redraw the difference next frame
+
+    def on_drag(self, event) -> None:
+        x0, y0 = self._drag
+        self._drag = (event.x, event.y)
+        self.pan(event.x - x0, event.y - y0)
+
+    def pan(self, dx: float, dy: float) -> None:
+        self.canvas.move("world", dx, dy)
+        self.camera.cx -= dx / self.camera.scale
+        self.camera.cy += dy / self.camera.scale
+        self.schedule()
+
+    def zoom(self, factor: float, sx: float, sy: float) -> None:
+        cam = self.camera
+        lowest = min(cam.width, cam.height) / (4 * max(self.layout.extent(), 1.0))
+        factor = min(max(cam.scale * factor, lowest), MAX_ZOOM) / cam.scale
+        if factor == 1:
+            return
+        wx, wy = cam.to_world(sx, sy)
+        cam.scale *= factor
+        cam.cx = wx - (sx - cam.width / 2) / cam.scale
+        cam.cy = wy + (sy - cam.height / 2) / cam.scale
+        self.canvas.scale("world", sx, sy, factor, factor)
+        self._rescaled = True
+        self.schedule()
+
+    def on_resize(self, event) -> None:
+        cam = self.camera
+        if (event.width, event.height) == (cam.width, cam.height):
+            return
+        # keep the camera centre in the middle of the window
+        self.canvas.move("world", (event.width - cam.width) / 2, (event.height - cam.height) / 2)
+        self.canvas.move("hud", (event.width - cam.width) / 2, 0)
+        self.canvas.coords(self.status, 10, event.height - 10)
+        cam.width, cam.height = event.width, event.height
+        self.schedule()
+
+    def reset(self) -> None:
+        self.canvas.delete("world")
+        self.lines.clear()
+        self.dots.clear()
+        self.texts.clear()
+        self.camera.fit(self.layout.extent())
+        if self.layout.kind == "fan":
+            self.canvas.create_line(*self.camera.to_screen(*TRUNK_BASE),
+                                    *self.camera.to_screen(self.layout.x[0], self.layout.y[0]),
+                                    width=LEVELS[0].width, fill=self.layout.palette[self.layout.color[0]],
+                                    capstyle="round", tags="world")
+        self.schedule()
+
+    def schedule(self) -> None:
+        if self._pending is None:
+            self._pending = self.root.after(FRAME_MS, self.sync)
+
+    # -- redraw: create and delete only what changed
+
+    def sync(self) -> None:
+        self._pending = None
+        start = time.perf_counter()
+        cam, layout, canvas = self.camera, self.layout, self.canvas
+        want = self.model.branches(cam)
+        for i in self.lines.keys() - want:
+            canvas.delete(self.lines.pop(i))
+            if i in self.dots:
+                canvas.delete(self.dots.pop(i))
+        if self._rescaled:   # canvas.scale() grew the dots too; put them back to their pixel size
+            for i, item in self.dots.items():
+                sx, sy = cam.to_screen(layout.x[i], layout.y[i])
+                canvas.coords(item, sx - DOT_PX / 2, sy - DOT_PX / 2, sx + DOT_PX / 2, sy + DOT_PX / 2)
+            self._rescaled = False
+        for i in want - self.lines.keys():
+            p, color = layout.parent[i], layout.palette[layout.color[i]]
+            sx, sy = cam.to_screen(layout.x[i], layout.y[i])
+            self.lines[i] = canvas.create_line(*cam.to_screen(layout.x[p], layout.y[p]), sx, sy,
+                                               width=level(layout.depth[i]).width, fill=color,
+                                               capstyle="round", tags="world")
+            if layout.is_leaf(i):
+                self.dots[i] = canvas.create_oval(sx - DOT_PX / 2, sy - DOT_PX / 2, sx + DOT_PX / 2,
+                                                  sy + DOT_PX / 2, fill=color, outline="", tags="world")
+        shown = set(self.model.labels(cam, want, self.texts))
+        for i in self.texts.keys() - shown:
+            canvas.delete(self.texts.pop(i))
+        for i in shown - self.texts.keys():
+            family, points, style = level(layout.depth[i]).font
+            self.texts[i] = canvas.create_text(*cam.to_screen(layout.label_x[i], layout.label_y[i]),
+                                               text=layout.names[i], anchor="s", font=(family, points, style),
+                                               fill=layout.palette[layout.color[i]], tags="world")
+        canvas.tag_raise("hud")
+        elapsed = (time.perf_counter() - start) * 1000
+        canvas.itemconfigure(self.status, text=(
+            f"{len(self.lines):,} branches, {len(self.texts):,} labels drawn of {len(layout) - 1:,} nodes"
+            f"  ·  depth ≤ {self.model.lod_depth(cam.scale)}  ·  zoom {cam.scale:.3g}  ·  {elapsed:.1f} ms"))
+
+    def run(self) -> None:
+        self.root.mainloop()
+
+
+def run_viewer(layout: TreeLayout, title: str, subtitle: str) -> None:
+    TreeViewer(layout, title, subtitle).run()
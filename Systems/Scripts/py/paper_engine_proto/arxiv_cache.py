@@ -0,0 +1,218 @@
+"""
+arXiv Response Cache
+--------------------
+Persistent on-disk cache for arXiv Atom responses used by paper_engine.py.
+- Keyed by the normalized query URL built in fetch_arxiv.
+- Fresh entries (younger than the TTL) are served without any network call.
+- Stale entries are revalidated with ETag / Last-Modified (HTTP 304).
+- Stores parsed Paper records, so cache hits skip XML parsing entirely.
+- Pages the streaming parser stopped reading early record how far back they
+  are complete ("floor"); they only serve requests for that window or newer.
+- Size-bounded: least-recently-used entries are evicted past max_bytes.
+- Also memoizes per-paper summaries (paper_summary.py) by arXiv ID, each
+  checked against a fingerprint of the abstract it was made from, and keeps
+  the query planner's per-topic result rates (query_planner.py).
+"""
+
+import datetime as dt
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "paper_engine", "arxiv_cache.sqlite3"
+)
+DEFAULT_TTL = 3600                 # seconds; arXiv listings update daily
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHE_VERSION = 3                  # bump when the pickled record type changes
+MAX_SUMMARIES = 50000              # memoized summaries kept (least recently used go first)
+SQL_BATCH = 500                    # IDs per IN (...) query, under SQLite's parameter limit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url           TEXT PRIMARY KEY,
+    payload       BLOB NOT NULL,
+    size          INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    fetched_at    REAL NOT NULL,
+    accessed_at   REAL NOT NULL,
+    floor         TEXT
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS summaries (
+    id          TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    summary     TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_lru ON summaries (accessed_at);
+CREATE TABLE IF NOT EXISTS topic_rates (
+    topic       TEXT PRIMARY KEY,
+    rate        REAL NOT NULL,
+    observed_at REAL NOT NULL
+);
+"""
+
+
+class CacheEntry(NamedTuple):
+    papers: List[Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    floor: Optional[dt.datetime] = None   # None: the whole page is stored
+
+    def covers(self, cutoff: Optional[dt.datetime]) -> bool:
+        """True if this entry holds every record at or after `cutoff`."""
+        return self.floor is None or (cutoff is not None and cutoff >= self.floor)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key: lower-case scheme/host, sorted query parameters."""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urllib.parse.urlencode(sorted(query)),
+        ""
+    ))
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of parsed Atom pages. Safe to share across threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            # Written by an older record format; cheaper to refetch than migrate
+            self._db.execute("DROP TABLE IF EXISTS responses")
+            self._db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self._db.executescript(SCHEMA)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, etag, last_modified, fetched_at, floor FROM responses WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            self._db.commit()
+        payload, etag, last_modified, fetched_at, floor = row
+        return CacheEntry(pickle.loads(payload), etag, last_modified, fetched_at,
+                          dt.datetime.fromisoformat(floor) if floor else None)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return (time.time() - entry.fetched_at) < self.ttl
+
+    def put(self, url: str, papers: List[Any], etag: Optional[str] = None,
+            last_modified: Optional[str] = None, floor: Optional[dt.datetime] = None) -> None:
+        payload = pickle.dumps(papers, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), payload, len(payload), etag, last_modified, now, now,
+                 floor.isoformat() if floor else None)
+            )
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                             (now, now, normalize_url(url)))
+            self._db.commit()
+
+    def get_summaries(self, sources: Dict[str, str]) -> Dict[str, str]:
+        """Memoized summaries for {paper ID: source fingerprint}; IDs stored for another source are left out."""
+        ids = list(sources)
+        hits: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(ids), SQL_BATCH):
+                chunk = ids[i:i + SQL_BATCH]
+                rows = self._db.execute(
+                    f"SELECT id, source, summary FROM summaries WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                hits.update((pid, summary) for pid, source, summary in rows if sources[pid] == source)
+            if hits:
+                now = time.time()
+                self._db.executemany("UPDATE summaries SET accessed_at = ? WHERE id = ?",
+                                     [(now, pid) for pid in hits])
+                self._db.commit()
+        return hits
+
+    def put_summaries(self, summaries: Dict[str, Tuple[str, str]]) -> None:
+        """Store {paper ID: (source fingerprint, summary)}, replacing older ones."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                                 [(pid, source, summary, now) for pid, (source, summary) in summaries.items()])
+            self._db.execute("DELETE FROM summaries WHERE id IN "
+                             "(SELECT id FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                             (MAX_SUMMARIES,))
+            self._db.commit()
+
+    def get_topic_rates(self, topics: List[str]) -> Dict[str, float]:
+        """Stored results-per-day estimates for the topics that have one."""
+        rates: Dict[str, float] = {}
+        with self._lock:
+            for i in range(0, len(topics), SQL_BATCH):
+                chunk = topics[i:i + SQL_BATCH]
+                rates.update(self._db.execute(
+                    f"SELECT topic, rate FROM topic_rates WHERE topic IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return rates
+
+    def put_topic_rates(self, rates: Dict[str, float]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO topic_rates VALUES (?, ?, ?)",
+                                 [(topic, rate, now) for topic, rate in rates.items()])
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("DELETE FROM summaries")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
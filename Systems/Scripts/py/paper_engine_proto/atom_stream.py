@@ -0,0 +1,105 @@
+"""
+Streaming arXiv Atom Parser
+---------------------------
+Incremental alternative to feedparser for arXiv API responses.
+- Feeds response chunks into an XMLPullParser and yields one paper record per <entry>.
+- Each finished <entry> element is discarded, so memory stays flat on 2,000-result pages.
+- Stops reading as soon as an entry predates the cutoff (results are newest-first).
+
+Records are paper_model.Paper objects, like paper_engine.entry_to_paper returns.
+"""
+
+import datetime as dt
+import re
+import xml.etree.ElementTree as ET
+from typing import List, Iterable, Iterator, Optional, Tuple
+
+from paper_model import Paper
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+ARXIV_ID_RE = re.compile(r"(?:abs|pdf)/(.+?)(?:v\d+)?(?:\.pdf)?$")
+
+ParseError = ET.ParseError
+
+
+def arxiv_id(url: str) -> str:
+    """Version-less arXiv identifier from an abs/pdf URL (2509.24693v1 -> 2509.24693)."""
+    m = ARXIV_ID_RE.search(url or "")
+    return m.group(1) if m else (url or "")
+
+
+def parse_timestamp(text: Optional[str]) -> Optional[dt.datetime]:
+    """'2025-09-29T17:59:59Z' -> naive UTC datetime (what feedparser's *_parsed gives)."""
+    if not text:
+        return None
+    try:
+        return dt.datetime.strptime(text.strip()[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return None
+
+
+def entry_record(entry: ET.Element) -> Paper:
+    published = (parse_timestamp(entry.findtext(ATOM + "published"))
+                 or parse_timestamp(entry.findtext(ATOM + "updated"))
+                 or dt.datetime.utcnow())
+    link, pdf = "", None
+    for el in entry.iterfind(ATOM + "link"):
+        if el.get("type") == "application/pdf" and pdf is None:
+            pdf = el.get("href")
+        elif el.get("rel", "alternate") == "alternate" and not link:
+            link = el.get("href", "")
+    cat = entry.find(ARXIV + "primary_category")
+    return Paper(
+        id=arxiv_id(entry.findtext(ATOM + "id") or link),
+        title=(entry.findtext(ATOM + "title") or "").strip(),
+        summary=(entry.findtext(ATOM + "summary") or "").strip(),
+        published=published,
+        link=link,
+        pdf=pdf,
+        authors=[a.findtext(ATOM + "name", "").strip() for a in entry.iterfind(ATOM + "author")],
+        primary_category=cat.get("term", "") if cat is not None else "",
+        doi=(entry.findtext(ARXIV + "doi") or "").strip() or None
+    )
+
+
+class EntryStream:
+    """Iterate records as each </entry> arrives from `chunks`.
+
+    Iteration ends early at the first entry older than `cutoff`; `truncated`
+    then tells callers the rest of the body was never read. Raises
+    ParseError on malformed XML.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], cutoff: Optional[dt.datetime] = None):
+        self.chunks = chunks
+        self.cutoff = cutoff
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Paper]:
+        parser = ET.XMLPullParser(events=("start", "end"))
+        root = None
+        for chunk in self.chunks:
+            parser.feed(chunk)
+            for event, el in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = el
+                    continue
+                if el.tag != ATOM + "entry":
+                    continue
+                record = entry_record(el)
+                root.remove(el)  # drop the subtree; only the record survives
+                if self.cutoff and record.published < self.cutoff:
+                    self.truncated = True
+                    return
+                yield record
+        parser.close()
+
+
+def parse_chunks(chunks: Iterable[bytes],
+                 cutoff: Optional[dt.datetime] = None) -> Tuple[List[Paper], bool]:
+    """Records at or after `cutoff`, plus whether the whole document was read."""
+    stream = EntryStream(chunks, cutoff)
+    papers = list(stream)
+    return papers, not stream.truncated
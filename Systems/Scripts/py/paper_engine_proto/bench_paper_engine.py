@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Paper Engine Benchmarks
+-----------------------
+Time each paper_engine.py stage on its own against synthetic arXiv data.
+- Fixtures: deterministic Atom feeds of 100, 10k and 100k entries (generated, not stored).
+- Parse runs fetch_arxiv end to end against a local stand-in of the arXiv API.
+- Reports throughput and p50/p99 latency per stage, plus the peak traced allocation
+  of one in-process run (tracemalloc) or the peak RSS of each CLI process.
+- Writes JSON that can be diffed against a run from another commit.
+- --startup instead times a fresh CLI process: `import paper_engine` as
+  reported by `python -X importtime`, `--help`, and cache-served digests.
+
+Usage:
+  python bench_paper_engine.py
+  python bench_paper_engine.py --sizes 100 10000 --repeat 10 --out bench.json
+  python bench_paper_engine.py --out after.json --compare before.json
+  python bench_paper_engine.py --startup --repeat 20
+"""
+
+import argparse
+import datetime as dt
+import http.server
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+import zlib
+from typing import List, Dict, Any, Callable, Optional
+from xml.sax.saxutils import escape
+
+import paper_engine as pe
+from ranking import TermIndex, bm25_rank
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+DEFAULT_REPEAT = 5
+FEEDPARSER_MAX = 10_000   # feedparser is too slow to repeat at 100k
+STARTUP_FIXTURE = 100     # entries behind the cache-served CLI runs
+IMPORT_TOP = 8            # heaviest direct imports listed by --startup
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOPICS = ["neural language models", "graph learning", "cortex"]
+
+WORDS = ("neural network language model brain cortex graph learning transformer attention "
+         "dataset benchmark protein quantum sparse robust inference bayesian causal signal "
+         "retrieval speech vision policy agent reward latent diffusion spectral kernel").split()
+CATEGORIES = ["cs.CL", "cs.LG", "cs.AI", "q-bio.NC", "stat.ML", "cs.CV", "quant-ph"]
+
+FEED_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">\n')
+FEED_TAIL = "</feed>\n"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark paper_engine.py stages")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Fixture sizes (entries)")
+    p.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per stage")
+    p.add_argument("--out", type=str, default=None, help="Write JSON results here (default: stdout)")
+    p.add_argument("--compare", type=str, default=None, help="Earlier JSON results to diff against")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--startup", action="store_true",
+                   help="Time CLI startup (import, --help, cache-served digests) instead of stages")
+    return p.parse_args()
+
+
+def make_entries(n: int, seed: int) -> List[bytes]:
+    """n Atom <entry> elements, newest first, spread over the last 30 days."""
+    rng = random.Random(seed)
+    now = dt.datetime.utcnow()
+    step = dt.timedelta(days=30) / max(1, n)
+    entries = []
+    for i in range(n):
+        published = (now - step * i).strftime("%Y-%m-%dT%H:%M:%SZ")
+        title = " ".join(rng.choices(WORDS, k=rng.randint(6, 14))).capitalize()
+        summary = ". ".join(" ".join(rng.choices(WORDS, k=rng.randint(12, 25))) for _ in range(rng.randint(4, 8)))
+        authors = "".join(f"<author><name>Author {rng.randint(1, 5000)}</name></author>"
+                          for _ in range(rng.randint(1, 6)))
+        aid = f"{2500 + i // 100000}.{i % 100000:05d}"
+        entries.append((
+            f"<entry><id>http://arxiv.org/abs/{aid}v1</id><updated>{published}</updated>"
+            f"<published>{published}</published><title>{escape(title)}</title>"
+            f"<summary>{escape(summary)}.</summary>{authors}"
+            f'<link href="http://arxiv.org/abs/{aid}v1" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{aid}v1" rel="related" type="application/pdf"/>'
+            f'<arxiv:primary_category term="{rng.choice(CATEGORIES)}" scheme="http://arxiv.org/schemas/atom"/>'
+            f"</entry>\n"
+        ).encode("utf-8"))
+    return entries
+
+
+def feed_bytes(entries: List[bytes]) -> bytes:
+    return FEED_HEAD.encode() + b"".join(entries) + FEED_TAIL.encode()
+
+
+class StandIn:
+    """Local arXiv API stand-in slicing a fixture by start/max_results, with ETags for revalidation."""
+
+    def __init__(self, entries: List[bytes]):
+        fixture = entries
+        stand_in = self
+        self.requests = 0
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                q = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+                start = int(q.get("start", ["0"])[0])
+                size = int(q.get("max_results", ["10"])[0])
+                body = feed_bytes(fixture[start:start + size])
+                etag = '"%08x"' % zlib.crc32(body)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/query"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def rss_kb(usage: resource.struct_rusage) -> int:
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss  # macOS reports bytes
+
+
+def traced_peak_kb(fn: Callable[[], int]) -> int:
+    """Peak Python heap of one extra run of fn, so the timed runs stay untraced."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def measure(stage: str, size: int, repeat: int, fn: Callable[[], int], trace: bool = True) -> Dict[str, Any]:
+    """Run fn `repeat` times; fn returns how many items it processed."""
+    fn()  # warm-up: imports, template compile, connection setup
+    times, items = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items = fn()
+        times.append(time.perf_counter() - t0)
+    return summarize(stage, size, items, times, alloc_kb=traced_peak_kb(fn) if trace else None)
+
+
+def summarize(stage: str, size: int, items: int, times: List[float],
+              alloc_kb: Optional[int] = None, rss_kb: Optional[int] = None) -> Dict[str, Any]:
+    p50 = percentile(times, 50)
+    repeat = len(times)
+    return {
+        "stage": stage,
+        "size": size,
+        "items": items,
+        "repeat": repeat,
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(percentile(times, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(times) * 1000, 3),
+        "throughput_per_s": round(items / p50, 1) if p50 > 0 else None,
+        "peak_alloc_kb": alloc_kb,   # in-process stages: tracemalloc peak of one run
+        "peak_rss_kb": rss_kb,       # CLI stages: largest max RSS among this stage's processes
+    }
+
+
+def bench_size(size: int, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    entries = make_entries(size, seed)
+    server = StandIn(entries)
+    results = []
+    try:
+        queries = [TOPICS[:k] for k in range(1, len(TOPICS) + 1)] * max(1, size // 3)
+        results.append(measure("query_build", size, repeat,
+                               lambda: len([pe.arxiv_search_query(q) for q in queries])))
+
+        def fetch(parser: str) -> List[pe.Paper]:
+            return pe.fetch_arxiv(TOPICS, days=31, max_results=pe.ARXIV_MAX_PAGE, harvest=True,
+                                  max_pages=size // pe.ARXIV_MAX_PAGE + 2, api_url=server.url,
+                                  delay=0.0, parser=parser, plan="combined")
+
+        results.append(measure("parse_stream", size, repeat, lambda: len(fetch("stream"))))
+        if size <= FEEDPARSER_MAX:
+            results.append(measure("parse_feedparser", size, repeat, lambda: len(fetch("feedparser"))))
+
+        papers = fetch("stream")
+
+        def rank_simple() -> int:
+            pe.simple_rank(papers, TOPICS, top_k=3)
+            return len(papers)
+
+        def rank_bm25() -> int:
+            bm25_rank(papers, TOPICS, top_k=3)
+            return len(papers)
+
+        def bm25_index() -> int:
+            TermIndex(papers)
+            return len(papers)
+
+        index = TermIndex(papers)
+
+        def rank_bm25_shared() -> int:
+            bm25_rank(papers, TOPICS, top_k=3, index=index)  # one batch profile over a prebuilt index
+            return len(papers)
+
+        def blurbs() -> int:
+            pe.summarize_papers(papers)  # no cache: every run summarizes from scratch
+            return len(papers)
+
+        def render() -> int:
+            pe.render_digest(papers, TOPICS, "intermediate")
+            return len(papers)
+
+        results.append(measure("rank_simple", size, repeat, rank_simple))
+        results.append(measure("rank_bm25", size, repeat, rank_bm25))
+        results.append(measure("bm25_index", size, repeat, bm25_index))
+        results.append(measure("rank_bm25_shared", size, repeat, rank_bm25_shared))
+        results.append(measure("blurbs", size, repeat, blurbs))
+        results.append(measure("render_digest", size, repeat, render))
+    finally:
+        server.close()
+    return results
+
+
+def import_times(module: str = "paper_engine"):
+    """`python -X importtime -c "import <module>"` in a fresh interpreter.
+
+    Returns (cumulative microseconds per module, direct imports per module).
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, cwd=HERE, check=True)
+    times: Dict[str, int] = {}
+    children: Dict[str, List[str]] = {}
+    pending: Dict[int, List[str]] = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, raw = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # column header
+        name = raw.strip()
+        depth = (len(raw) - len(raw.lstrip()) - 1) // 2
+        # Children are reported before their parent, one level deeper
+        children[name] = pending.pop(depth + 1, [])
+        pending.setdefault(depth, []).append(name)
+        times[name] = int(cumulative)
+    return times, children
+
+
+def bench_startup(repeat: int, seed: int) -> List[Dict[str, Any]]:
+    """Fresh-process costs: what a cron run pays before and around the actual work."""
+    samples = [import_times() for _ in range(repeat + 1)][1:]  # first one warms the disk cache
+    times, children = samples[-1]
+    results = [summarize("import", 0, 1, [t["paper_engine"] / 1e6 for t, _ in samples])]
+    heaviest = sorted(children["paper_engine"], key=times.get, reverse=True)[:IMPORT_TOP]
+    sys.stderr.write("Heaviest imports: " + ", ".join(f"{m} {times[m] / 1000:.1f} ms" for m in heaviest) + "\n")
+
+    script = os.path.join(HERE, "paper_engine.py")
+
+    rss: List[int] = []
+
+    def python(*argv: str) -> int:
+        proc = subprocess.Popen([sys.executable, *argv], cwd=HERE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # wait4 gives this child's own rusage; RUSAGE_CHILDREN would be the max over all children so far
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+        rss.append(rss_kb(usage))
+        return 1
+
+    def measure_cli(stage: str, size: int, *argv: str) -> Dict[str, Any]:
+        rss.clear()
+        r = measure(stage, size, repeat, lambda: python(*argv), trace=False)
+        r["peak_rss_kb"] = max(rss)
+        return r
+
+    # The bare interpreter is the floor every CLI number below includes
+    results.append(measure_cli("interpreter", 0, "-c", "pass"))
+    results.append(measure_cli("cli_help", 0, script, "--help"))
+    server = StandIn(make_entries(STARTUP_FIXTURE, seed))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # measure()'s warm-up run fills the cache; the timed runs are served from it
+            common = ["--topics", ", ".join(TOPICS), "--days", "31", "--api-url", server.url, "--delay", "0",
+                      "--cache", os.path.join(tmp, "cache.sqlite3"), "--query-plan", "combined"]
+            results.append(measure_cli("cli_cached_md", STARTUP_FIXTURE, script, *common,
+                                       "--outfile", os.path.join(tmp, "digest.md")))
+            results.append(measure_cli("cli_cached_json", STARTUP_FIXTURE, script, *common,
+                                       "--output", os.path.join(tmp, "digest.json")))
+    finally:
+        server.close()
+    if server.requests != 1:
+        sys.stderr.write(f"warning: {server.requests} upstream requests; cached runs were not cache-served\n")
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def megabytes(kb: Optional[int]) -> str:
+    return "-" if kb is None else f"{kb / 1024:.1f}"
+
+
+def print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[Any, Dict[str, Any]]] = None):
+    header = (f"{'stage':<18}{'size':>8}{'p50 ms':>12}{'p99 ms':>12}{'items/s':>14}"
+              f"{'peak alloc MB':>15}{'peak RSS MB':>13}")
+    if baseline:
+        header += f"{'p50 vs base':>13}"
+    sys.stderr.write(header + "\n" + "-" * len(header) + "\n")
+    for r in results:
+        line = (f"{r['stage']:<18}{r['size']:>8}{r['p50_ms']:>12.2f}{r['p99_ms']:>12.2f}"
+                f"{(r['throughput_per_s'] or 0):>14,.0f}{megabytes(r.get('peak_alloc_kb')):>15}"
+                f"{megabytes(r.get('peak_rss_kb')):>13}")
+        base = (baseline or {}).get((r["stage"], r["size"]))
+        if base and base["p50_ms"]:
+            line += f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:>+12.1f}%"
+        sys.stderr.write(line + "\n")
+
+
+def print_rankers(results: List[Dict[str, Any]]):
+    """p50 of each BM25 stage relative to simple_rank at the same size."""
+    p50 = {(r["stage"], r["size"]): r["p50_ms"] for r in results}
+    for (stage, size), ms in p50.items():
+        simple = p50.get(("rank_simple", size))
+        if stage.startswith(("rank_bm25", "bm25_")) and simple:
+            sys.stderr.write(f"{stage} / rank_simple at {size:,}: {ms / simple:.2f}x\n")
+
+
+def main():
+    args = parse_args()
+    results = []
+    if args.startup:
+        sys.stderr.write("Benchmarking CLI startup...\n")
+        results.extend(bench_startup(max(1, args.repeat), args.seed))
+    for size in [] if args.startup else args.sizes:
+        sys.stderr.write(f"Benchmarking {size:,} entries...\n")
+        results.extend(bench_size(size, max(1, args.repeat), args.seed))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {(r["stage"], r["size"]): r for r in json.load(f)["results"]}
+    print_table(results, baseline)
+    print_rankers(results)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        sys.stderr.write(f"Wrote {args.out}\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
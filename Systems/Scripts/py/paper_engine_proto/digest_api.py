@@ -0,0 +1,187 @@
+"""
+Digest HTTP API
+---------------
+Serve digests on demand for other services, used by `paper_engine.py api`.
+- GET /digest?topics=a,b&n=3&days=14[&level=...][&ranker=...][&format=md|json|html|rss]
+- GET /healthz: liveness plus request / coalescing counters.
+- All upstream fetches run on one background event loop, so they share one
+  pooled client, its rate limiter and its response cache.
+- Identical concurrent requests are coalesced: a burst of the same query
+  makes one upstream fetch and every caller gets its result.
+"""
+
+import asyncio
+import http.server
+import json
+import sys
+import threading
+import traceback
+import urllib.parse
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List, Dict, Any, Awaitable, Callable, Hashable, NamedTuple, Optional, Tuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_TIMEOUT = 120.0
+MAX_N = 50
+MAX_DAYS = 3650
+
+CONTENT_TYPES = {
+    "md": "text/markdown; charset=utf-8",
+    "json": "application/json",
+    "html": "text/html; charset=utf-8",
+    "rss": "application/rss+xml; charset=utf-8",
+}
+
+
+class DigestRequest(NamedTuple):
+    topics: Tuple[str, ...]   # normalized and sorted, so equivalent queries coalesce
+    n: int
+    days: int
+    level: Optional[str]
+    ranker: Optional[str]
+    format: str
+
+
+class UpstreamError(Exception):
+    """The digest could not be built from upstream data (maps to 502)."""
+
+
+def bounded_int(q: Dict[str, List[str]], name: str, default: int, high: int) -> int:
+    raw = q.get(name, [str(default)])[-1]
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {raw!r}")
+    if not 1 <= value <= high:
+        raise ValueError(f"{name} must be between 1 and {high}")
+    return value
+
+
+def parse_digest_query(query: str, accept: str = "") -> DigestRequest:
+    """Validate /digest parameters. Raises ValueError with a client-facing message."""
+    q = urllib.parse.parse_qs(query)
+    topics = {" ".join(t.lower().split()) for raw in q.get("topics", []) for t in raw.split(",")}
+    topics.discard("")
+    if not topics:
+        raise ValueError("topics is required, e.g. ?topics=neuroscience,robotics")
+    fmt = q.get("format", ["json" if "application/json" in accept else "md"])[-1]
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"format must be one of: {', '.join(CONTENT_TYPES)}")
+    return DigestRequest(
+        topics=tuple(sorted(topics)),
+        n=bounded_int(q, "n", 3, MAX_N),
+        days=bounded_int(q, "days", 30, MAX_DAYS),
+        level=q.get("level", [None])[-1],
+        ranker=q.get("ranker", [None])[-1],
+        format=fmt,
+    )
+
+
+class SingleFlight:
+    """Share one in-flight coroutine among identical concurrent callers.
+
+    Runs on a single event loop, so the in-flight table needs no lock.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, make: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # A caller giving up (timeout) must not cancel the fetch others are waiting on
+        return await asyncio.shield(task)
+
+
+class BackgroundLoop:
+    """An event loop on a daemon thread; other threads hand it coroutines."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="digest-api-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class DigestServer(http.server.ThreadingHTTPServer):
+    """HTTP front end; `make_digest(request) -> body` does the actual work.
+
+    make_digest raises ValueError for bad parameters (400), UpstreamError
+    when arXiv fails (502) and TimeoutError when it takes too long (504).
+    """
+
+    daemon_threads = True
+    request_queue_size = 128   # bursts are the point; the default backlog of 5 drops them
+
+    def __init__(self, address: Tuple[str, int], make_digest: Callable[[DigestRequest], str],
+                 stats: Optional[Callable[[], Dict[str, Any]]] = None):
+        super().__init__(address, DigestHandler)
+        self.make_digest = make_digest
+        self.stats = stats or dict
+        self.requests = 0
+        self._lock = threading.Lock()
+
+
+class DigestHandler(http.server.BaseHTTPRequestHandler):
+    server: DigestServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/healthz":
+            self.send_json(200, {"status": "ok", "requests": self.server.requests, **self.server.stats()})
+            return
+        if url.path != "/digest":
+            self.send_json(404, {"error": f"no route for {url.path}; try /digest?topics=..."})
+            return
+        with self.server._lock:
+            self.server.requests += 1
+        try:
+            req = parse_digest_query(url.query, self.headers.get("Accept", ""))
+            body = self.server.make_digest(req)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        except (TimeoutError, FutureTimeout):
+            self.send_json(504, {"error": "upstream fetch timed out"})
+        except UpstreamError as e:
+            self.send_json(502, {"error": str(e)})
+        except Exception:
+            sys.stderr.write(traceback.format_exc())
+            self.send_json(500, {"error": "internal error"})
+        else:
+            self.send_body(200, CONTENT_TYPES[req.format], body)
+
+    def send_json(self, status: int, payload: Dict[str, Any]):
+        self.send_body(status, CONTENT_TYPES["json"], json.dumps(payload))
+
+    def send_body(self, status: int, content_type: str, body: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass  # keep stderr for errors; put a reverse proxy in front for access logs
@@ -0,0 +1,211 @@
+"""
+Digest Output Sinks
+-------------------
+Render one ranked paper list into every output a profile asks for.
+- Formats: Markdown (the classic digest), HTML (email), JSON (dashboards), RSS 2.0 (feed readers).
+- The format is picked from the file extension: .md, .html, .json, .xml / .rss.
+- Templates are compiled once per process and cached as bytecode on disk, next to
+  the response cache (and not at all when caching is off).
+  Jinja itself is only imported once a template is rendered; JSON-only runs skip it.
+- Sinks are written in parallel. Each goes to a temp file that is renamed over
+  the target, so readers see the previous digest or the new one, never half of either.
+"""
+
+import datetime as dt
+import functools
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, TYPE_CHECKING
+
+from run_metrics import MeteredChunks, RunMetrics
+
+if TYPE_CHECKING:
+    import jinja2
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATES = {
+    "md": "digest_email.md.j2",
+    "html": "digest_email.html.j2",
+    "rss": "digest_feed.rss.j2",
+}
+EXTENSIONS = {
+    ".md": "md", ".markdown": "md",
+    ".html": "html", ".htm": "html",
+    ".json": "json",
+    ".xml": "rss", ".rss": "rss",
+}
+STDOUT = "-"
+# New digests get the mode open() would give them. The umask can only be read
+# by setting it, so that happens once here, before any writer threads start.
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+WRITE_BUFFER = 64 * 1024   # characters of rendered output gathered per write
+
+# Fallback when templates/digest_email.md.j2 is missing
+INLINE_TEMPLATE = """# Academic Paper Digest — {{ date }}
+
+**Topics:** {{ topics|join(', ') }}
+**Reading Level:** {{ level }}
+
+## Reading Guidance
+{{ guidance }}
+
+---
+
+{% for paper in papers %}
+## {{ loop.index }}. {{ paper.title }}
+
+**Authors:** {{ paper.authors|join(', ') }}
+**Published:** {{ paper.published.strftime('%Y-%m-%d') }}
+**Category:** {{ paper.primary_category }}
+
+### Abstract
+{{ paper.summary }}
+
+### Why It Matters
+{{ paper.why_it_matters }}
+
+**Links:**
+- [arXiv page]({{ paper.link }})
+{% if paper.pdf %}- [PDF]({{ paper.pdf }}){% endif %}
+
+---
+{% endfor %}
+"""
+
+
+class Sink(NamedTuple):
+    format: str
+    path: str   # STDOUT for the console
+
+
+def sink_for(path: str) -> Sink:
+    """Sink for an output path, by extension. Raises ValueError for unknown ones."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONS:
+        raise ValueError(f"Unknown output format for {path!r} (use one of: {', '.join(EXTENSIONS)})")
+    return Sink(EXTENSIONS[ext], path)
+
+
+def rfc822(value: dt.datetime) -> str:
+    """RSS date format; paper timestamps are naive UTC."""
+    import email.utils
+    return email.utils.format_datetime(value.replace(tzinfo=dt.timezone.utc))
+
+
+def template_cache_dir(cache_path: Optional[str]) -> Optional[str]:
+    """Bytecode directory beside a response cache database; None for no cache or an in-memory one."""
+    if not cache_path or cache_path == ":memory:":
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(os.path.expanduser(cache_path))), "templates")
+
+
+@functools.lru_cache(maxsize=None)
+def template_env(cache_dir: Optional[str] = None) -> "jinja2.Environment":
+    """One Jinja environment per process (and bytecode directory).
+
+    Compiled templates stay in the environment's in-memory cache (re-checked
+    against the file's mtime), and the bytecode cache in `cache_dir` lets the
+    next process skip compiling altogether. HTML and RSS templates autoescape.
+    """
+    import jinja2
+    bytecode_cache = None  # no cache_dir: compile in memory only
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+        except OSError:
+            pass  # read-only cache location: same as no cache_dir
+    loader = jinja2.ChoiceLoader([
+        jinja2.FileSystemLoader(TEMPLATE_DIR),
+        jinja2.DictLoader({TEMPLATES["md"]: INLINE_TEMPLATE}),
+    ])
+    env = jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache,
+                             autoescape=jinja2.select_autoescape(["html.j2", "rss.j2"]))
+    env.filters["rfc822"] = rfc822
+    return env
+
+
+def json_payload(context: Dict[str, Any]) -> Dict[str, Any]:
+    papers = []
+    for p in context["papers"]:
+        d = p.to_dict()
+        d["published"] = p.published.isoformat()
+        papers.append(d)
+    return {
+        "date": context["date"],
+        "topics": list(context["topics"]),
+        "level": context["level"],
+        "guidance": context["guidance"],
+        "papers": papers,
+    }
+
+
+def render_chunks(fmt: str, context: Dict[str, Any], template_cache: Optional[str] = None) -> Iterator[str]:
+    """Lazily rendered output for one format, chunk by chunk; `template_cache` is a bytecode directory."""
+    if fmt == "json":
+        return json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(json_payload(context))
+    return template_env(template_cache).get_template(TEMPLATES[fmt]).generate(**context)
+
+
+def write_chunks(chunks: Iterable[str], out) -> int:
+    """Encode and write in WRITE_BUFFER-sized pieces; returns bytes written."""
+    written = 0
+    pending: List[str] = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER:
+            written += out.write("".join(pending).encode("utf-8"))
+            pending, size = [], 0
+    return written + out.write("".join(pending).encode("utf-8"))
+
+
+def write_atomic(path: str, chunks: Iterable[str]) -> int:
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            written = write_chunks(chunks, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600; keep the replaced file's mode, or honour the umask for a new one
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o666 & ~UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return written
+
+
+def write_sink(sink: Sink, context: Dict[str, Any], metrics: Optional[RunMetrics] = None,
+               template_cache: Optional[str] = None) -> int:
+    metrics = metrics or RunMetrics()
+    with metrics.stage("render"):  # the first template of a process also pays for importing Jinja
+        chunks = MeteredChunks(render_chunks(sink.format, context, template_cache))  # time inside the template is "render"
+    t0 = time.perf_counter()
+    if sink.path == STDOUT:
+        sys.stdout.flush()  # raw bytes below bypass the text layer's buffer
+        written = write_chunks(chunks, sys.stdout.buffer) + sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        written = write_atomic(sink.path, chunks)
+    metrics.add_time("render", chunks.waited)
+    metrics.add_time("write", time.perf_counter() - t0 - chunks.waited)
+    metrics.incr("bytes_written", written)
+    return written
+
+
+def write_sinks(sinks: List[Sink], context: Dict[str, Any], metrics: Optional[RunMetrics] = None,
+                template_cache: Optional[str] = None) -> int:
+    """Render and write every sink from the same context, in parallel."""
+    if len(sinks) == 1:
+        return write_sink(sinks[0], context, metrics, template_cache)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(sinks)) as pool:
+        return sum(pool.map(lambda s: write_sink(s, context, metrics, template_cache), sinks))
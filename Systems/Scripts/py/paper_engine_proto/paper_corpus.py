@@ -0,0 +1,150 @@
+"""
+Paper Corpus — Local Store + Inverted Index
+-------------------------------------------
+Keeps every paper paper_engine.py fetches so digests can be served offline.
+- Append-only record store (SQLite): a paper is written once, keyed by arXiv ID.
+  Its DOI is kept too (and filled in later if a source only learns it then),
+  so offline digests merge sources by DOI like online ones.
+- Inverted index (SQLite FTS5) over title, abstract, authors and primary_category.
+- papers_for() answers "topics within a date window" the same way fetch_arxiv does.
+- search() answers ad-hoc queries, best matches first.
+"""
+
+import datetime as dt
+import json
+import os
+import sqlite3
+from typing import List, Any, Iterable, Optional
+
+from paper_model import Paper
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid            INTEGER PRIMARY KEY,
+    id               TEXT NOT NULL UNIQUE,
+    title            TEXT NOT NULL,
+    summary          TEXT NOT NULL,
+    published        TEXT NOT NULL,
+    link             TEXT,
+    pdf              TEXT,
+    authors          TEXT NOT NULL,
+    primary_category TEXT,
+    added_at         TEXT NOT NULL,
+    doi              TEXT
+);
+CREATE INDEX IF NOT EXISTS papers_published ON papers (published);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, summary, authors, primary_category,
+    content='papers', content_rowid='rowid'
+);
+"""
+
+COLUMNS = "p.id, p.title, p.summary, p.published, p.link, p.pdf, p.authors, p.primary_category, p.doi"
+
+
+def fts_phrase(words: Iterable[str]) -> str:
+    """AND of quoted terms, so user text never leaks FTS5 syntax."""
+    quoted = ['"' + w.replace('"', '""') + '"' for w in words if w]
+    return " AND ".join(quoted)
+
+
+def topics_match(topics: List[str]) -> str:
+    """FTS5 twin of arxiv_search_query: words AND'ed within a topic, topics OR'ed."""
+    parts = []
+    for t in topics:
+        phrase = fts_phrase(t.split())
+        if phrase:
+            parts.append(f"({phrase})")
+    return " OR ".join(parts)
+
+
+class PaperCorpus:
+    def __init__(self, path: str):
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+        if "doi" not in {row[1] for row in self._db.execute("PRAGMA table_info(papers)")}:
+            # Corpora written before DOIs were kept; source merging needs them offline too
+            self._db.execute("ALTER TABLE papers ADD COLUMN doi TEXT")
+
+    def add(self, papers: Iterable[Paper]) -> int:
+        """Append papers not stored yet; returns how many were new."""
+        now = dt.datetime.utcnow().isoformat(timespec="seconds")
+        added = 0
+        with self._db:
+            for p in papers:
+                if not p.id:
+                    continue
+                authors = json.dumps(list(p.authors), ensure_ascii=False)
+                cur = self._db.execute(
+                    "INSERT OR IGNORE INTO papers (id, title, summary, published, link, pdf, authors, "
+                    "primary_category, added_at, doi) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (p.id, p.title, p.summary, p.published.isoformat(), p.link, p.pdf, authors,
+                     p.primary_category, now, p.doi)
+                )
+                if cur.rowcount:
+                    self._db.execute(
+                        "INSERT INTO papers_fts (rowid, title, summary, authors, primary_category) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (cur.lastrowid, p.title, p.summary, authors, p.primary_category)
+                    )
+                    added += 1
+                elif p.doi:
+                    # Stored before any source knew its DOI
+                    self._db.execute("UPDATE papers SET doi = ? WHERE id = ? AND doi IS NULL", (p.doi, p.id))
+        return added
+
+    def _select(self, match: str, since: Optional[dt.datetime], order: str, limit: int) -> List[Paper]:
+        sql = f"SELECT {COLUMNS} FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid WHERE papers_fts MATCH ?"
+        params: List[Any] = [match]
+        if since:
+            sql += " AND p.published >= ?"
+            params.append(since.isoformat())
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return [row_to_paper(r) for r in self._db.execute(sql, params)]
+
+    def papers_for(self, topics: List[str], cutoff: dt.datetime, limit: int = 500) -> List[Paper]:
+        """Newest stored papers matching any topic, published at or after `cutoff`."""
+        match = topics_match(topics)
+        if not match:
+            return []
+        return self._select(match, cutoff, "p.published DESC", limit)
+
+    def search(self, text: str, limit: int = 10, since: Optional[dt.datetime] = None) -> List[Paper]:
+        """Best FTS5 (BM25) matches for free text, optionally within a window."""
+        match = fts_phrase(text.split())
+        if not match:
+            return []
+        return self._select(match, since, "papers_fts.rank", limit)
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def row_to_paper(row) -> Paper:
+    pid, title, summary, published, link, pdf, authors, primary_category, doi = row
+    return Paper(
+        id=pid,
+        title=title,
+        summary=summary,
+        published=dt.datetime.fromisoformat(published),
+        link=link or "",
+        pdf=pdf,
+        authors=json.loads(authors),
+        primary_category=primary_category or "",
+        doi=doi
+    )
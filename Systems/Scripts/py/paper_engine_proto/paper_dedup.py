@@ -0,0 +1,170 @@
+"""
+Paper De-duplication
+--------------------
+Near-duplicate clustering for paper_engine.py, run between fetching and ranking.
+- arXiv IDs are canonicalized ("arXiv:" prefix, case and version suffix dropped),
+  so two versions of one paper always land in one cluster.
+- Title + abstract are shingled into word 3-grams and sketched with
+  one-permutation MinHash (each shingle hash lands in one of SKETCH_BINS bins,
+  which keep their minimum).
+- LSH banding proposes candidate pairs in linear time; only those pairs are
+  compared, so tens of thousands of candidates never meet pairwise.
+- Candidates whose exact Jaccard similarity over shingles reaches the
+  threshold are merged (union-find). Each cluster is represented by its newest
+  member, and only representatives are ranked.
+
+Like ranking.TermIndex, a ClusterIndex can be built once over a batch run's
+whole candidate pool and shared by every profile.
+"""
+
+import itertools
+import re
+import zlib
+from collections import defaultdict
+from typing import List, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from paper_model import Paper
+from ranking import SMALL_POOL, tokenize
+
+DEDUP_THRESHOLD = 0.8    # Jaccard over shingles; re-versions and cross-lists score ~0.9
+SHINGLE = 3              # words per shingle
+SKETCH_BITS = 6
+SKETCH_BINS = 1 << SKETCH_BITS
+LSH_BANDS = 16           # 16 bands x 4 rows: pairs above ~0.5 similarity become candidates
+LSH_ROWS = SKETCH_BINS // LSH_BANDS
+BUCKET_PEERS = 8         # compare a bucket member with this many earlier ones, not all
+EMPTY = 1 << (63 - SKETCH_BITS)  # larger than any bin value (hashes are signed 64-bit)
+EMPTY_BAND = (EMPTY,) * LSH_ROWS
+
+VERSION_RE = re.compile(r"v\d+$")
+
+
+def canonical_id(pid: str) -> str:
+    """'arXiv:2401.01234v2' -> '2401.01234'; non-arXiv IDs are only trimmed and lowercased."""
+    pid = (pid or "").strip().lower()
+    if pid.startswith("arxiv:"):
+        pid = pid[len("arxiv:"):]
+    return VERSION_RE.sub("", pid)
+
+
+class WordCodes(dict):
+    """word -> CRC-32, filled on first lookup. Tuples of ints hash the same in
+    every process; tuples of str do not (PYTHONHASHSEED)."""
+
+    def __missing__(self, word: str) -> int:
+        code = self[word] = zlib.crc32(word.encode())
+        return code
+
+
+def shingle_hashes(text: str, codes: Optional[WordCodes] = None) -> List[int]:
+    """Signed 64-bit hashes of the word 3-grams of `text` (one shingle for shorter texts)."""
+    toks = list(map((WordCodes() if codes is None else codes).__getitem__, tokenize(text)))
+    if len(toks) < SHINGLE:
+        return [hash(tuple(toks))] if toks else []
+    return list(map(hash, zip(*(toks[i:] for i in range(SHINGLE)))))
+
+
+def sketch(hashes: Iterable[int]) -> Tuple[int, ...]:
+    """One-permutation MinHash: the low bits pick the bin, the rest compete for its minimum."""
+    bins = [EMPTY] * SKETCH_BINS
+    for h in hashes:
+        j, v = h & (SKETCH_BINS - 1), h >> SKETCH_BITS
+        if v < bins[j]:
+            bins[j] = v
+    return tuple(bins)
+
+
+def sketch_all(texts: Sequence[str], codes: Optional[WordCodes] = None) -> List[Tuple[int, ...]]:
+    """sketch(shingle_hashes(t)) for every text; NumPy takes over the binning for large pools."""
+    codes = WordCodes() if codes is None else codes
+    hashes = [shingle_hashes(t, codes) for t in texts]
+    if len(texts) < SMALL_POOL:
+        return [sketch(h) for h in hashes]
+    import numpy as np
+    flat = np.array(list(itertools.chain.from_iterable(hashes)), dtype=np.int64)
+    docs = np.repeat(np.arange(len(texts)), list(map(len, hashes)))
+    sigs = np.full(len(texts) * SKETCH_BINS, EMPTY, dtype=np.int64)
+    # Same arithmetic as sketch(): & and >> on int64 match Python's on negative ints
+    np.minimum.at(sigs, docs * SKETCH_BINS + (flat & (SKETCH_BINS - 1)), flat >> SKETCH_BITS)
+    return list(map(tuple, sigs.reshape(-1, SKETCH_BINS).tolist()))
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class ClusterIndex:
+    """Near-duplicate clusters over a paper list, keyed by canonical arXiv ID."""
+
+    def __init__(self, papers: Sequence[Paper], threshold: float = DEDUP_THRESHOLD):
+        self.rows: Dict[str, int] = {}
+        texts: List[str] = []
+        for p in papers:
+            cid = canonical_id(p.id)
+            if cid not in self.rows:  # versions of one paper share a row
+                self.rows[cid] = len(texts)
+                texts.append(p.title + " " + p.summary)
+        self.threshold = threshold
+        self._parent = list(range(len(texts)))
+        codes = WordCodes()
+        sigs = sketch_all(texts, codes)
+        # Sketches only propose candidates: with a few dozen shingles their estimate
+        # is too noisy to decide on, so pairs are confirmed on exact shingle sets,
+        # built for candidate rows only.
+        shingles: Dict[int, Set[int]] = {}
+
+        def shingle_set(row: int) -> Set[int]:
+            if row not in shingles:
+                shingles[row] = set(shingle_hashes(texts[row], codes))
+            return shingles[row]
+
+        bands: List[Dict[Tuple[int, ...], List[int]]] = [defaultdict(list) for _ in range(LSH_BANDS)]
+        for row, sig in enumerate(sigs):
+            checked = set()  # similar texts share many bands; compare each pair once
+            for buckets, key in zip(bands, zip(*[iter(sig)] * LSH_ROWS)):
+                if key == EMPTY_BAND:
+                    continue  # too short to fill this band; would match every other short text
+                peers = buckets[key]
+                for other in peers[-BUCKET_PEERS:]:
+                    if other in checked or self._find(other) == self._find(row):
+                        continue
+                    checked.add(other)
+                    if jaccard(shingle_set(row), shingle_set(other)) >= threshold:
+                        self._union(other, row)
+                peers.append(row)
+
+    def _find(self, row: int) -> int:
+        parent = self._parent
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]  # path halving
+            row = parent[row]
+        return row
+
+    def _union(self, a: int, b: int) -> None:
+        a, b = self._find(a), self._find(b)
+        if a != b:
+            self._parent[max(a, b)] = min(a, b)
+
+    def cluster_of(self, pid: str) -> Optional[int]:
+        """Cluster number of a paper ID (any version), or None if it was not indexed."""
+        row = self.rows.get(canonical_id(pid))
+        return None if row is None else self._find(row)
+
+
+def dedupe(papers: Sequence[Paper], threshold: float = DEDUP_THRESHOLD,
+           index: Optional[ClusterIndex] = None) -> List[Paper]:
+    """One paper per near-duplicate cluster, the newest, in the input order.
+
+    With a shared `index`, clusters come from the index's whole pool; papers
+    it has not seen are kept as they are.
+    """
+    if index is None:
+        index = ClusterIndex(papers, threshold)
+    best: Dict[object, int] = {}
+    for i, p in enumerate(papers):
+        cluster = index.cluster_of(p.id)
+        key = ("unindexed", i) if cluster is None else cluster
+        j = best.get(key)
+        if j is None or p.published > papers[j].published:
+            best[key] = i
+    return [papers[i] for i in sorted(best.values())]
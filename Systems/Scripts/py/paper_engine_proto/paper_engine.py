@@ -4,51 +4,272 @@ Academic Paper Engine — Minimal Prototype (CLI)
 ------------------------------------------------
 Fetch 1–3 recent papers by topic from arXiv and render a digest.
 - No API keys required.
-- Output: Markdown digest (stdout or file).
+- Output: Markdown digest (stdout or file), plus optional HTML / JSON / RSS from the same run.
 
 Usage:
   python paper_engine.py --topics "computational linguistics, neuroscience" --n 3 --days 14 --outfile digest.md
   python paper_engine.py --config config.yaml
+  python paper_engine.py --topics "neuroscience" --days 30 --harvest --workers 4
+  python paper_engine.py batch profiles/ extra_profile.yaml
+  python paper_engine.py serve profiles/ --every 6h
+  python paper_engine.py api --port 8080    # GET /digest?topics=neuroscience&n=3&days=14
+  python paper_engine.py search "sparse attention" --corpus corpus.sqlite3
+  python paper_engine.py --config config.yaml --metrics runs.jsonl --cprofile run.pstats
+  python paper_engine.py --topics "neuroscience" --outfile digest.md --output digest.html --output feed.xml
 
 Scheduling:
-- Use cron or Windows Task Scheduler to run on your preferred cadence.
+- Use cron or Windows Task Scheduler to run on your preferred cadence,
+  or `serve` to keep one warm process running every profile on its own cadence.
 """
 
 import argparse
 import datetime as dt
+import glob
+import importlib
 import os
+import signal
 import sys
 import textwrap
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set, TYPE_CHECKING
 import urllib.parse
 
+# Third-party and subcommand-only modules are imported where they are first
+# used (see require()), so --help and cache-served runs skip them.
+from arxiv_cache import ResponseCache, DEFAULT_CACHE_PATH, DEFAULT_TTL
+from digest_sinks import STDOUT, Sink, render_chunks, sink_for, template_cache_dir, write_sinks
+from paper_model import Paper
+from paper_corpus import PaperCorpus
+from paper_dedup import ClusterIndex, dedupe
+from paper_sources import (ARXIV, SOURCE_TIMEOUT, SOURCE_TYPES, PaperSource, SourcesFailed, fetch_sources,
+                           merge_papers, source_spec)
+from paper_state import StateStore, topic_key
+from paper_summary import summarize_abstracts, summarize_papers
+from query_planner import PLAN_MODES, TopicGroup, TopicRates, merge_results, observe, plan_queries
+from ranking import bm25_rank
+from run_metrics import MeteredChunks, RunMetrics, instrument
 
-try:
-    import requests
-    import feedparser
-    import yaml
-    from jinja2 import Template
-except ImportError as e:
-    sys.stderr.write("Missing dependencies. Please run: pip install -r requirements.txt\n")
-    raise
+if TYPE_CHECKING:
+    import asyncio
+    from ranking import TermIndex
 
 ARXIV_API = "http://export.arxiv.org/api/query"
+ARXIV_DELAY = 3.0          # arXiv asks for ~3s between requests
+ARXIV_MAX_PAGE = 2000      # hard cap on max_results per request
+HARVEST_MAX_PAGES = 20
+HARVEST_WORKERS = 4
+HTTP_TIMEOUT = 30
+USER_AGENT = "paper-engine-proto/0.1"
+STREAM_CHUNK = 64 * 1024
+PARSERS = ["stream", "feedparser"]
+DEFAULT_RANKER = "simple"
+BATCH_RANKER = "bm25"      # batch profiles share one term index, so BM25 costs a few ms each
 
-def parse_args():
+def require(name: str):
+    """Import a third-party dependency on first use."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        sys.stderr.write("Missing dependencies. Please run: pip install -r requirements.txt\n")
+        raise
+
+def add_fetch_args(p: argparse.ArgumentParser):
+    p.add_argument("--harvest", action="store_true",
+                   help="Walk arXiv result pages until entries fall outside the --days window")
+    p.add_argument("--max-pages", type=int, default=HARVEST_MAX_PAGES, help="Page cap for --harvest")
+    p.add_argument("--workers", type=int, default=HARVEST_WORKERS, help="Concurrent arXiv requests")
+    p.add_argument("--delay", type=float, default=ARXIV_DELAY,
+                   help="Minimum seconds between requests to one host (API rate limit)")
+    p.add_argument("--cache", type=str, default=DEFAULT_CACHE_PATH, help="Response cache database path")
+    p.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                   help="Seconds a cached response is served without revalidation")
+    p.add_argument("--no-cache", action="store_true", help="Always fetch from arXiv")
+    p.add_argument("--api-url", type=str, default=ARXIV_API, help="arXiv API endpoint (mirrors, local stand-ins)")
+    p.add_argument("--query-plan", choices=PLAN_MODES, default=PLAN_MODES[0],
+                   help="How topics become arXiv queries (auto: pack quiet topics together and give busy "
+                        "ones their own; combined: one query; split: one per topic)")
+    p.add_argument("--parser", choices=PARSERS, default=PARSERS[0],
+                   help="Atom parser (stream: incremental, stops at the cutoff; feedparser: lenient fallback)")
+    p.add_argument("--corpus", type=str, default=None,
+                   help="Local corpus database; every fetched paper is stored and indexed there")
+    p.add_argument("--offline", action="store_true",
+                   help="Serve the digest from --corpus without contacting arXiv")
+    p.add_argument("--source", action="append", default=None, dest="sources", metavar="SPEC",
+                   help="Paper source: arxiv, or jsonl:PATH for a local JSON Lines file. "
+                        "Repeatable; several sources are fetched in parallel and merged (default: arxiv)")
+    p.add_argument("--source-timeout", type=float, default=SOURCE_TIMEOUT,
+                   help="Seconds each source may take before it is skipped (with several sources)")
+    p.add_argument("--metrics", type=str, default=None,
+                   help="Record stage timings and counters: appends a JSON line, or replaces a "
+                        "Prometheus textfile if the path ends in .prom")
+    p.add_argument("--cprofile", type=str, default=None, help="Dump cProfile stats for the run here")
+
+def parse_args(argv: Optional[List[str]] = None):
     p = argparse.ArgumentParser(description="Academic Paper Engine — arXiv prototype")
     p.add_argument("--topics", type=str, help="Comma-separated list of topics")
     p.add_argument("--n", type=int, default=3, help="Papers per cycle (1-3 recommended)")
     p.add_argument("--days", type=int, default=30, help="Look-back window for recency")
     p.add_argument("--outfile", type=str, default=None, help="Write digest to a Markdown file")
+    p.add_argument("--output", action="append", default=[], metavar="PATH",
+                   help="Extra output; format from the extension (.md, .html, .json, .xml/.rss). Repeatable")
     p.add_argument("--level", choices=["beginner","intermediate","expert"], default="intermediate",
                    help="Reading level for guidance blurbs")
     p.add_argument("--config", type=str, help="YAML config path (overrides CLI flags if provided)")
-    return p.parse_args()
+    p.add_argument("--state", type=str, default=None,
+                   help="State database path; only papers new since the last run are processed")
+    p.add_argument("--ranker", choices=["bm25", "simple"], default=DEFAULT_RANKER,
+                   help="Relevance scorer (bm25: token-level BM25; simple: substring counts)")
+    p.add_argument("--no-dedup", action="store_true",
+                   help="Rank every candidate, even other versions and near-duplicates of one paper")
+    add_fetch_args(p)
+    return p.parse_args(argv)
+
+def parse_batch_args(argv: List[str]):
+    p = argparse.ArgumentParser(prog="paper_engine.py batch",
+                                description="Run many config profiles off one shared arXiv fetch")
+    p.add_argument("configs", nargs="+", help="YAML config files and/or directories of them")
+    add_fetch_args(p)
+    p.set_defaults(ranker=BATCH_RANKER)   # profiles without `ranker:` in their YAML
+    return p.parse_args(argv)
+
+def parse_serve_args(argv: List[str]):
+    from profile_scheduler import DEFAULT_EVERY, DEFAULT_JITTER, DEFAULT_POLL, DEFAULT_RETRY, parse_interval
+    p = argparse.ArgumentParser(prog="paper_engine.py serve",
+                                description="Run config profiles on their own cadence from one warm process")
+    p.add_argument("configs", nargs="+", help="YAML config files and/or directories of them (watched for changes)")
+    p.add_argument("--every", type=str, default=DEFAULT_EVERY,
+                   help="Cadence for profiles without `every:` in their YAML (e.g. 30m, 6h, 1d)")
+    p.add_argument("--jitter", type=float, default=DEFAULT_JITTER,
+                   help="Delay each next run by up to this fraction of its interval")
+    p.add_argument("--retry", type=float, default=DEFAULT_RETRY,
+                   help="Seconds before retrying a failed run; doubles per failure, capped at the cadence")
+    p.add_argument("--poll", type=float, default=DEFAULT_POLL, help="Seconds between config change checks")
+    add_fetch_args(p)
+    args = p.parse_args(argv)
+    try:
+        parse_interval(args.every)
+    except ValueError as e:
+        p.error(str(e))
+    return args
+
+def parse_api_args(argv: List[str]):
+    from digest_api import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_TIMEOUT
+    p = argparse.ArgumentParser(prog="paper_engine.py api",
+                                description="Serve digests over HTTP: GET /digest?topics=...&n=3&days=14")
+    p.add_argument("--host", type=str, default=DEFAULT_HOST, help="Interface to bind")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--ranker", choices=sorted(RANKERS), default=DEFAULT_RANKER,
+                   help="Default scorer when a request has no ranker= parameter")
+    p.add_argument("--request-timeout", type=float, default=DEFAULT_TIMEOUT,
+                   help="Seconds a request waits for arXiv before a 504")
+    add_fetch_args(p)
+    args = p.parse_args(argv)
+    if args.offline or args.corpus:
+        p.error("--corpus / --offline are not supported by the API server")
+    return args
+
+def parse_search_args(argv: List[str]):
+    p = argparse.ArgumentParser(prog="paper_engine.py search",
+                                description="Query the local paper corpus (no network)")
+    p.add_argument("query", nargs="+", help="Words to match in title, abstract, authors or category")
+    p.add_argument("--corpus", type=str, required=True, help="Corpus database built with --corpus")
+    p.add_argument("--n", type=int, default=10, help="Maximum results")
+    p.add_argument("--days", type=int, default=None, help="Only papers from the last N days")
+    return p.parse_args(argv)
 
 def load_config(path: str) -> Dict[str, Any]:
+    yaml = require("yaml")
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
+def collect_configs(paths: List[str]) -> List[str]:
+    """Expand directories into their *.yaml / *.yml files, keeping order."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "*.yaml")) + glob.glob(os.path.join(path, "*.yml"))))
+        else:
+            found.append(path)
+    return found
+
+def profile_sources(raw: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    try:
+        return [source_spec(s) for s in raw or [ARXIV]]
+    except ValueError as e:
+        sys.exit(str(e))
+
+def profile_plan(mode: str) -> str:
+    if mode not in PLAN_MODES:
+        sys.exit(f"query_plan must be one of: {', '.join(PLAN_MODES)}")
+    return mode
+
+def arxiv_only(sources: List[Dict[str, Any]]) -> bool:
+    return [s["type"] for s in sources] == [ARXIV]
+
+def output_sinks(outfile: Optional[str], outputs: List[str]) -> List[Sink]:
+    """`outfile` is always Markdown; `outputs` pick their format by extension."""
+    sinks = [Sink("md", outfile)] if outfile else []
+    for path in outputs:
+        try:
+            sink = sink_for(path)
+        except ValueError as e:
+            sys.exit(str(e))
+        if sink not in sinks:
+            sinks.append(sink)
+    return sinks
+
+def profile_from_config(cfg: Dict[str, Any], args, path: Optional[str] = None) -> Dict[str, Any]:
+    cfg = cfg or {}
+    outfile = cfg.get("outfile")
+    outputs = cfg.get("outputs", getattr(args, "output", None)) or []
+    if outfile is None and not outputs and path:
+        # Batch runs cannot share stdout; default to <config>.md next to the config
+        outfile = os.path.splitext(path)[0] + ".md"
+    return {
+        "name": os.path.splitext(os.path.basename(path))[0] if path else "default",
+        "topics": cfg.get("topics") or ["computational linguistics"],
+        "n": int(cfg.get("n", 3)),
+        "days": int(cfg.get("days", 30)),
+        "outfile": outfile,
+        "sinks": output_sinks(outfile, outputs),
+        "level": cfg.get("level", "intermediate"),
+        "harvest": bool(cfg.get("harvest", args.harvest)),
+        "max_pages": int(cfg.get("max_pages", args.max_pages)),
+        "cache": cfg.get("cache", args.cache),
+        "cache_ttl": float(cfg.get("cache_ttl", args.cache_ttl)),
+        "state": cfg.get("state", getattr(args, "state", None)),
+        "ranker": cfg.get("ranker", getattr(args, "ranker", DEFAULT_RANKER)),
+        "dedup": bool(cfg.get("dedup", not getattr(args, "no_dedup", False))),
+        "corpus": cfg.get("corpus", args.corpus),
+        "offline": bool(cfg.get("offline", args.offline)),
+        "sources": profile_sources(cfg.get("sources", args.sources)),
+        "query_plan": profile_plan(cfg.get("query_plan", args.query_plan)),
+    }
+
+def profile_from_args(args) -> Dict[str, Any]:
+    topics = [t.strip() for t in (args.topics or "").split(",") if t.strip()]
+    return {
+        "name": "default",
+        "topics": topics or ["computational linguistics"],  # sane default
+        "n": args.n,
+        "days": args.days,
+        "outfile": args.outfile,
+        "sinks": output_sinks(args.outfile, args.output),
+        "level": args.level,
+        "harvest": args.harvest,
+        "max_pages": args.max_pages,
+        "cache": args.cache,
+        "cache_ttl": args.cache_ttl,
+        "state": args.state,
+        "ranker": args.ranker,
+        "dedup": not args.no_dedup,
+        "corpus": args.corpus,
+        "offline": args.offline,
+        "sources": profile_sources(args.sources),
+        "query_plan": args.query_plan,
+    }
+
 def arxiv_search_query(topics: List[str]) -> str:
     # Combine topics into arXiv query with OR across all fields
     # Example: (all:computational AND all:linguistics) OR (all:neuroscience)
@@ -67,163 +288,816 @@ def arxiv_search_query(topics: List[str]) -> str:
         return 'all:"machine learning"'
     return " OR ".join(parts)
 
-def fetch_arxiv(topics: List[str], days: int, max_results: int = 25) -> List[Dict[str, Any]]:
-    query = arxiv_search_query(topics)
+class HostRateLimiter:
+    """Space request starts to the same host at least `interval` seconds apart.
+
+    Meant for tasks on one event loop: the slot is claimed without awaiting,
+    so no lock is needed. A wait cancelled before its turn hands the slot back
+    when it is still the latest claim, so cancelled read-ahead pages do not
+    delay later requests.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = max(0.0, interval)
+        self._next: Dict[str, float] = {}
+
+    async def wait(self, host: str) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next.get(host, 0.0))
+        self._next[host] = slot + self.interval
+        if slot > now:
+            import asyncio
+            try:
+                await asyncio.sleep(slot - now)
+            except asyncio.CancelledError:
+                if self._next[host] == slot + self.interval:
+                    self._next[host] = slot
+                raise
+
+def arxiv_page_url(query: str, start: int, max_results: int, api_url: str = ARXIV_API) -> str:
     params = {
         "search_query": query,
         "sortBy": "submittedDate",
         "sortOrder": "descending",
-        "start": 0,
-        "max_results": max_results
+        "start": start,
+        "max_results": min(max_results, ARXIV_MAX_PAGE)
     }
-    url = ARXIV_API + "?" + urllib.parse.urlencode(params)
-    feed = feedparser.parse(url)
-    results = []
+    return api_url + "?" + urllib.parse.urlencode(params)
+
+def entry_to_paper(e) -> Paper:
+    from atom_stream import arxiv_id
+    # Parse dates safely
+    published = None
+    if hasattr(e, "published_parsed") and e.published_parsed:
+        published = dt.datetime(*e.published_parsed[:6])
+    elif hasattr(e, "updated_parsed") and e.updated_parsed:
+        published = dt.datetime(*e.updated_parsed[:6])
+    else:
+        published = dt.datetime.utcnow()
+
+    pdf_link = None
+    for link in e.get("links", []):
+        if link.get("type") == "application/pdf":
+            pdf_link = link.get("href")
+            break
+    primary_cat = getattr(e, "arxiv_primary_category", {}).get("term", "")
+    authors = [a.name for a in getattr(e, "authors", [])]
+    return Paper(
+        id=arxiv_id(getattr(e, "id", "") or getattr(e, "link", "")),
+        title=e.title.strip(),
+        summary=getattr(e, "summary", "").strip(),
+        published=published,
+        link=getattr(e, "link", ""),
+        pdf=pdf_link,
+        authors=authors,
+        primary_category=primary_cat,
+        doi=getattr(e, "arxiv_doi", "").strip() or None
+    )
+
+def parse_atom(body: bytes) -> List[Paper]:
+    """Convert every entry of a raw Atom response with feedparser, without date filtering."""
+    feed = require("feedparser").parse(body)
+    return [entry_to_paper(e) for e in feed.entries]
+
+class ArxivClient:
+    """Concurrent arXiv fetches over one pooled HTTP session.
+
+    Requests run on worker threads via asyncio, capped at `concurrency` in
+    flight and spaced per host by `delay`. The optional response cache is
+    consulted before any network call. Bodies go to the streaming parser
+    unless `parser` is "feedparser". Requests, bytes and cache outcomes are
+    counted on `metrics`.
+    """
+
+    def __init__(self, concurrency: int = HARVEST_WORKERS, delay: float = ARXIV_DELAY,
+                 cache: Optional[ResponseCache] = None, parser: str = PARSERS[0],
+                 metrics: Optional[RunMetrics] = None):
+        self.concurrency = max(1, concurrency)
+        self.cache = cache
+        self.parser = parser
+        self.metrics = metrics or RunMetrics()
+        self.limiter = HostRateLimiter(delay)
+        self.rates = TopicRates(cache)   # results per day per topic, for the query planner
+        requests = require("requests")
+        self.session = requests.Session()
+        adapter = require("requests.adapters").HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self._loop = None
+        self._slots = None
+
+    def _semaphore(self) -> "asyncio.Semaphore":
+        # One semaphore per event loop, so the client survives repeated asyncio.run()
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    async def get_page(self, url: str, cutoff: Optional[dt.datetime] = None) -> List[Paper]:
+        """One Atom page as paper records; records older than `cutoff` may be left unread.
+
+        Fresh cache hits skip the network; stale ones are revalidated with
+        ETag / Last-Modified and reused on 304.
+        """
+        cache = self.cache
+        cached = cache.get(url) if cache else None
+        if cached and not cached.covers(cutoff):
+            cached = None  # stored for a narrower window than this request needs
+        if cached and cache.is_fresh(cached):
+            self.metrics.incr("cache_hits")
+            self.metrics.incr("entries_cached", len(cached.papers))
+            return cached.papers
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        import asyncio
+        async with self._semaphore():
+            await self.limiter.wait(urllib.parse.urlsplit(url).netloc)
+            papers, floor, etag, last_modified = await asyncio.to_thread(self._download, url, headers, cutoff)
+        if papers is None and cached:
+            cache.touch(url)
+            self.metrics.incr("cache_not_modified")
+            self.metrics.incr("entries_cached", len(cached.papers))
+            return cached.papers
+        self.metrics.incr("entries_parsed", len(papers))
+        if cache:
+            self.metrics.incr("cache_misses")
+            cache.put(url, papers, etag, last_modified, floor=floor)
+        return papers
+
+    def _download(self, url: str, headers: Dict[str, str], cutoff: Optional[dt.datetime]):
+        """Blocking GET + parse, run on a worker thread.
+
+        Returns (papers, floor, etag, last_modified); papers is None on 304 and
+        floor is the cutoff when the streaming parser stopped early.
+        """
+        from atom_stream import ParseError, parse_chunks
+        metrics = self.metrics
+        metrics.incr("http_requests")
+        t0 = time.perf_counter()
+        with self.session.get(url, timeout=HTTP_TIMEOUT, headers=headers, stream=True) as resp:
+            metrics.add_time("network", time.perf_counter() - t0)
+            if resp.status_code == 304:
+                return None, None, None, None
+            resp.raise_for_status()
+            etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            if self.parser == "feedparser":
+                return self._parse_body(resp), None, etag, last_modified
+            body = MeteredChunks(resp.iter_content(STREAM_CHUNK))
+            t0 = time.perf_counter()
+            try:
+                papers, complete = parse_chunks(body, cutoff)
+                return papers, None if complete else cutoff, etag, last_modified
+            except ParseError:
+                pass
+            finally:
+                # The parser pulls chunks as it goes: split its time into socket waits and parsing
+                metrics.add_time("network", body.waited)
+                metrics.add_time("parse", time.perf_counter() - t0 - body.waited)
+                metrics.incr("http_bytes", body.size)
+        # Malformed XML: refetch the whole body for feedparser's lenient parser
+        metrics.incr("http_requests")
+        resp = self.session.get(url, timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+        return self._parse_body(resp), None, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+    def _parse_body(self, resp) -> List[Paper]:
+        t0 = time.perf_counter()
+        body = resp.content
+        t1 = time.perf_counter()
+        papers = parse_atom(body)
+        self.metrics.add_time("network", t1 - t0)
+        self.metrics.add_time("parse", time.perf_counter() - t1)
+        self.metrics.incr("http_bytes", len(body))
+        return papers
+
+    async def fetch_query(self, query: str, cutoff: dt.datetime, max_results: int = 25,
+                          harvest: bool = False, max_pages: int = HARVEST_MAX_PAGES,
+                          api_url: str = ARXIV_API) -> List[Paper]:
+        """Papers for a prebuilt query at or after `cutoff`.
+
+        When harvesting, `max_results` is the page size and pages are walked
+        newest-first until an entry predates `cutoff`. Page 0 is fetched on its
+        own; only a full page entirely inside the window starts the next ones,
+        up to `concurrency` in flight and consumed in page order. Pages still in
+        flight when the window closes are cancelled.
+        """
+        if not harvest:
+            page = await self.get_page(arxiv_page_url(query, 0, max_results, api_url), cutoff)
+            kept = [p for p in page if p.published >= cutoff]
+            self._count_window(len(page), len(kept))
+            return kept
+        import asyncio
+        page_size = max(1, min(max_results, ARXIV_MAX_PAGE))
+
+        def page_url(i: int) -> str:
+            return arxiv_page_url(query, i * page_size, page_size, api_url)
+
+        results: List[Paper] = []
+        pending: List["asyncio.Task"] = []
+        next_page = 1
+        read = 0
+        entries = await self.get_page(page_url(0), cutoff)
+        try:
+            while True:
+                read += len(entries)
+                kept = [p for p in entries if p.published >= cutoff]
+                results.extend(kept)
+                # Sorted by submittedDate: an older entry, or a short page (end of results, or
+                # the parser stopped at the cutoff), means no later page is in the window
+                if len(kept) < len(entries) or len(entries) < page_size:
+                    break
+                while next_page < max_pages and len(pending) < self.concurrency:
+                    pending.append(asyncio.ensure_future(self.get_page(page_url(next_page), cutoff)))
+                    next_page += 1
+                if not pending:
+                    break
+                entries = await pending.pop(0)
+        finally:
+            # Newest claim first, so each cancelled page can hand its rate-limiter slot back
+            for task in reversed(pending):
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._count_window(read, len(results))
+        return results
+
+    async def fetch_topics(self, topics: List[str], cutoff: dt.datetime, max_results: int = 25,
+                           harvest: bool = False, max_pages: int = HARVEST_MAX_PAGES,
+                           api_url: str = ARXIV_API, plan: str = PLAN_MODES[0]) -> List[Paper]:
+        """Papers for `topics`: planned into one or more queries, run concurrently, merged."""
+        import asyncio
+        groups = plan_topics(topics, cutoff, self.rates, max_results, harvest, max_pages, plan)
+        results = await asyncio.gather(*(
+            self.fetch_query(arxiv_search_query(list(g.topics)), cutoff, max_results=max_results,
+                             harvest=harvest, max_pages=g.pages, api_url=api_url)
+            for g in groups))
+        observe(self.rates, groups, results, cutoff, min(max_results, ARXIV_MAX_PAGE), harvest)
+        return merge_results(results)
+
+    def _count_window(self, read: int, kept: int) -> None:
+        self.metrics.incr("entries_kept", kept)
+        self.metrics.incr("entries_filtered", read - kept)
+
+    async def fetch_many(self, plans: Dict[str, Dict[str, Any]],
+                         api_url: str = ARXIV_API) -> Dict[str, List[Paper]]:
+        """Run many queries concurrently; `plans` maps query -> fetch_query kwargs."""
+        import asyncio
+        queries = list(plans)
+        pages = await asyncio.gather(*(self.fetch_query(q, api_url=api_url, **plans[q]) for q in queries))
+        return dict(zip(queries, pages))
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def plan_topics(topics: List[str], cutoff: dt.datetime, rates: TopicRates, max_results: int,
+                harvest: bool, max_pages: int, plan: str = PLAN_MODES[0]) -> List[TopicGroup]:
+    window_days = (dt.datetime.utcnow() - cutoff).total_seconds() / 86400.0
+    return plan_queries(topics, window_days, rates.get(topics), min(max_results, ARXIV_MAX_PAGE),
+                        max_pages if harvest else 1, plan)
+
+def window_cutoff(days: int, since: Optional[dt.datetime] = None) -> dt.datetime:
     cutoff = dt.datetime.utcnow() - dt.timedelta(days=days)
-    for e in feed.entries:
-        # Parse dates safely
-        published = None
-        if hasattr(e, "published_parsed") and e.published_parsed:
-            published = dt.datetime(*e.published_parsed[:6])
-        elif hasattr(e, "updated_parsed") and e.updated_parsed:
-            published = dt.datetime(*e.updated_parsed[:6])
+    if since and since > cutoff:
+        # Incremental run: nothing older than the previous high-water mark is new
+        cutoff = since
+    return cutoff
+
+async def fetch_arxiv_async(topics: List[str], days: int, max_results: int = 25, harvest: bool = False,
+                            max_pages: int = HARVEST_MAX_PAGES, api_url: str = ARXIV_API,
+                            since: Optional[dt.datetime] = None,
+                            client: Optional[ArxivClient] = None, plan: str = PLAN_MODES[0]) -> List[Paper]:
+    own_client = client is None
+    client = client or ArxivClient()
+    try:
+        return await client.fetch_topics(topics, window_cutoff(days, since), max_results=max_results,
+                                         harvest=harvest, max_pages=max_pages, api_url=api_url, plan=plan)
+    finally:
+        if own_client:
+            client.close()
+
+class ArxivSource(PaperSource):
+    """arXiv as a paper source, fetched through a shared ArxivClient."""
+
+    name = ARXIV
+
+    def __init__(self, client: ArxivClient, max_results: int = 50, harvest: bool = False,
+                 max_pages: int = HARVEST_MAX_PAGES, api_url: str = ARXIV_API,
+                 plan: str = PLAN_MODES[0], timeout: Optional[float] = SOURCE_TIMEOUT):
+        super().__init__(timeout)
+        self.client = client
+        self.max_results = max_results
+        self.harvest = harvest
+        self.max_pages = max_pages
+        self.api_url = api_url
+        self.plan = plan
+
+    async def fetch(self, topics: List[str], cutoff: dt.datetime) -> List[Paper]:
+        return await self.client.fetch_topics(topics, cutoff, max_results=self.max_results, harvest=self.harvest,
+                                              max_pages=self.max_pages, api_url=self.api_url, plan=self.plan)
+
+def build_sources(specs: List[Dict[str, Any]], client: Optional[ArxivClient], args,
+                  harvest: bool = False, max_pages: int = HARVEST_MAX_PAGES,
+                  plan: str = PLAN_MODES[0]) -> List[PaperSource]:
+    """Source plugins for a profile's specs; arXiv ones share `client`."""
+    sources: List[PaperSource] = []
+    for spec in specs:
+        options = {k: v for k, v in spec.items() if k != "type"}
+        options.setdefault("timeout", args.source_timeout)
+        if spec["type"] == ARXIV:
+            sources.append(ArxivSource(client, harvest=harvest, max_pages=max_pages,
+                                       api_url=args.api_url, plan=plan, **options))
         else:
-            published = dt.datetime.utcnow()
+            sources.append(SOURCE_TYPES[spec["type"]](**options))
+    return sources
 
-        if published < cutoff:
-            continue
+def fetch_from_sources(args, profile: Dict[str, Any], cutoff: dt.datetime, cache: Optional[ResponseCache],
+                       metrics: RunMetrics, client: Optional[ArxivClient] = None) -> List[Paper]:
+    """Every source of a profile in parallel, merged. arXiv uses `client`, or a client of its own."""
+    import asyncio
+    own_client = client is None and any(s["type"] == ARXIV for s in profile["sources"])
+    if own_client:
+        client = ArxivClient(concurrency=args.workers, delay=args.delay, cache=cache,
+                             parser=args.parser, metrics=metrics)
+    try:
+        sources = build_sources(profile["sources"], client, args, profile["harvest"], profile["max_pages"],
+                                profile["query_plan"])
+        return asyncio.run(fetch_sources(sources, profile["topics"], cutoff, metrics))
+    finally:
+        if own_client:
+            client.close()
 
-        pdf_link = None
-        for link in e.links:
-            if link.get("type") == "application/pdf":
-                pdf_link = link.get("href")
-                break
-        primary_cat = getattr(e, "arxiv_primary_category", {}).get("term", "")
-        authors = [a.name for a in getattr(e, "authors", [])]
-        results.append({
-            "title": e.title.strip(),
-            "summary": getattr(e, "summary", "").strip(),
-            "published": published,
-            "link": getattr(e, "link", ""),
-            "pdf": pdf_link,
-            "authors": authors,
-            "primary_category": primary_cat
-        })
+def fetch_plans_from_sources(args, specs: List[Dict[str, Any]], plans: Dict[str, Dict[str, Any]],
+                             query_topic: Dict[str, str], cache: Optional[ResponseCache],
+                             metrics: RunMetrics) -> Dict[str, List[Paper]]:
+    """batch's per-topic queries asked of every source; each query's results are merged on their own."""
+    import asyncio
+    client = None
+    if any(s["type"] == ARXIV for s in specs):
+        client = ArxivClient(concurrency=args.workers, delay=args.delay, cache=cache,
+                             parser=args.parser, metrics=metrics)
+
+    async def run() -> Dict[str, List[Paper]]:
+        queries = list(plans)
+        merged = await asyncio.gather(*(
+            fetch_sources(build_sources(specs, client, args, plans[q]["harvest"], plans[q]["max_pages"], "split"),
+                          [query_topic[q]], plans[q]["cutoff"], metrics)
+            for q in queries))
+        return dict(zip(queries, merged))
+
+    try:
+        return asyncio.run(run())
+    finally:
+        if client:
+            client.close()
+
+def fetch_cached(cache: ResponseCache, query: str, cutoff: dt.datetime, max_results: int = 25,
+                 harvest: bool = False, max_pages: int = HARVEST_MAX_PAGES, api_url: str = ARXIV_API,
+                 metrics: Optional[RunMetrics] = None) -> Optional[List[Paper]]:
+    """ArxivClient.fetch_query answered from fresh cache pages alone.
+
+    Returns None as soon as a page it needs is missing or stale. No HTTP
+    session or event loop is set up, so a cache-served run never imports
+    requests or asyncio.
+    """
+    metrics = metrics or RunMetrics()
+    page_size = max(1, min(max_results, ARXIV_MAX_PAGE)) if harvest else max_results
+    pages: List[List[Paper]] = []
+    for i in range(max_pages if harvest else 1):
+        entry = cache.get(arxiv_page_url(query, i * page_size, page_size, api_url))
+        if not entry or not entry.covers(cutoff) or not cache.is_fresh(entry):
+            return None
+        pages.append(entry.papers)
+        if len(entry.papers) < page_size or (entry.papers and entry.papers[-1].published < cutoff):
+            break
+    read = sum(map(len, pages))
+    metrics.incr("cache_hits", len(pages))
+    metrics.incr("entries_cached", read)
+    # Pages are newest-first, so the window is a prefix of their concatenation
+    results = []
+    for p in (p for page in pages for p in page):
+        if p.published < cutoff:
+            break
+        results.append(p)
+    metrics.incr("entries_kept", len(results))
+    metrics.incr("entries_filtered", read - len(results))
     return results
 
-def simple_rank(papers: List[Dict[str, Any]], topics: List[str], top_k: int) -> List[Dict[str, Any]]:
+def fetch_arxiv(topics: List[str], days: int, max_results: int = 25, harvest: bool = False,
+                max_pages: int = HARVEST_MAX_PAGES, workers: int = HARVEST_WORKERS,
+                api_url: str = ARXIV_API, delay: float = ARXIV_DELAY,
+                cache: Optional[ResponseCache] = None, since: Optional[dt.datetime] = None,
+                parser: str = PARSERS[0], metrics: Optional[RunMetrics] = None,
+                plan: str = PLAN_MODES[0]) -> List[Paper]:
+    # Synchronous entry point for cron usage; see fetch_arxiv_async / ArxivClient
+    if cache is not None:
+        cutoff = window_cutoff(days, since)
+        pages = []
+        for group in plan_topics(topics, cutoff, TopicRates(cache), max_results, harvest, max_pages, plan):
+            papers = fetch_cached(cache, arxiv_search_query(list(group.topics)), cutoff, max_results=max_results,
+                                  harvest=harvest, max_pages=group.pages, api_url=api_url, metrics=metrics)
+            if papers is None:
+                break
+            pages.append(papers)
+        else:
+            return merge_results(pages)
+    import asyncio
+    with ArxivClient(concurrency=workers, delay=delay, cache=cache, parser=parser,
+                     metrics=metrics) as client:
+        return asyncio.run(fetch_arxiv_async(topics, days, max_results=max_results, harvest=harvest,
+                                             max_pages=max_pages, api_url=api_url, since=since,
+                                             client=client, plan=plan))
+
+def simple_rank(papers: List[Paper], topics: List[str], top_k: int,
+                exclude: Optional[Set[str]] = None) -> List[Paper]:
     # Naive relevance: recency + keyword hits in title/summary
     topic_terms = [w.lower().strip() for t in topics for w in t.split() if w.strip()]
     ranked = []
     now = dt.datetime.utcnow()
     for p in papers:
-        recency_days = max(1, (now - p["published"]).days)
+        if exclude and p.id in exclude:
+            continue
+        recency_days = max(1, (now - p.published).days)
         recency_score = 1.0 / recency_days  # newer => higher
-        text = (p["title"] + " " + p["summary"]).lower()
+        text = (p.title + " " + p.summary).lower()
         kw_hits = sum(text.count(term) for term in topic_terms) if topic_terms else 0
         score = recency_score + (0.2 * kw_hits)
-        p["score"] = score
+        p.score = score
         ranked.append(p)
-    ranked.sort(key=lambda x: x["score"], reverse=True)
+    ranked.sort(key=lambda x: x.score, reverse=True)
     return ranked[:top_k]
 
+RANKERS = {
+    "simple": simple_rank,
+    "bm25": bm25_rank,
+}
+
 GUIDANCE_MAP = {
     "beginner": "Start with the abstract. Skim intro & conclusion; skip proofs/appendices first pass.",
     "intermediate": "Read abstract → intro → figures → discussion. Note unfamiliar terms for later.",
     "expert": "Skim contributions and methods. Jump to experiments/limitations; check references for gaps."
 }
 
-def why_it_matters_blurb(p: Dict[str, Any]) -> str:
-    # Very naive "why it matters": extract first 1–2 sentences from abstract and reframe
-    abstract = p.get("summary", "").replace("\n", " ").strip()
-    sentences = [s.strip() for s in abstract.split(". ") if s.strip()]
-    base = sentences[0] if sentences else ""
-    if base:
-        return f"This work is relevant because it addresses: {base.rstrip('.')}."
-    return "This paper potentially advances the topic with new findings or synthesis."
-
-def render_digest(papers: List[Dict[str, Any]], topics: List[str], level: str) -> str:
-    template_path = os.path.join(os.path.dirname(__file__), "templates", "digest_email.md.j2")
-    
-    # Check if template exists, otherwise use inline template
-    if os.path.exists(template_path):
-        with open(template_path, "r") as f:
-            tpl = Template(f.read())
-    else:
-        # Fallback inline template
-        inline_template = """# Academic Paper Digest — {{ date }}
+def why_it_matters_blurb(p: Paper) -> str:
+    # One paper at a time; digests summarize all their papers in one batch (summarize_papers)
+    return summarize_abstracts([p.summary])[0]
 
-**Topics:** {{ topics|join(', ') }}
-**Reading Level:** {{ level }}
+def digest_context(papers: List[Paper], topics: List[str], level: str) -> Dict[str, Any]:
+    return {
+        "date": dt.datetime.utcnow().strftime("%Y-%m-%d"),
+        "now": dt.datetime.utcnow(),
+        "topics": topics,
+        "level": level,
+        "guidance": GUIDANCE_MAP.get(level, GUIDANCE_MAP["intermediate"]),
+        "papers": papers,
+    }
 
-## Reading Guidance
-{{ guidance }}
+def render_digest(papers: List[Paper], topics: List[str], level: str, fmt: str = "md") -> str:
+    return "".join(render_chunks(fmt, digest_context(papers, topics, level)))
 
----
+def build_digest(papers: List[Paper], profile: Dict[str, Any],
+                 exclude: Optional[Set[str]] = None, index: Optional["TermIndex"] = None,
+                 clusters: Optional[ClusterIndex] = None, summaries: Optional[ResponseCache] = None,
+                 blurbs: bool = True, metrics: Optional[RunMetrics] = None):
+    """Dedupe, rank and summarize; `blurbs=False` leaves summaries to the caller (batch)."""
+    metrics = metrics or RunMetrics()
+    if profile.get("dedup", True):
+        # One representative per near-duplicate cluster, so versions and cross-lists share a slot
+        with metrics.stage("dedup"):
+            kept = dedupe(papers, index=clusters)
+        metrics.incr("papers_deduped", len(papers) - len(kept))
+        papers = kept
+    rank = RANKERS[profile["ranker"]]
+    extra = {"index": index} if index is not None and rank is bm25_rank else {}
+    with metrics.stage("rank"):
+        top_papers = rank(papers, profile["topics"], top_k=max(1, min(3, profile["n"])), exclude=exclude, **extra)
+    metrics.incr("papers_ranked", len(papers))
+    metrics.incr("papers_emitted", len(top_papers))
+    if blurbs:
+        with metrics.stage("blurbs"):
+            summarize_papers(top_papers, cache=summaries, metrics=metrics)
+    # Rendering happens in write_digest, once per output format
+    return top_papers, digest_context(top_papers, profile["topics"], profile["level"])
 
-{% for paper in papers %}
-## {{ loop.index }}. {{ paper.title }}
+def write_digest(context: Dict[str, Any], sinks: List[Sink], metrics: Optional[RunMetrics] = None,
+                 template_cache: Optional[str] = None):
+    """Every output of one profile from the same ranked list; Markdown on stdout if none."""
+    write_sinks(sinks or [Sink("md", STDOUT)], context, metrics, template_cache)
+    for sink in sinks:
+        print(f"Wrote digest to {sink.path}")
 
-**Authors:** {{ paper.authors|join(', ') }}
-**Published:** {{ paper.published.strftime('%Y-%m-%d') }}
-**Category:** {{ paper.primary_category }}
+def open_cache(args, profile: Dict[str, Any]) -> Optional[ResponseCache]:
+    if args.no_cache or not profile["cache"]:
+        return None
+    return ResponseCache(profile["cache"], ttl=profile["cache_ttl"])
 
-### Abstract
-{{ paper.summary }}
+def template_cache(args, profile: Dict[str, Any]) -> Optional[str]:
+    """Compiled templates are cached beside the response cache, and not at all with --no-cache."""
+    return None if args.no_cache else template_cache_dir(profile["cache"])
 
-### Why It Matters
-{{ paper.why_it_matters }}
+def open_corpus(profile: Dict[str, Any]) -> Optional[PaperCorpus]:
+    if profile["offline"] and not profile["corpus"]:
+        sys.exit("--offline needs a --corpus to read from")
+    return PaperCorpus(profile["corpus"]) if profile["corpus"] else None
 
-**Links:**
-- [arXiv page]({{ paper.link }})
-{% if paper.pdf %}- [PDF]({{ paper.pdf }}){% endif %}
+def run_digest(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    profile = profile_from_config(load_config(args.config), args) if args.config else profile_from_args(args)
+    try:
+        with instrument("digest", profile["name"], args.metrics, args.cprofile) as metrics:
+            digest_profile(args, profile, metrics)
+    except SourcesFailed as e:
+        sys.exit(str(e))
 
----
-{% endfor %}
-"""
-        tpl = Template(inline_template)
-    
-    return tpl.render(
-        date=dt.datetime.utcnow().strftime("%Y-%m-%d"),
-        topics=topics,
-        level=level,
-        guidance=GUIDANCE_MAP.get(level, GUIDANCE_MAP["intermediate"]),
-        papers=papers
-    )
+def digest_profile(args, profile: Dict[str, Any], metrics: RunMetrics, client: Optional[ArxivClient] = None):
+    """One profile end to end. A long-lived `client` (and its cache) is reused when given."""
+    topics = profile["topics"]
 
-def main():
-    args = parse_args()
-    if args.config:
-        cfg = load_config(args.config)
-        topics = cfg.get("topics", [])
-        n = int(cfg.get("n", 3))
-        days = int(cfg.get("days", 30))
-        outfile = cfg.get("outfile")
-        level = cfg.get("level", "intermediate")
-    else:
-        topics = [t.strip() for t in (args.topics or "").split(",") if t.strip()]
-        n = args.n
-        days = args.days
-        outfile = args.outfile
-        level = args.level
-
-    if not topics:
-        topics = ["computational linguistics"]  # sane default
-
-    all_papers = fetch_arxiv(topics=topics, days=days, max_results=50)
-    top_papers = simple_rank(all_papers, topics, top_k=max(1, min(3, n)))
-    # Add naive "why it matters" blurbs
-    for p in top_papers:
-        p["why_it_matters"] = why_it_matters_blurb(p)
-
-    digest_md = render_digest(top_papers, topics, level)
-
-    if outfile:
-        with open(outfile, "w", encoding="utf-8") as f:
-            f.write(digest_md)
-        print(f"Wrote digest to {outfile}")
+    state = StateStore(profile["state"]) if profile["state"] else None
+    corpus = cache = None
+    try:
+        key = topic_key(topics)
+        since = state.high_water(key) if state else None
+        emitted = state.emitted_ids(key) if state else None
+
+        corpus = open_corpus(profile)
+        # The response cache also memoizes summaries, so it stays open until the digest is built
+        cache = client.cache if client else open_cache(args, profile)
+        if profile["offline"]:
+            with metrics.stage("fetch"):
+                all_papers = corpus.papers_for(topics, window_cutoff(profile["days"], since))
+        elif not arxiv_only(profile["sources"]):
+            if client:
+                client.metrics = metrics
+            with metrics.stage("fetch"):
+                all_papers = fetch_from_sources(args, profile, window_cutoff(profile["days"], since),
+                                                cache, metrics, client=client)
+        elif client:
+            import asyncio
+            client.metrics = metrics
+            with metrics.stage("fetch"):
+                all_papers = asyncio.run(fetch_arxiv_async(topics, profile["days"], max_results=50,
+                                                           harvest=profile["harvest"], max_pages=profile["max_pages"],
+                                                           api_url=args.api_url, since=since, client=client,
+                                                           plan=profile["query_plan"]))
+        else:
+            with metrics.stage("fetch"):
+                all_papers = fetch_arxiv(topics=topics, days=profile["days"], max_results=50,
+                                         harvest=profile["harvest"], max_pages=profile["max_pages"],
+                                         workers=args.workers, api_url=args.api_url, delay=args.delay,
+                                         cache=cache, since=since, parser=args.parser, metrics=metrics,
+                                         plan=profile["query_plan"])
+        if corpus and not profile["offline"]:
+            with metrics.stage("corpus"):
+                corpus.add(all_papers)
+
+        top_papers, context = build_digest(all_papers, profile, exclude=emitted, summaries=cache, metrics=metrics)
+        write_digest(context, profile["sinks"], metrics=metrics, template_cache=template_cache(args, profile))
+
+        if state:
+            state.record(key, topics, all_papers, top_papers)
+    finally:
+        # Also on a failed source or fetch, so long-lived serve / API processes do not leak handles
+        if corpus:
+            corpus.close()
+        if cache and not client:
+            cache.close()
+        if state:
+            state.close()
+
+def run_batch(argv: List[str]):
+    """Union topics across profiles, fetch each distinct topic query once, fan out."""
+    args = parse_batch_args(argv)
+    paths = collect_configs(args.configs)
+    if not paths:
+        sys.exit("No config files found")
+    profiles = [profile_from_config(load_config(path), args, path=path) for path in paths]
+    try:
+        with instrument("batch", "batch", args.metrics, args.cprofile) as metrics:
+            batch_profiles(args, profiles, metrics)
+    except SourcesFailed as e:
+        sys.exit(str(e))
+
+def batch_profiles(args, profiles: List[Dict[str, Any]], metrics: RunMetrics):
+    # State is read up front and written back after all digests are out
+    for prof in profiles:
+        prof["key"] = topic_key(prof["topics"])
+        since, prof["exclude"] = None, None
+        if prof["state"]:
+            with StateStore(prof["state"]) as state:
+                since = state.high_water(prof["key"])
+                prof["exclude"] = state.emitted_ids(prof["key"])
+        prof["cutoff"] = window_cutoff(prof["days"], since)
+
+    # One query per distinct topic, widened to the most demanding profile using it
+    plans: Dict[str, Dict[str, Any]] = {}
+    query_topic: Dict[str, str] = {}
+    for prof in profiles:
+        for topic in prof["topics"]:
+            query = arxiv_search_query([topic])
+            query_topic[query] = topic
+            plan = plans.setdefault(query, {"cutoff": prof["cutoff"], "max_results": 50,
+                                            "harvest": False, "max_pages": 1})
+            plan["cutoff"] = min(plan["cutoff"], prof["cutoff"])
+            plan["harvest"] = plan["harvest"] or prof["harvest"]
+            plan["max_pages"] = max(plan["max_pages"], prof["max_pages"])
+
+    corpus = open_corpus({"corpus": args.corpus, "offline": args.offline})
+    if args.offline:
+        with metrics.stage("fetch"):
+            fetched = {query: corpus.papers_for([query_topic[query]], plan["cutoff"])
+                       for query, plan in plans.items()}
     else:
-        print(digest_md)
+        sources = profile_sources(args.sources)  # like other fetch flags, shared by the whole batch
+        cache = open_cache(args, {"cache": args.cache, "cache_ttl": args.cache_ttl})
+        try:
+            with metrics.stage("fetch"):
+                fetched = {}
+                if not arxiv_only(sources):
+                    fetched = fetch_plans_from_sources(args, sources, plans, query_topic, cache, metrics)
+                elif cache:
+                    fetched = {query: fetch_cached(cache, query, api_url=args.api_url, metrics=metrics, **plan)
+                               for query, plan in plans.items()}
+                missing = {query: plan for query, plan in plans.items() if fetched.get(query) is None}
+                if missing:
+                    import asyncio
+                    with ArxivClient(concurrency=args.workers, delay=args.delay, cache=cache,
+                                     parser=args.parser, metrics=metrics) as client:
+                        fetched.update(asyncio.run(client.fetch_many(missing, api_url=args.api_url)))
+                        # Per-topic queries already; their counts still teach single-profile runs' planner
+                        for query, plan in missing.items():
+                            observe(client.rates, [TopicGroup((query_topic[query],), plan["max_pages"])],
+                                    [fetched[query]], plan["cutoff"], plan["max_results"], plan["harvest"])
+        finally:
+            if cache:
+                cache.close()
+        if corpus:
+            with metrics.stage("corpus"):
+                for papers in fetched.values():
+                    corpus.add(papers)
+    if corpus:
+        corpus.close()
+    print(f"Fetched {len(plans)} unique queries for {len(profiles)} profiles", file=sys.stderr)
+
+    # Tokenize and sketch the whole candidate pool once for every profile
+    pool_papers = list({p.id: p for papers in fetched.values() for p in papers}.values())
+    index = clusters = None
+    if any(prof["ranker"] == "bm25" for prof in profiles):
+        from ranking import TermIndex
+        with metrics.stage("index"):
+            index = TermIndex(pool_papers)
+    if any(prof["dedup"] for prof in profiles):
+        with metrics.stage("dedup"):
+            clusters = ClusterIndex(pool_papers)
+
+    def select(prof: Dict[str, Any]):
+        merged: Dict[str, Paper] = {}
+        for topic in prof["topics"]:
+            for p in fetched[arxiv_search_query([topic])]:
+                if p.published >= prof["cutoff"] and p.id not in merged:
+                    merged[p.id] = p.copy()  # profiles annotate their own copies
+        papers = list(merged.values())
+        top_papers, context = build_digest(papers, prof, exclude=prof["exclude"], index=index,
+                                           clusters=clusters, blurbs=False, metrics=metrics)
+        return papers, top_papers, context
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(len(profiles), 8)) as pool:
+        results = list(pool.map(select, profiles))
+        # Every profile's picks in one batch; a paper several profiles picked is summarized once
+        with metrics.stage("blurbs"):
+            summaries = open_cache(args, {"cache": args.cache, "cache_ttl": args.cache_ttl})
+            try:
+                summarize_papers([p for _, top_papers, _ in results for p in top_papers],
+                                 cache=summaries, metrics=metrics)
+            finally:
+                if summaries:
+                    summaries.close()
+        templates = template_cache(args, {"cache": args.cache})
+        list(pool.map(lambda prof, r: write_digest(r[2], prof["sinks"], metrics=metrics, template_cache=templates),
+                      profiles, results))
+
+    for prof, (papers, top_papers, _) in zip(profiles, results):
+        if prof["state"]:
+            with StateStore(prof["state"]) as state:
+                state.record(prof["key"], prof["topics"], papers, top_papers)
+
+def run_serve(argv: List[str]):
+    """Daemon mode: profiles loaded once, one pooled session and cache, runs on a schedule."""
+    from profile_scheduler import Scheduler, parse_interval
+    args = parse_serve_args(argv)
+    cache = open_cache(args, {"cache": args.cache, "cache_ttl": args.cache_ttl})
+    client = ArxivClient(concurrency=args.workers, delay=args.delay, cache=cache, parser=args.parser)
+
+    def load(path: str):
+        cfg = load_config(path) or {}
+        return profile_from_config(cfg, args, path=path), parse_interval(cfg.get("every", args.every))
+
+    def run(profile: Dict[str, Any]):
+        with instrument("serve", profile["name"], args.metrics, args.cprofile) as metrics:
+            digest_profile(args, profile, metrics, client=client)
+
+    scheduler = Scheduler(lambda: collect_configs(args.configs), load, run,
+                          jitter=args.jitter, retry=args.retry, poll=args.poll)
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop.set())
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        if cache:
+            cache.close()
+
+def run_api(argv: List[str]):
+    """HTTP digests: shared cache and client, identical concurrent fetches coalesced."""
+    from digest_api import BackgroundLoop, DigestRequest, DigestServer, SingleFlight, UpstreamError
+    requests = require("requests")
+    args = parse_api_args(argv)
+    cache = open_cache(args, {"cache": args.cache, "cache_ttl": args.cache_ttl})
+    client = ArxivClient(concurrency=args.workers, delay=args.delay, cache=cache, parser=args.parser)
+    sources = profile_sources(args.sources)
+    templates = template_cache(args, {"cache": args.cache})
+    loop = BackgroundLoop()
+    flights = SingleFlight()
+
+    async def fetch(topics: List[str], days: int) -> List[Paper]:
+        # Keyed on the upstream query, so md/json or different n share one fetch
+        if arxiv_only(sources):
+            return await flights.do((arxiv_search_query(topics), days), lambda: fetch_arxiv_async(
+                topics, days, max_results=50, harvest=args.harvest, max_pages=args.max_pages,
+                api_url=args.api_url, client=client, plan=args.query_plan))
+        return await flights.do((arxiv_search_query(topics), days), lambda: fetch_sources(
+            build_sources(sources, client, args, args.harvest, args.max_pages, args.query_plan),
+            topics, window_cutoff(days), client.metrics))
+
+    def make_digest(req: DigestRequest) -> str:
+        level = req.level or "intermediate"
+        ranker = req.ranker or args.ranker
+        if level not in GUIDANCE_MAP:
+            raise ValueError(f"level must be one of: {', '.join(GUIDANCE_MAP)}")
+        if ranker not in RANKERS:
+            raise ValueError(f"ranker must be one of: {', '.join(RANKERS)}")
+        try:
+            papers = loop.run(fetch(list(req.topics), req.days), timeout=args.request_timeout)
+        except requests.RequestException as e:
+            raise UpstreamError(f"arXiv request failed: {e}")
+        except SourcesFailed as e:
+            raise UpstreamError(str(e))
+        # Coalesced callers share the fetched records; ranking annotates its own copies
+        papers = [p.copy() for p in papers]
+        profile = {"topics": list(req.topics), "n": req.n, "level": level, "ranker": ranker}
+        _, context = build_digest(papers, profile, summaries=cache, metrics=client.metrics)
+        return "".join(render_chunks(req.format, context, templates))
+
+    def stats() -> Dict[str, Any]:
+        return {"fetches": flights.calls, "coalesced": flights.shared, **client.metrics.snapshot()["counters"]}
+
+    server = DigestServer((args.host, args.port), make_digest, stats)
+    print(f"Serving digests on http://{args.host}:{server.server_address[1]}/digest", file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        loop.close()
+        client.close()
+        if cache:
+            cache.close()
+
+def run_search(argv: List[str]):
+    args = parse_search_args(argv)
+    since = dt.datetime.utcnow() - dt.timedelta(days=args.days) if args.days else None
+    with PaperCorpus(args.corpus) as corpus:
+        hits = corpus.search(" ".join(args.query), limit=args.n, since=since)
+    for p in hits:
+        print(f"{p.published:%Y-%m-%d}  {p.id:<18} [{p.primary_category or '—'}] {p.title}")
+    if not hits:
+        print("No matches.", file=sys.stderr)
+
+COMMANDS = {
+    "batch": run_batch,
+    "serve": run_serve,
+    "api": run_api,
+    "search": run_search,
+}
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    return run_digest(argv)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
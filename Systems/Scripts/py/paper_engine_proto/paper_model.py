@@ -0,0 +1,97 @@
+"""
+Paper Records
+-------------
+Compact paper types shared by every paper_engine stage.
+- Paper: one record with __slots__ (no per-instance dict), tuple authors and
+  interned category strings. Attribute access works unchanged in the Jinja templates.
+- PaperBatch: columnar view of many papers (parallel lists plus a float64
+  timestamp array) for batch scoring.
+"""
+
+import datetime as dt
+import sys
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence
+
+EPOCH = dt.datetime(1970, 1, 1)
+FIELDS = ("id", "title", "summary", "published", "link", "pdf", "authors", "primary_category",
+          "score", "why_it_matters", "doi")
+
+
+class Paper:
+    __slots__ = FIELDS
+
+    def __init__(self, id: str, title: str, summary: str, published: dt.datetime, link: str = "",
+                 pdf: Optional[str] = None, authors: Iterable[str] = (), primary_category: str = "",
+                 score: float = 0.0, why_it_matters: Optional[str] = None, doi: Optional[str] = None):
+        self.id = id
+        self.title = title
+        self.summary = summary
+        self.published = published
+        self.link = link
+        self.pdf = pdf
+        self.authors = tuple(authors)
+        # A few hundred distinct categories shared by every paper
+        self.primary_category = sys.intern(primary_category or "")
+        self.score = score
+        self.why_it_matters = why_it_matters
+        self.doi = doi
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Paper":
+        return cls(**{k: d[k] for k in FIELDS if k in d})
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {k: getattr(self, k) for k in FIELDS}
+        d["authors"] = list(self.authors)
+        return d
+
+    def copy(self) -> "Paper":
+        return Paper(*(getattr(self, k) for k in FIELDS))
+
+    def __reduce__(self):
+        # Positional tuple pickles smaller than the default slots state dict
+        return (Paper, tuple(getattr(self, k) for k in FIELDS))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Paper):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Paper(id={self.id!r}, title={self.title[:40]!r}, published={self.published:%Y-%m-%d})"
+
+
+class PaperBatch:
+    """Column-oriented view of a paper list.
+
+    `published` is an array('d') of seconds since the epoch, so NumPy can wrap
+    it without copying (np.frombuffer). Indexing returns the original Paper.
+    """
+
+    __slots__ = ("papers", "ids", "titles", "summaries", "categories", "published")
+
+    def __init__(self, papers: Sequence[Paper]):
+        self.papers = list(papers)
+        self.ids = [p.id for p in self.papers]
+        self.titles = [p.title for p in self.papers]
+        self.summaries = [p.summary for p in self.papers]
+        self.categories = [p.primary_category for p in self.papers]
+        self.published = array("d", ((p.published - EPOCH).total_seconds() for p in self.papers))
+
+    def texts(self) -> Iterator[str]:
+        for title, summary in zip(self.titles, self.summaries):
+            yield title + " " + summary
+
+    def __len__(self) -> int:
+        return len(self.papers)
+
+    def __getitem__(self, i: int) -> Paper:
+        return self.papers[i]
+
+    def __iter__(self) -> Iterator[Paper]:
+        return iter(self.papers)
+
+
+def as_batch(papers) -> PaperBatch:
+    return papers if isinstance(papers, PaperBatch) else PaperBatch(papers)
@@ -0,0 +1,234 @@
+"""
+Paper Sources
+-------------
+Pluggable paper sources for paper_engine.py, fetched side by side and merged.
+- A source turns (topics, window cutoff) into paper_model.Paper records.
+  arXiv is one (paper_engine.ArxivSource); a local JSON Lines file is another.
+- fetch_sources runs every source concurrently, each under its own timeout.
+  A source that fails or times out is reported and skipped, and the others still count.
+  If every source fails, SourcesFailed names each one and why.
+- Results are merged in source order: records with the same DOI, or else the
+  same normalized title, are one paper. The first source's record is kept and
+  later ones only fill in what it lacks (DOI, PDF link, category).
+
+JSONL records use the Paper field names; `abstract`, `url`, `category` and
+`date` are accepted as aliases. Only `title` and `published` are required: a
+record with neither `id` nor `doi` gets a stable "jsonl:" ID from its title and
+date, so dedup, batch pooling and the corpus still tell such records apart.
+"""
+
+import abc
+import datetime as dt
+import hashlib
+import json
+import sys
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+from paper_model import Paper
+from ranking import tokenize
+from run_metrics import RunMetrics
+
+ARXIV = "arxiv"
+SOURCE_TIMEOUT = 120.0     # seconds per source, harvests included
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "doi:")
+FILL_FIELDS = ("doi", "pdf", "primary_category", "link")
+
+
+class SourcesFailed(RuntimeError):
+    """Every source of a fetch failed; `failures` maps source name -> reason."""
+
+    def __init__(self, failures: List[Tuple[str, str]]):
+        self.failures = failures
+        super().__init__("No papers: every source failed (" +
+                         "; ".join(f"{name}: {reason}" for name, reason in failures) + ")")
+
+
+class PaperSource(abc.ABC):
+    """Base class: `fetch` returns records at or after `cutoff` matching any of `topics`, newest first."""
+
+    name = "source"
+
+    def __init__(self, timeout: Optional[float] = SOURCE_TIMEOUT):
+        self.timeout = timeout
+
+    def describe(self) -> str:
+        """Source name for messages, specific enough to tell two of one type apart."""
+        return self.name
+
+    @abc.abstractmethod
+    async def fetch(self, topics: List[str], cutoff: dt.datetime) -> List[Paper]:
+        """Records for the window; a plugin without it fails when constructed."""
+
+
+def parse_date(value: str) -> dt.datetime:
+    """ISO date or timestamp -> naive UTC, like the Atom parsers produce."""
+    stamp = dt.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return stamp
+
+
+def record_id(title: str, published: dt.datetime) -> str:
+    """Stable ID for a record without one: the same paper gets the same ID on every read."""
+    blob = f"{' '.join(tokenize(title))}\0{published.isoformat()}"
+    return "jsonl:" + hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def record_to_paper(rec: Dict[str, Any]) -> Paper:
+    """One JSONL object -> Paper. Raises KeyError / ValueError / TypeError on bad records."""
+    doi = normalize_doi(rec.get("doi"))
+    authors = rec.get("authors") or ()
+    if isinstance(authors, str):
+        authors = [a.strip() for a in authors.split(",") if a.strip()]
+    title = " ".join(rec["title"].split())
+    published = parse_date(rec.get("published") or rec["date"])
+    return Paper(
+        id=str(rec.get("id") or doi or record_id(title, published)),
+        title=title,
+        summary=(rec.get("summary") or rec.get("abstract") or "").strip(),
+        published=published,
+        link=rec.get("link") or rec.get("url") or (f"https://doi.org/{doi}" if doi else ""),
+        pdf=rec.get("pdf"),
+        authors=authors,
+        primary_category=rec.get("primary_category") or rec.get("category") or "",
+        doi=doi,
+    )
+
+
+class JsonlSource(PaperSource):
+    """Papers from a local JSON Lines file, one object per line.
+
+    A record matches a topic when it contains all of the topic's words,
+    the same AND-within / OR-across rule the arXiv query uses.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, path: str, timeout: Optional[float] = SOURCE_TIMEOUT):
+        super().__init__(timeout)
+        self.path = path
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.path}"
+
+    async def fetch(self, topics: List[str], cutoff: dt.datetime) -> List[Paper]:
+        import asyncio
+        return await asyncio.to_thread(self.read, topics, cutoff)
+
+    def read(self, topics: List[str], cutoff: dt.datetime) -> List[Paper]:
+        queries = [q for q in (set(tokenize(t)) for t in topics) if q]
+        papers = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    p = record_to_paper(json.loads(line))
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    raise ValueError(f"{self.path}:{lineno}: bad record ({e!r})") from None
+                if p.published < cutoff:
+                    continue
+                if queries:
+                    words = set(tokenize(p.title + " " + p.summary))
+                    if not any(q <= words for q in queries):
+                        continue
+                papers.append(p)
+        papers.sort(key=lambda p: p.published, reverse=True)
+        return papers
+
+
+# Source types configured by name; arXiv is built by paper_engine around its shared client
+SOURCE_TYPES = {
+    "jsonl": JsonlSource,
+}
+
+
+def source_spec(raw: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """'arxiv', 'jsonl:PATH' or a YAML mapping with a `type` -> spec dict. Raises ValueError."""
+    if isinstance(raw, str):
+        kind, _, path = raw.partition(":")
+        spec: Dict[str, Any] = {"type": kind.strip().lower()}
+        if path:
+            spec["path"] = path
+    elif isinstance(raw, dict) and raw.get("type"):
+        spec = dict(raw, type=str(raw["type"]).lower())
+    else:
+        raise ValueError(f"Bad source {raw!r}: use 'arxiv', 'jsonl:PATH' or a mapping with a type")
+    if spec["type"] != ARXIV and spec["type"] not in SOURCE_TYPES:
+        raise ValueError(f"Unknown source type {spec['type']!r} (use one of: {', '.join([ARXIV, *SOURCE_TYPES])})")
+    if spec["type"] == "jsonl" and not spec.get("path"):
+        raise ValueError("A jsonl source needs a path, e.g. jsonl:papers.jsonl")
+    return spec
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    doi = (doi or "").strip().lower()
+    for prefix in DOI_PREFIXES:
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi or None
+
+
+def merge_keys(p: Paper) -> List[Tuple[str, str]]:
+    doi = normalize_doi(p.doi)   # arXiv DOIs arrive as typed; DOIs are case-insensitive
+    keys = [("doi", doi)] if doi else []
+    title = " ".join(tokenize(p.title))
+    if title:
+        keys.append(("title", title))
+    return keys
+
+
+def merge_papers(results: Sequence[List[Paper]], metrics: Optional[RunMetrics] = None) -> List[Paper]:
+    """One record per paper across sources, newest first; earlier sources win."""
+    metrics = metrics or RunMetrics()
+    merged: List[Paper] = []
+    seen: Dict[Tuple[str, str], int] = {}
+    for papers in results:
+        for p in papers:
+            keys = merge_keys(p)
+            i = next((seen[k] for k in keys if k in seen), None)
+            if i is None:
+                i = len(merged)
+                merged.append(p)
+            else:
+                metrics.incr("papers_merged")
+                missing = [f for f in FILL_FIELDS if not getattr(merged[i], f) and getattr(p, f)]
+                if missing:
+                    merged[i] = merged[i].copy()  # records may be shared with a cache or another caller
+                    for f in missing:
+                        setattr(merged[i], f, getattr(p, f))
+            for k in keys:
+                seen.setdefault(k, i)
+    merged.sort(key=lambda p: p.published, reverse=True)
+    return merged
+
+
+async def fetch_sources(sources: Sequence[PaperSource], topics: List[str], cutoff: dt.datetime,
+                        metrics: Optional[RunMetrics] = None) -> List[Paper]:
+    """Fetch every source concurrently and merge. Raises SourcesFailed only if all of them fail."""
+    import asyncio
+    metrics = metrics or RunMetrics()
+    results = await asyncio.gather(*(asyncio.wait_for(s.fetch(topics, cutoff), s.timeout) for s in sources),
+                                   return_exceptions=True)
+    fetched, failures = [], []
+    for source, result in zip(sources, results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, BaseException):
+            metrics.incr("source_errors")
+            failures.append((source.describe(), failure_reason(source, result)))
+        else:
+            fetched.append(result)
+    if not fetched and failures:
+        raise SourcesFailed(failures)
+    for name, reason in failures:
+        print(f"Source {name} skipped: {reason}", file=sys.stderr)
+    return merge_papers(fetched, metrics)
+
+
+def failure_reason(source: PaperSource, error: BaseException) -> str:
+    import asyncio
+    # wait_for raises asyncio.TimeoutError, an alias of TimeoutError only from Python 3.11
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return f"timed out after {source.timeout:g}s"
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
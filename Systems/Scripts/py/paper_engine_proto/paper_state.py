@@ -0,0 +1,85 @@
+"""
+Paper Engine Run State
+----------------------
+Small SQLite store that lets paper_engine.py run incrementally.
+- Per topic set: the newest submission timestamp seen so far (high-water mark).
+- Per topic set: the arXiv IDs already emitted in a digest.
+
+fetch_arxiv stops paginating at the high-water mark and simple_rank skips
+emitted IDs, so each run only processes papers that are new since the last one.
+"""
+
+import datetime as dt
+import hashlib
+import os
+import sqlite3
+from typing import List, Iterable, Optional, Set
+
+from paper_model import Paper
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_state (
+    key        TEXT PRIMARY KEY,
+    topics     TEXT NOT NULL,
+    high_water TEXT
+);
+CREATE TABLE IF NOT EXISTS emitted (
+    key        TEXT NOT NULL,
+    arxiv_id   TEXT NOT NULL,
+    emitted_at TEXT NOT NULL,
+    PRIMARY KEY (key, arxiv_id)
+);
+"""
+
+
+def topic_key(topics: Iterable[str]) -> str:
+    """Stable key for a topic set: order- and case-insensitive."""
+    norm = sorted({" ".join(t.lower().split()) for t in topics if t.strip()})
+    return hashlib.sha1("\n".join(norm).encode("utf-8")).hexdigest()
+
+
+class StateStore:
+    def __init__(self, path: str):
+        if path != ":memory:":
+            path = os.path.expanduser(path)
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def high_water(self, key: str) -> Optional[dt.datetime]:
+        row = self._db.execute("SELECT high_water FROM topic_state WHERE key = ?", (key,)).fetchone()
+        if not row or not row[0]:
+            return None
+        return dt.datetime.fromisoformat(row[0])
+
+    def emitted_ids(self, key: str) -> Set[str]:
+        rows = self._db.execute("SELECT arxiv_id FROM emitted WHERE key = ?", (key,))
+        return {r[0] for r in rows}
+
+    def record(self, key: str, topics: List[str], seen: List[Paper], emitted: List[Paper]) -> None:
+        """Advance the high-water mark over `seen` and remember `emitted` IDs."""
+        newest = max((p.published for p in seen), default=None)
+        current = self.high_water(key)
+        if current and (newest is None or newest < current):
+            newest = current
+        now = dt.datetime.utcnow().isoformat(timespec="seconds")
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO topic_state VALUES (?, ?, ?)",
+                (key, ", ".join(topics), newest.isoformat() if newest else None)
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO emitted VALUES (?, ?, ?)",
+                [(key, p.id, now) for p in emitted if p.id]
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,181 @@
+"""
+Paper Summaries
+---------------
+Extractive "why it matters" blurbs for paper_engine.py, built after ranking.
+- Abstracts are split into sentences, and every sentence is weighted by
+  TF-IDF. IDF is taken across the sentences of its own abstract, so words
+  every sentence repeats count for little, and a blurb depends only on its
+  abstract, never on which other papers share the batch.
+- Each sentence is scored by cosine similarity to its abstract's centroid.
+  The best sentences (up to SUMMARY_SENTENCES and SUMMARY_WORDS) are kept in
+  abstract order. A lone sentence over SUMMARY_WORDS is cut at the cap.
+- The batch is scored in one pass: sparse NumPy arithmetic from SMALL_POOL
+  sentences up, and the same formula in pure Python below that.
+- Summaries are memoized in the response cache by canonical arXiv ID, checked
+  against a fingerprint of the abstract. A paper picked by many profiles or
+  many runs is summarized once.
+"""
+
+import hashlib
+import itertools
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Dict, Optional, Sequence, TYPE_CHECKING
+
+from paper_dedup import canonical_id
+from paper_model import Paper
+from ranking import SMALL_POOL, tokenize
+from run_metrics import RunMetrics
+
+if TYPE_CHECKING:
+    from arxiv_cache import ResponseCache
+
+SUMMARY_SENTENCES = 2
+SUMMARY_WORDS = 45        # a second sentence is only added while the blurb stays this short
+MIN_SENTENCE_WORDS = 5    # shorter fragments ("Code is available.") only win if nothing else is left
+SUMMARY_VERSION = "centroid-2"   # part of the memo fingerprint; bump when the scoring changes
+FALLBACK = "This paper potentially advances the topic with new findings or synthesis."
+
+# Sentence end: terminal punctuation, whitespace, then something that can start a
+# sentence. "e.g. the" and "Fig. 3a" stay whole.
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[\"'$\\])")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or our
+such that the their these this those to was we were which while with
+""".split())
+
+
+def split_sentences(text: str) -> List[str]:
+    text = " ".join((text or "").split())
+    return SENTENCE_RE.split(text) if text else []
+
+
+def content_terms(sentence: str) -> List[str]:
+    return [t for t in tokenize(sentence) if t not in STOPWORDS]
+
+
+def centroid_scores(docs: Sequence[Sequence[List[str]]]) -> List[List[float]]:
+    """Cosine of each sentence's TF-IDF vector with its document's centroid.
+
+    `docs[i][j]` is the term list of sentence j of document i; IDF counts the
+    sentences of document i only, so each document is scored on its own.
+    """
+    scores: List[List[float]] = []
+    for doc in docs:
+        df = Counter(t for sent in doc for t in set(sent))
+        idf = {t: math.log1p((len(doc) - n + 0.5) / (n + 0.5)) for t, n in df.items()}
+        vecs = [{t: tf * idf[t] for t, tf in Counter(sent).items()} for sent in doc]
+        centroid: Dict[str, float] = defaultdict(float)
+        for vec in vecs:
+            for t, w in vec.items():
+                centroid[t] += w
+        c_norm = math.sqrt(sum(w * w for w in centroid.values()))
+        row = []
+        for vec in vecs:
+            norm = math.sqrt(sum(w * w for w in vec.values()))
+            dot = sum(w * centroid[t] for t, w in vec.items())
+            row.append(dot / (norm * c_norm) if norm and c_norm else 0.0)
+        scores.append(row)
+    return scores
+
+
+def centroid_scores_np(docs: Sequence[Sequence[List[str]]]) -> List[List[float]]:
+    """centroid_scores() as sparse NumPy arithmetic over a (sentence, term) COO matrix."""
+    import numpy as np
+    vocab: Dict[str, int] = defaultdict(itertools.count().__next__)
+    rows: List[int] = []
+    terms: List[int] = []
+    counts: List[int] = []
+    owners: List[int] = []   # document of each entry
+    sent_doc: List[int] = []
+    for d, doc in enumerate(docs):
+        for sent in doc:
+            bag = Counter(sent)
+            rows.extend([len(sent_doc)] * len(bag))
+            owners.extend([d] * len(bag))
+            terms.extend(map(vocab.__getitem__, bag))
+            counts.extend(bag.values())
+            sent_doc.append(d)
+    n_docs, n_sents, n_terms = len(docs), len(sent_doc), max(len(vocab), 1)
+    row = np.asarray(rows, dtype=np.int64)
+    term = np.asarray(terms, dtype=np.int64)
+    # (document, term) cells: sentence frequency within the document, and centroid weights
+    cells, cell = np.unique(np.asarray(owners, dtype=np.int64) * n_terms + term, return_inverse=True)
+    df = np.bincount(cell, minlength=len(cells)).astype(np.float64)   # one entry per sentence holding the term
+    doc_sents = np.bincount(np.asarray(sent_doc, dtype=np.int64), minlength=n_docs).astype(np.float64)
+    idf = np.log1p((doc_sents[cells // n_terms] - df + 0.5) / (df + 0.5))
+    w = np.asarray(counts, dtype=np.float64) * idf[cell]
+    centroid = np.bincount(cell, weights=w, minlength=len(cells))
+    c_norm = np.sqrt(np.bincount(cells // n_terms, weights=centroid * centroid, minlength=n_docs))
+    norm = np.sqrt(np.bincount(row, weights=w * w, minlength=n_sents))
+    dot = np.bincount(row, weights=w * centroid[cell], minlength=n_sents)
+    denom = norm * c_norm[np.asarray(sent_doc, dtype=np.int64)]
+    flat = np.divide(dot, denom, out=np.zeros(n_sents), where=denom > 0).tolist()
+    bounds = list(itertools.accumulate(map(len, docs), initial=0))
+    return [flat[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def pick_sentences(sentences: List[str], scores: List[float], terms: List[List[str]]) -> str:
+    """Best-scoring sentences within the length budget, in their original order.
+
+    If no sentence fits the budget, the best one is cut at SUMMARY_WORDS.
+    """
+    order = sorted(range(len(sentences)),
+                   key=lambda j: (len(terms[j]) < MIN_SENTENCE_WORDS, -scores[j]))  # stable: earlier wins ties
+    chosen: List[int] = []
+    words = 0
+    for j in order:
+        n = len(sentences[j].split())
+        if words + n > SUMMARY_WORDS:
+            continue
+        chosen.append(j)
+        words += n
+        if len(chosen) == SUMMARY_SENTENCES:
+            break
+    if not chosen:
+        return " ".join(sentences[order[0]].split()[:SUMMARY_WORDS]).rstrip(",;:") + "…"
+    return " ".join(sentences[j] for j in sorted(chosen))
+
+
+def summarize_abstracts(abstracts: Sequence[str]) -> List[str]:
+    """One extractive blurb per abstract, all scored in one pass; each depends only on its own abstract."""
+    sentences = [split_sentences(a) for a in abstracts]
+    terms = [[content_terms(s) for s in sents] for sents in sentences]
+    n_sentences = sum(map(len, sentences))
+    scores = (centroid_scores if n_sentences < SMALL_POOL else centroid_scores_np)(terms)
+    return [pick_sentences(s, sc, t) if s else FALLBACK for s, sc, t in zip(sentences, scores, terms)]
+
+
+def fingerprint(abstract: str) -> str:
+    return hashlib.blake2b(f"{SUMMARY_VERSION}\0{abstract}".encode(), digest_size=8).hexdigest()
+
+
+def summarize_papers(papers: Sequence[Paper], cache: Optional["ResponseCache"] = None,
+                     metrics: Optional[RunMetrics] = None) -> None:
+    """Set why_it_matters on every paper: memoized summaries first, then one batch for the rest.
+
+    Copies of one paper (and its other versions with the same abstract) are
+    summarized once.
+    """
+    metrics = metrics or RunMetrics()
+    groups: Dict[str, List[Paper]] = defaultdict(list)
+    sources: Dict[str, str] = {}
+    for i, p in enumerate(papers):
+        key, source = canonical_id(p.id), fingerprint(p.summary or "")
+        if not key:
+            key = f"#{i}"  # no ID to memoize under
+        elif sources.setdefault(key, source) != source:
+            key = f"{key}#{i}"  # same ID, different abstract: summarize it separately
+        groups[key].append(p)
+        sources[key] = source
+    memo = cache.get_summaries({k: v for k, v in sources.items() if "#" not in k}) if cache else {}
+    todo = [k for k in groups if k not in memo]
+    fresh = dict(zip(todo, summarize_abstracts([groups[k][0].summary for k in todo])))
+    if cache and fresh:
+        cache.put_summaries({k: (sources[k], text) for k, text in fresh.items() if "#" not in k})
+    metrics.incr("summaries_cached", len(memo))
+    metrics.incr("summaries_computed", len(fresh))
+    for key, members in groups.items():
+        for p in members:
+            p.why_it_matters = memo[key] if key in memo else fresh[key]
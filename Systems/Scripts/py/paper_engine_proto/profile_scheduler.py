@@ -0,0 +1,155 @@
+"""
+Profile Scheduler
+-----------------
+In-process replacement for one cron entry per profile, used by `paper_engine.py serve`.
+- Each profile runs on its own cadence (`every: 6h` in YAML, or the --every default).
+- Jitter: every next run is pushed back by a random fraction of the interval,
+  so profiles sharing a cadence do not hit arXiv at the same moment.
+- Failures back off exponentially from --retry seconds, capped at the cadence.
+- Config files are polled for changes: edited ones are reloaded, new ones
+  (including new files in watched directories) are picked up, and removed ones dropped.
+"""
+
+import datetime as dt
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional
+
+DEFAULT_EVERY = "24h"       # cadence for profiles without `every:`
+DEFAULT_JITTER = 0.1       # fraction of the interval
+DEFAULT_RETRY = 60.0       # seconds before the first retry after a failure
+DEFAULT_POLL = 5.0         # seconds between config change checks
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_interval(value) -> float:
+    """Seconds from 90, "90", "90s", "30m", "6h", "1d" or "2w"."""
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", str(value).lower())
+        if not m:
+            raise ValueError(f"Bad interval {value!r} (use e.g. 90s, 30m, 6h, 1d)")
+        seconds = float(m.group(1)) * UNITS[m.group(2) or "s"]
+    if seconds <= 0:
+        raise ValueError(f"Interval must be positive, got {value!r}")
+    return seconds
+
+
+def log(message: str) -> None:
+    stamp = dt.datetime.now().isoformat(timespec="seconds")
+    print(f"[{stamp}] {message}", file=sys.stderr, flush=True)
+
+
+class Job:
+    __slots__ = ("path", "mtime", "profile", "interval", "next_due", "failures", "last_run")
+
+    def __init__(self, path: str, mtime: float, profile: Dict[str, Any], interval: float, due: float):
+        self.path = path
+        self.mtime = mtime
+        self.profile = profile
+        self.interval = interval
+        self.next_due = due
+        self.failures = 0
+        self.last_run: Optional[float] = None
+
+
+class Scheduler:
+    """Run profiles from config files on their cadence until `stop` is set.
+
+    `discover()` lists the current config paths, `load(path)` turns one into
+    (profile, interval) and `run(profile)` does the work; all three are
+    supplied by the caller. Runs happen one at a time on the calling thread,
+    so they can share one HTTP session, cache and event loop.
+    """
+
+    def __init__(self, discover: Callable[[], List[str]], load: Callable[[str], Any],
+                 run: Callable[[Dict[str, Any]], None], jitter: float = DEFAULT_JITTER,
+                 retry: float = DEFAULT_RETRY, poll: float = DEFAULT_POLL,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        self.discover = discover
+        self.load = load
+        self.run = run
+        self.jitter = max(0.0, jitter)
+        self.retry = max(0.0, retry)
+        self.poll = max(0.1, poll)
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.jobs: Dict[str, Job] = {}
+        self._broken: Dict[str, float] = {}   # path -> mtime of a version that failed to load
+        self.stop = threading.Event()
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1.0 + self.rng.uniform(0.0, self.jitter))
+
+    def reload(self) -> None:
+        """Sync jobs with the config files on disk."""
+        now = self.clock()
+        seen = set()
+        for path in self.discover():
+            seen.add(path)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            job = self.jobs.get(path)
+            if (job and job.mtime == mtime) or self._broken.get(path) == mtime:
+                continue
+            try:
+                profile, interval = self.load(path)
+            except (Exception, SystemExit) as e:
+                # Keep running the last good version until the file is fixed
+                log(f"{path}: not (re)loaded: {e}")
+                self._broken[path] = mtime
+                continue
+            self._broken.pop(path, None)
+            if job is None:
+                self.jobs[path] = Job(path, mtime, profile, interval, due=now)
+                log(f"{profile['name']}: loaded, every {interval:g}s")
+            else:
+                job.mtime, job.profile = mtime, profile
+                if interval != job.interval:
+                    job.interval = interval
+                    if job.last_run is not None and not job.failures:
+                        job.next_due = job.last_run + self._jittered(interval)
+                log(f"{profile['name']}: reloaded, every {interval:g}s")
+        for path in set(self.jobs) - seen:
+            log(f"{self.jobs.pop(path).profile['name']}: config removed")
+        for path in set(self._broken) - seen:
+            del self._broken[path]
+
+    def run_job(self, job: Job) -> None:
+        start = self.clock()
+        job.last_run = start
+        try:
+            self.run(job.profile)
+        except (Exception, SystemExit) as e:
+            job.failures += 1
+            delay = min(self.retry * 2 ** (job.failures - 1), job.interval)
+            job.next_due = self.clock() + self._jittered(delay)
+            log(f"{job.profile['name']}: failed ({type(e).__name__}: {e}); "
+                f"retry {job.failures} in {job.next_due - self.clock():.0f}s")
+            return
+        job.failures = 0
+        job.next_due = start + self._jittered(job.interval)
+        log(f"{job.profile['name']}: done in {(self.clock() - start) * 1000:.0f} ms, "
+            f"next in {job.next_due - self.clock():.0f}s")
+
+    def run_forever(self) -> None:
+        next_poll = 0.0
+        while not self.stop.is_set():
+            now = self.clock()
+            if now >= next_poll:
+                self.reload()
+                next_poll = now + self.poll
+            for job in sorted(self.jobs.values(), key=lambda j: j.next_due):
+                if self.stop.is_set() or job.next_due > self.clock():
+                    break
+                self.run_job(job)
+            upcoming = min((j.next_due for j in self.jobs.values()), default=next_poll)
+            self.stop.wait(max(0.0, min(upcoming, next_poll) - self.clock()))
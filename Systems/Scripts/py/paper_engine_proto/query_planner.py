@@ -0,0 +1,140 @@
+"""
+arXiv Query Planner
+-------------------
+Decide how a profile's topics become arXiv requests, used by paper_engine.py.
+- One OR-ed query for every topic is the cheapest plan, but a page holds only
+  max_results entries, and one busy topic can fill it and crowd out the rest.
+- TopicRates keeps a running estimate of results per day for each topic,
+  learned from earlier fetches and stored in the response cache.
+- plan_queries packs topics whose expected results fit in one page into
+  shared queries (first-fit decreasing). A busy topic, or one not measured
+  yet, gets its own query and its own page budget.
+- Queries run concurrently and are merged by ID. Each fetched plan feeds its
+  counts back into the estimates; papers from a shared query are credited to
+  every topic whose words they contain.
+
+Modes: "auto" (the planner), "combined" (one query, the old behaviour) and
+"split" (one query per topic).
+"""
+
+import datetime as dt
+import math
+from typing import List, Dict, Iterable, NamedTuple, Optional, Sequence, TYPE_CHECKING
+
+from paper_model import Paper
+from ranking import tokenize
+
+if TYPE_CHECKING:
+    from arxiv_cache import ResponseCache
+
+PLAN_MODES = ["auto", "combined", "split"]
+PACK_FILL = 0.75       # fill a shared page to this fraction of max_results; estimates are noisy
+PAGE_HEADROOM = 1.5    # harvest budget: pages for this many times the expected results
+RATE_WEIGHT = 0.5      # weight of a new observation in the running estimate
+MIN_SPAN_DAYS = 1 / 24
+
+
+class TopicGroup(NamedTuple):
+    topics: tuple
+    pages: int      # page budget when harvesting
+
+
+def topic_name(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+class TopicRates:
+    """Results per day per topic. Kept in memory, and in `cache` when one is given."""
+
+    def __init__(self, cache: Optional["ResponseCache"] = None):
+        self.cache = cache
+        self._rates: Dict[str, float] = {}
+
+    def get(self, topics: Iterable[str]) -> Dict[str, float]:
+        names = [topic_name(t) for t in topics]
+        missing = [n for n in names if n not in self._rates]
+        if missing and self.cache:
+            self._rates.update(self.cache.get_topic_rates(missing))
+        return {t: self._rates[n] for t, n in zip(topics, names) if n in self._rates}
+
+    def observe(self, counts: Dict[str, int], span_days: float) -> None:
+        updated = {}
+        for topic, count in counts.items():
+            name = topic_name(topic)
+            rate = count / max(span_days, MIN_SPAN_DAYS)
+            old = self._rates.get(name)
+            updated[name] = rate if old is None else (1 - RATE_WEIGHT) * old + RATE_WEIGHT * rate
+        self._rates.update(updated)
+        if self.cache and updated:
+            self.cache.put_topic_rates(updated)
+
+
+def budget(expected: Optional[float], page_size: int, max_pages: int) -> int:
+    """Pages to allow a query expected to return `expected` results (None: unknown)."""
+    if expected is None:
+        return max_pages
+    return max(1, min(max_pages, math.ceil(expected * PAGE_HEADROOM / page_size)))
+
+
+def plan_queries(topics: Sequence[str], window_days: float, rates: Dict[str, float], page_size: int,
+                 max_pages: int = 1, mode: str = "auto") -> List[TopicGroup]:
+    """Topic groups to query, one request (or harvest walk) each, in the topics' order."""
+    topics = list(dict.fromkeys(topics))
+    expected = {t: rates[t] * window_days for t in topics if t in rates}
+    if mode == "combined" or len(topics) <= 1:
+        known = len(expected) == len(topics)
+        return [TopicGroup(tuple(topics), budget(sum(expected.values()) if known else None, page_size, max_pages))]
+    if mode == "split":
+        return [TopicGroup((t,), budget(expected.get(t), page_size, max_pages)) for t in topics]
+    capacity = page_size * PACK_FILL
+    groups: Dict[str, List[str]] = {}   # first topic -> members
+    loads: Dict[str, float] = {}
+    solo = [t for t in topics if expected.get(t, capacity + 1) > capacity]
+    for t in sorted((t for t in topics if t not in solo), key=lambda t: -expected[t]):
+        home = next((g for g in groups if loads[g] + expected[t] <= capacity), None)
+        if home is None:
+            home, groups[t], loads[t] = t, [], 0.0
+        groups[home].append(t)
+        loads[home] += expected[t]
+    for t in solo:
+        groups[t], loads[t] = [t], expected.get(t)
+    order = {t: i for i, t in enumerate(topics)}
+    plans = []
+    for home, members in groups.items():
+        members.sort(key=order.__getitem__)
+        plans.append((order[members[0]], TopicGroup(tuple(members), budget(loads[home], page_size, max_pages))))
+    return [group for _, group in sorted(plans)]
+
+
+def topic_counts(group: TopicGroup, papers: Sequence[Paper]) -> Dict[str, int]:
+    """Papers per topic of a group; a shared query's papers count for each topic whose words they contain."""
+    if len(group.topics) == 1:
+        return {group.topics[0]: len(papers)}
+    words = [set(tokenize(t)) for t in group.topics]
+    counts = dict.fromkeys(group.topics, 0)
+    for p in papers:
+        text = set(tokenize(p.title + " " + p.summary))
+        for topic, need in zip(group.topics, words):
+            if need and need <= text:
+                counts[topic] += 1
+    return counts
+
+
+def observe(rates: TopicRates, groups: Sequence[TopicGroup], results: Sequence[List[Paper]],
+            cutoff: dt.datetime, page_size: int, harvest: bool) -> None:
+    """Update `rates` from fetched groups. A full page budget means the window was cut short,
+    so the rate is taken over the time span actually covered."""
+    now = dt.datetime.utcnow()
+    for group, papers in zip(groups, results):
+        truncated = len(papers) >= page_size * (group.pages if harvest else 1)
+        oldest = papers[-1].published if truncated and papers else cutoff
+        rates.observe(topic_counts(group, papers), (now - oldest).total_seconds() / 86400.0)
+
+
+def merge_results(results: Sequence[List[Paper]]) -> List[Paper]:
+    """Union of several newest-first result lists by ID, newest first."""
+    if len(results) == 1:
+        return results[0]
+    merged = list({p.id: p for papers in reversed(results) for p in papers}.values())
+    merged.sort(key=lambda p: p.published, reverse=True)
+    return merged
@@ -0,0 +1,191 @@
+"""
+Paper Engine Run Metrics
+------------------------
+Per-run instrumentation for paper_engine.py, cheap enough to leave on in cron.
+- Stage wall times: fetch (network + parse split out), rank, blurbs, render, write.
+- Counters: HTTP requests and bytes, cache hits / 304s / misses, entries
+  parsed, kept and filtered by the date window, papers ranked and emitted.
+- Output: one JSON line appended per run, or a Prometheus textfile
+  (node_exporter textfile collector) replaced atomically — chosen by extension.
+- Optional cProfile dump of the whole run for digging into a slow one.
+
+Stages entered from several threads at once (batch profiles, page downloads)
+add up their time, so e.g. "rank" in a batch run is the sum over profiles.
+"""
+
+import cProfile
+import datetime as dt
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+PROM_PREFIX = "paper_engine"
+PROM_EXTENSIONS = (".prom",)
+
+COUNTER_HELP = {
+    "http_requests": "HTTP requests sent to the arXiv API",
+    "http_bytes": "Response body bytes read from the arXiv API",
+    "cache_hits": "Pages served from the response cache without a request",
+    "cache_not_modified": "Stale cached pages revalidated with a 304",
+    "cache_misses": "Pages downloaded in full while a cache was configured",
+    "entries_parsed": "Atom entries parsed from downloaded pages",
+    "entries_cached": "Entries read from cached pages",
+    "entries_kept": "Entries inside the date window",
+    "entries_filtered": "Entries read but dropped as older than the window",
+    "papers_merged": "Records dropped as the same paper from another source",
+    "source_errors": "Sources that failed or timed out and were skipped",
+    "papers_deduped": "Candidates dropped as other versions or near-duplicates of a ranked paper",
+    "papers_ranked": "Candidate papers handed to the ranker",
+    "papers_emitted": "Papers written to digests",
+    "summaries_cached": "Why-it-matters summaries reused from the cache",
+    "summaries_computed": "Why-it-matters summaries extracted from abstracts",
+    "bytes_written": "Digest bytes written to outfiles or stdout",
+}
+
+
+class RunMetrics:
+    """Stage timings and counters for one run. Safe to share across threads."""
+
+    def __init__(self, command: str = "digest", profile: str = "default"):
+        self.command = command
+        self.profile = profile
+        self.status = "ok"
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "timestamp": dt.datetime.utcfromtimestamp(self.started).isoformat(timespec="seconds") + "Z",
+                "command": self.command,
+                "profile": self.profile,
+                "status": self.status,
+                "stages": {k: round(v, 6) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def write(self, path: str) -> None:
+        if path.endswith(PROM_EXTENSIONS):
+            write_textfile(path, prometheus_text(self.snapshot(), self.started))
+        else:
+            append_jsonl(path, self.snapshot())
+
+
+def prom_labels(**labels: str) -> str:
+    def quote(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{quote(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(snap: Dict[str, Any], started: float) -> str:
+    """Prometheus exposition format; every value is a gauge for the last run."""
+    base = {"command": snap["command"], "profile": snap["profile"]}
+    lines = [
+        f"# HELP {PROM_PREFIX}_last_run_timestamp_seconds Start time of the last run",
+        f"# TYPE {PROM_PREFIX}_last_run_timestamp_seconds gauge",
+        f"{PROM_PREFIX}_last_run_timestamp_seconds{prom_labels(**base)} {started:.3f}",
+        f"# HELP {PROM_PREFIX}_last_run_success 1 if the last run finished without error",
+        f"# TYPE {PROM_PREFIX}_last_run_success gauge",
+        f"{PROM_PREFIX}_last_run_success{prom_labels(**base)} {int(snap['status'] == 'ok')}",
+        f"# HELP {PROM_PREFIX}_stage_seconds Wall time per pipeline stage of the last run",
+        f"# TYPE {PROM_PREFIX}_stage_seconds gauge",
+    ]
+    for stage, seconds in sorted(snap["stages"].items()):
+        lines.append(f"{PROM_PREFIX}_stage_seconds{prom_labels(**base, stage=stage)} {seconds:.6f}")
+    for name, value in sorted(snap["counters"].items()):
+        metric = f"{PROM_PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {COUNTER_HELP.get(name, name.replace('_', ' '))} (last run)")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{prom_labels(**base)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str, text: str) -> None:
+    """Write-then-rename, so a collector scraping mid-run never sees half a file."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def append_jsonl(path: str, record: Dict[str, Any]) -> None:
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    # One short write per run; O_APPEND keeps lines from concurrent runs whole
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+@contextmanager
+def instrument(command: str, profile: str = "default", metrics_path: Optional[str] = None,
+               cprofile_path: Optional[str] = None):
+    """Time a whole run as the "total" stage; write metrics and profile on exit, even on failure."""
+    metrics = RunMetrics(command, profile)
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        with metrics.stage("total"):
+            yield metrics
+    except BaseException:
+        metrics.status = "error"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        if metrics_path:
+            metrics.write(metrics_path)
+
+
+class MeteredChunks:
+    """Wrap a chunk iterator, counting chunk sizes and time spent waiting on its producer.
+
+    Used where a consumer pulls from something slow: the parser reading a
+    socket, or a sink writing what a template renders.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.size = 0
+        self.waited = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            chunk = next(self._chunks)
+        finally:
+            self.waited += time.perf_counter() - t0
+        self.size += len(chunk)
+        return chunk
@@ -0,0 +1,18 @@
+"""Shared fixtures: the modules under test sit one directory up, next to the CLI."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_paper_engine import StandIn, make_entries  # noqa: E402
+
+
+@pytest.fixture
+def stand_in():
+    """A local arXiv API serving 100 entries spread evenly over the last 30 days."""
+    server = StandIn(make_entries(100, seed=7))
+    yield server
+    server.close()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from digest_api import BackgroundLoop, SingleFlight
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALLERS = 8
+
+
+def test_identical_concurrent_requests_share_one_fetch():
+    loop, flights = BackgroundLoop(), SingleFlight()
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        while flights.calls < CALLERS:  # hold the fetch open until every caller has joined
+            await asyncio.sleep(0.01)
+        return ["paper"]
+
+    try:
+        # One thread per caller, like the API's request handlers
+        with ThreadPoolExecutor(CALLERS) as pool:
+            results = list(pool.map(lambda _: loop.run(flights.do(("cortex", 30), fetch), timeout=10),
+                                    range(CALLERS)))
+    finally:
+        loop.close()
+    assert len(runs) == 1
+    assert results == [["paper"]] * CALLERS
+    assert flights.shared == CALLERS - 1
+
+
+@pytest.fixture
+def api(stand_in):
+    """`paper_engine.py api` on a free port, fetching from the stand-in."""
+    proc = subprocess.Popen([sys.executable, "paper_engine.py", "api", "--port", "0", "--no-cache",
+                             "--delay", "0", "--api-url", stand_in.url],
+                            cwd=HERE, stderr=subprocess.PIPE, text=True)
+    try:
+        line = proc.stderr.readline()  # "Serving digests on http://127.0.0.1:PORT/digest"
+        assert "Serving digests on" in line, line
+        yield line.split()[-1]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        proc.stderr.close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            return resp.status, resp.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+@pytest.mark.parametrize("query, message", [
+    ("topics=cortex&level=guru", "level must be one of"),
+    ("topics=cortex&n=0", "n must be between 1 and"),
+    ("topics=cortex&n=three", "n must be an integer"),
+])
+def test_api_rejects_bad_parameters(api, query, message):
+    status, body = get(f"{api}?{query}")
+    assert status == 400
+    assert message in json.loads(body)["error"]
+
+
+def test_api_serves_a_valid_request(api):
+    status, body = get(f"{api}?topics=cortex&n=2&level=expert&format=json")
+    assert status == 200
+    assert len(json.loads(body)["papers"]) == 2
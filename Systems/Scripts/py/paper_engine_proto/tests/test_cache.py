@@ -0,0 +1,41 @@
+import asyncio
+import datetime as dt
+
+import paper_engine as pe
+from arxiv_cache import ResponseCache
+
+QUERY = pe.arxiv_search_query(["cortex"])
+
+
+def fetch(server, cache):
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=31)
+    with pe.ArxivClient(delay=0.0, cache=cache) as client:
+        papers = asyncio.run(client.fetch_query(QUERY, cutoff, max_results=10, api_url=server.url))
+        return papers, client.metrics.snapshot()["counters"]
+
+
+def test_fresh_entry_is_served_without_a_request(stand_in, tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=3600) as cache:
+        first, _ = fetch(stand_in, cache)
+        again, counters = fetch(stand_in, cache)
+    assert stand_in.requests == 1
+    assert counters["cache_hits"] == 1
+    assert [p.id for p in again] == [p.id for p in first]
+
+
+def test_stale_entry_is_revalidated_with_its_etag(stand_in, tmp_path):
+    with ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=0) as cache:
+        first, _ = fetch(stand_in, cache)
+        again, counters = fetch(stand_in, cache)
+    assert stand_in.requests == 2
+    assert counters["cache_not_modified"] == 1
+    assert [p.id for p in again] == [p.id for p in first]
+
+
+def test_entry_cut_at_a_later_cutoff_does_not_serve_a_wider_window(stand_in, tmp_path):
+    url = pe.arxiv_page_url(QUERY, 0, 10, stand_in.url)
+    with ResponseCache(str(tmp_path / "cache.sqlite3")) as cache:
+        cache.put(url, [], floor=dt.datetime.utcnow() - dt.timedelta(days=1))
+        papers, counters = fetch(stand_in, cache)
+    assert stand_in.requests == 1 and "cache_hits" not in counters
+    assert len(papers) == 10
@@ -0,0 +1,49 @@
+import datetime as dt
+import sqlite3
+
+from paper_corpus import PaperCorpus
+from paper_model import Paper
+from paper_sources import merge_papers
+
+PUBLISHED = dt.datetime(2024, 5, 1)
+
+
+def test_doi_round_trips_through_the_corpus(tmp_path):
+    with PaperCorpus(str(tmp_path / "corpus.sqlite3")) as corpus:
+        corpus.add([Paper(id="2405.00001", title="Cortex maps", summary="cortex", published=PUBLISHED,
+                          doi="10.1000/cortex")])
+        [p] = corpus.papers_for(["cortex"], PUBLISHED)
+    assert p.doi == "10.1000/cortex"
+
+
+def test_offline_papers_still_merge_by_doi(tmp_path):
+    with PaperCorpus(str(tmp_path / "corpus.sqlite3")) as corpus:
+        corpus.add([Paper(id="2405.00001", title="Cortex maps", summary="cortex", published=PUBLISHED,
+                          doi="10.1000/cortex")])
+        stored = corpus.papers_for(["cortex"], PUBLISHED)
+    journal = Paper(id="10.1000/cortex", title="Mapping the cortex (journal version)", summary="",
+                    published=PUBLISHED, doi="10.1000/cortex")
+    assert len(merge_papers([stored, [journal]])) == 1
+
+
+def test_later_doi_fills_a_stored_paper(tmp_path):
+    path = str(tmp_path / "corpus.sqlite3")
+    with PaperCorpus(path) as corpus:
+        corpus.add([Paper(id="2405.00001", title="Cortex maps", summary="cortex", published=PUBLISHED)])
+        corpus.add([Paper(id="2405.00001", title="Cortex maps", summary="cortex", published=PUBLISHED,
+                          doi="10.1000/cortex")])
+        [p] = corpus.papers_for(["cortex"], PUBLISHED)
+    assert p.doi == "10.1000/cortex"
+
+
+def test_corpus_from_before_dois_gains_the_column(tmp_path):
+    path = str(tmp_path / "corpus.sqlite3")
+    with PaperCorpus(path) as corpus:
+        corpus.add([Paper(id="2405.00001", title="Cortex maps", summary="cortex", published=PUBLISHED)])
+    db = sqlite3.connect(path)
+    db.execute("ALTER TABLE papers DROP COLUMN doi")
+    db.commit()
+    db.close()
+    with PaperCorpus(path) as corpus:
+        [p] = corpus.papers_for(["cortex"], PUBLISHED)
+    assert p.title == "Cortex maps" and p.doi is None
@@ -0,0 +1,26 @@
+import datetime as dt
+
+from paper_dedup import canonical_id, dedupe
+from paper_model import Paper
+
+ABSTRACT = ("We record spiking activity across layers of mouse visual cortex and show that "
+            "population codes for orientation sharpen over the first weeks of visual experience.")
+
+
+def paper(id, title, summary, days=0):
+    return Paper(id=id, title=title, summary=summary, published=dt.datetime(2024, 5, 1) + dt.timedelta(days=days))
+
+
+def test_canonical_id_drops_prefix_case_and_version():
+    assert canonical_id("arXiv:2401.01234V2") == "2401.01234"
+    assert canonical_id(" 10.1000/ABC ") == "10.1000/abc"
+
+
+def test_versions_and_near_duplicates_collapse_to_the_newest():
+    papers = [
+        paper("2405.00001v1", "Orientation codes in developing cortex", ABSTRACT),
+        paper("2405.00001v2", "Orientation codes in developing cortex", ABSTRACT + " Code is available.", days=3),
+        paper("2405.09999v1", "Orientation codes in developing cortex", ABSTRACT + " Cross-listed.", days=1),
+        paper("2405.00002v1", "Graph learning for molecules", "A message passing model for molecular graphs."),
+    ]
+    assert [p.id for p in dedupe(papers)] == ["2405.00001v2", "2405.00002v1"]
@@ -0,0 +1,67 @@
+import asyncio
+import datetime as dt
+import time
+
+import paper_engine as pe
+
+QUERY = pe.arxiv_search_query(["neural language models"])
+
+
+def harvest(server, days, page_size=10, delay=0.0, **kwargs):
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=days)
+    with pe.ArxivClient(concurrency=4, delay=delay) as client:
+        return asyncio.run(client.fetch_query(QUERY, cutoff, max_results=page_size, harvest=True,
+                                              api_url=server.url, **kwargs))
+
+
+def test_page_zero_closing_the_window_is_the_only_request(stand_in):
+    papers = harvest(stand_in, days=1)
+    assert stand_in.requests == 1
+    assert 1 <= len(papers) < 10
+
+
+def test_later_pages_stop_at_the_page_crossing_the_cutoff(stand_in):
+    # ~3.3 entries a day: 7 days is pages 0-2, and page 2 crosses the cutoff
+    papers = harvest(stand_in, days=7, delay=0.2)
+    assert stand_in.requests == 3
+    assert 20 < len(papers) < 30
+    assert [p.published for p in papers] == sorted((p.published for p in papers), reverse=True)
+
+
+def test_whole_feed_inside_the_window(stand_in):
+    papers = harvest(stand_in, days=31)
+    assert len(papers) == 100
+    # ten full pages, then an empty one; with no delay up to three more may be read ahead
+    assert 11 <= stand_in.requests <= 14
+
+
+def test_max_pages_caps_the_walk(stand_in):
+    assert len(harvest(stand_in, days=31, max_pages=3)) == 30
+    assert stand_in.requests == 3
+
+
+def test_cancelled_waits_hand_their_slots_back():
+    async def run():
+        limiter = pe.HostRateLimiter(10.0)
+        await limiter.wait("arxiv")                     # first slot: now
+        waits = [asyncio.ensure_future(limiter.wait("arxiv")) for _ in range(3)]
+        await asyncio.sleep(0)
+        for task in reversed(waits):
+            task.cancel()
+        await asyncio.gather(*waits, return_exceptions=True)
+        return limiter._next["arxiv"] - time.monotonic()
+
+    assert asyncio.run(run()) <= 10.0
+
+
+def test_harvest_after_cancelled_pages_is_not_delayed(stand_in):
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=7)
+    with pe.ArxivClient(concurrency=4, delay=0.5) as client:
+        async def run():
+            await client.fetch_query(QUERY, cutoff, max_results=10, harvest=True, api_url=stand_in.url)
+            t0 = time.monotonic()
+            await client.fetch_query(QUERY, cutoff, max_results=10, harvest=True, api_url=stand_in.url)
+            return time.monotonic() - t0
+
+        # Three pages at 0.5 s spacing; the two cancelled read-ahead slots add nothing
+        assert asyncio.run(run()) < 2.0
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import paper_engine as pe
+from arxiv_cache import ResponseCache
+from paper_corpus import PaperCorpus
+from paper_state import StateStore
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """HOME in one temporary directory, the working directory in another."""
+    (tmp_path / "work").mkdir()
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.chdir(tmp_path / "work")
+    return tmp_path / "home"
+
+
+def test_cache_path_expands_home(home):
+    ResponseCache("~/.cache/paper_engine/arxiv_cache.sqlite3").close()
+    assert (home / ".cache" / "paper_engine" / "arxiv_cache.sqlite3").exists()
+    assert not os.path.exists("~")
+
+
+def test_cli_cache_flag_expands_home(home, stand_in):
+    pe.run_digest(["--topics", "cortex", "--delay", "0", "--api-url", stand_in.url,
+                   "--cache", "~/x.sqlite3", "--outfile", "digest.md"])
+    assert (home / "x.sqlite3").exists()
+    assert not os.path.exists("~")
+
+
+def test_state_path_expands_home(home):
+    StateStore("~/state/state.sqlite3").close()
+    assert (home / "state" / "state.sqlite3").exists()
+    assert not os.path.exists("~")
+
+
+def test_corpus_path_expands_home(home):
+    PaperCorpus("~/corpus/corpus.sqlite3").close()
+    assert (home / "corpus" / "corpus.sqlite3").exists()
+    assert not os.path.exists("~")
+
+
+def test_failed_fetch_still_closes_the_databases(home, monkeypatch):
+    closed = []
+
+    class Tracked(PaperCorpus):
+        def close(self):
+            closed.append(self.path)
+            super().close()
+
+    monkeypatch.setattr(pe, "PaperCorpus", Tracked)
+    with pytest.raises(Exception):
+        # Nothing listens on port 9: the fetch fails after the corpus is open
+        pe.run_digest(["--topics", "cortex", "--no-cache", "--delay", "0", "--api-url", "http://127.0.0.1:9/api",
+                       "--corpus", "~/corpus.sqlite3", "--state", "~/state.sqlite3"])
+    assert closed == [str(home / "corpus.sqlite3")]
@@ -0,0 +1,61 @@
+import datetime as dt
+
+import pytest
+
+from paper_model import Paper
+from query_planner import TopicGroup, TopicRates, merge_results, observe, plan_queries, topic_counts
+
+NOW = dt.datetime.utcnow()
+RATES = {"spiking networks": 2.0, "dendrites": 3.0, "language models": 100.0}   # results per day
+
+
+def paper(id, title, days):
+    return Paper(id=id, title=title, summary="", published=NOW - dt.timedelta(days=days))
+
+
+def test_quiet_topics_share_a_query_and_busy_or_unknown_ones_get_their_own():
+    topics = ["spiking networks", "language models", "dendrites", "glia"]
+    groups = plan_queries(topics, window_days=7, rates=RATES, page_size=50, max_pages=10)
+    # 14 + 21 expected results fit in 75% of a page; 700 do not; glia has no estimate yet
+    assert groups == [
+        TopicGroup(("spiking networks", "dendrites"), pages=2),
+        TopicGroup(("language models",), pages=10),
+        TopicGroup(("glia",), pages=10),
+    ]
+
+
+def test_a_longer_window_splits_a_shared_query():
+    groups = plan_queries(["spiking networks", "dendrites"], window_days=14, rates=RATES, page_size=50)
+    assert [g.topics for g in groups] == [("spiking networks",), ("dendrites",)]
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("combined", [("spiking networks", "dendrites", "language models")]),
+    ("split", [("spiking networks",), ("dendrites",), ("language models",)]),
+])
+def test_fixed_modes(mode, expected):
+    topics = ["spiking networks", "dendrites", "language models", "dendrites"]
+    groups = plan_queries(topics, window_days=7, rates=RATES, page_size=50, mode=mode)
+    assert [g.topics for g in groups] == expected
+
+
+def test_shared_query_papers_count_for_every_matching_topic():
+    group = TopicGroup(("spiking networks", "dendrites"), pages=1)
+    papers = [paper("1", "Spiking networks with active dendrites", 1), paper("2", "Dendrites", 2),
+              paper("3", "Networks", 3)]
+    assert topic_counts(group, papers) == {"spiking networks": 1, "dendrites": 2}
+
+
+def test_rates_use_the_span_a_full_page_actually_covered():
+    rates, cutoff = TopicRates(), NOW - dt.timedelta(days=30)
+    full = [paper(str(i), "Dendrites", days) for i, days in enumerate([1, 1.5, 2])]
+    observe(rates, [TopicGroup(("dendrites",), 1)], [full], cutoff, page_size=3, harvest=False)
+    # The page filled up 2 days back, so the 30-day window would understate the rate
+    assert rates.get(["dendrites"])["dendrites"] == pytest.approx(1.5, rel=1e-3)
+    observe(rates, [TopicGroup(("glia",), 1)], [full[:2]], cutoff, page_size=3, harvest=False)
+    assert rates.get(["glia"])["glia"] == pytest.approx(2 / 30, rel=1e-3)
+
+
+def test_merge_results_drops_duplicates_and_keeps_newest_first():
+    a, b, c = paper("a", "A", 1), paper("b", "B", 2), paper("c", "C", 3)
+    assert [p.id for p in merge_results([[a, c], [b, c]])] == ["a", "b", "c"]
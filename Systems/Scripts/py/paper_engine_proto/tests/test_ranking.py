@@ -0,0 +1,38 @@
+import datetime as dt
+
+import paper_engine as pe
+from paper_model import Paper, as_batch
+from ranking import TermIndex, bm25_rank, bm25_scores
+
+NOW = dt.datetime.utcnow()
+
+
+def paper(id, title, days=1, summary=""):
+    return Paper(id=id, title=title, summary=summary, published=NOW - dt.timedelta(days=days))
+
+
+def test_default_ranker_is_simple_except_in_batch():
+    assert pe.parse_args([]).ranker == "simple"
+    args = pe.parse_batch_args(["profiles/"])
+    assert pe.profile_from_config({}, args, path="a.yaml")["ranker"] == "bm25"
+    assert pe.profile_from_config({"ranker": "simple"}, args, path="a.yaml")["ranker"] == "simple"
+
+
+def test_bm25_matches_whole_words_only():
+    papers = [paper("1", "Particle physics at scale"), paper("2", "Generative art with diffusion")]
+    scores = {p.id: p.score for p in bm25_rank(papers, ["art"], top_k=2)}
+    assert scores["2"] > scores["1"] == 1.0   # recency alone: 'particle' is not a hit
+    # The substring heuristic counts 'art' inside 'particle' too
+    scores = {p.id: p.score for p in pe.simple_rank(papers, ["art"], top_k=2)}
+    assert scores["1"] == scores["2"] > 1.0
+
+
+def test_term_index_scores_match_pure_python():
+    papers = [paper("1", "Graph Neural Nets", summary="graph, graph! neural\tnets\x00x \x00"),
+              paper("2", ""),
+              paper("3", "Café ÉCOLE", summary="École naïve\u00a0graph"),
+              paper("4", "a\x00b")]
+    terms = ["graph", "école", "nets"]
+    index = TermIndex(papers)
+    assert list(index.doc_len) == [8, 0, 5, 1]
+    assert list(index.bm25(terms)) == bm25_scores(as_batch(papers), terms)
@@ -0,0 +1,112 @@
+import os
+import random
+
+import pytest
+
+from profile_scheduler import Scheduler, parse_interval
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup(tmp_path):
+    """A scheduler over two config files, on a fake clock and without jitter."""
+    intervals = {"fast.yaml": 60.0, "slow.yaml": 3600.0}
+    for name in intervals:
+        (tmp_path / name).write_text("topics: [cortex]\n")
+    clock, ran, failing = Clock(), [], set()
+
+    def load(path):
+        name = os.path.basename(path)
+        return {"name": name}, intervals[name]
+
+    def run(profile):
+        ran.append(profile["name"])
+        if profile["name"] in failing:
+            raise RuntimeError("arXiv is down")
+
+    sched = Scheduler(lambda: sorted(str(p) for p in tmp_path.glob("*.yaml")), load, run,
+                      jitter=0.0, retry=10.0, clock=clock, rng=random.Random(0))
+    sched.reload()
+    return sched, clock, ran, failing, intervals
+
+
+def due(sched):
+    return sorted(os.path.basename(j.path) for j in sched.jobs.values() if j.next_due <= sched.clock())
+
+
+def run_due(sched):
+    for job in sorted(sched.jobs.values(), key=lambda j: j.next_due):
+        if job.next_due <= sched.clock():
+            sched.run_job(job)
+
+
+def test_parse_interval():
+    assert parse_interval("90") == parse_interval("90s") == parse_interval(90) == 90.0
+    assert parse_interval("30m") == 1800.0 and parse_interval("1.5h") == 5400.0
+    for bad in ("soon", "0", "-5m"):
+        with pytest.raises(ValueError):
+            parse_interval(bad)
+
+
+def test_profiles_are_due_on_their_own_cadence(setup):
+    sched, clock, ran, _, _ = setup
+    assert due(sched) == ["fast.yaml", "slow.yaml"]   # new profiles run straight away
+    run_due(sched)
+    assert due(sched) == []
+    clock.now += 59
+    assert due(sched) == []
+    clock.now += 1
+    assert due(sched) == ["fast.yaml"]
+    run_due(sched)
+    clock.now += 3600 - 60
+    assert due(sched) == ["fast.yaml", "slow.yaml"]
+    assert ran == ["fast.yaml", "slow.yaml", "fast.yaml"]
+
+
+def test_jitter_only_delays_the_next_run(setup):
+    sched, clock, _, _, _ = setup
+    sched.jitter = 0.5
+    run_due(sched)
+    fast = sched.jobs[next(p for p in sched.jobs if p.endswith("fast.yaml"))]
+    assert clock.now + 60 <= fast.next_due <= clock.now + 90
+
+
+def test_failures_back_off_up_to_the_cadence(setup):
+    sched, clock, _, failing, _ = setup
+    failing.add("fast.yaml")
+    fast = sched.jobs[next(p for p in sched.jobs if p.endswith("fast.yaml"))]
+    delays = []
+    for _ in range(5):
+        clock.now = fast.next_due
+        sched.run_job(fast)
+        delays.append(fast.next_due - clock.now)
+    assert delays == [10.0, 20.0, 40.0, 60.0, 60.0]
+    failing.clear()
+    clock.now = fast.next_due
+    sched.run_job(fast)
+    assert fast.failures == 0 and fast.next_due == clock.now + 60
+
+
+def test_edited_new_and_removed_configs_are_picked_up(setup, tmp_path, capsys):
+    sched, clock, _, _, intervals = setup
+    run_due(sched)
+    last_run = clock.now
+    clock.now += 30
+    intervals["fast.yaml"] = 120.0
+    os.utime(tmp_path / "fast.yaml", (0, 1))   # a new mtime marks the file as edited
+    intervals["new.yaml"] = 300.0
+    (tmp_path / "new.yaml").write_text("topics: [robotics]\n")
+    (tmp_path / "broken.yaml").write_text("topics: [\n")   # the loader raises for it
+    os.remove(tmp_path / "slow.yaml")
+    sched.reload()
+    assert sorted(os.path.basename(p) for p in sched.jobs) == ["fast.yaml", "new.yaml"]
+    assert due(sched) == ["new.yaml"]
+    assert sched.jobs[str(tmp_path / "fast.yaml")].next_due == last_run + 120
+    assert "broken.yaml: not (re)loaded" in capsys.readouterr().err
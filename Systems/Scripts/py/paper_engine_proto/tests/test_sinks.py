@@ -0,0 +1,68 @@
+import datetime as dt
+import json
+import os
+import stat
+
+import pytest
+
+import digest_sinks
+import paper_engine as pe
+from digest_sinks import sink_for, write_atomic, write_sinks
+from paper_model import Paper
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def failing_chunks():
+    yield "half of a new digest"
+    raise RuntimeError("template error")
+
+
+def test_failed_write_leaves_the_old_digest_and_no_temp_file(tmp_path):
+    path = tmp_path / "digest.md"
+    path.write_text("old digest")
+    with pytest.raises(RuntimeError):
+        write_atomic(str(path), failing_chunks())
+    assert path.read_text() == "old digest"
+    assert os.listdir(tmp_path) == ["digest.md"]
+
+
+def test_replacing_a_digest_keeps_its_mode(tmp_path):
+    path = tmp_path / "digest.md"
+    path.write_text("old digest")
+    os.chmod(path, 0o640)
+    write_atomic(str(path), ["new ", "digest"])
+    assert path.read_text() == "new digest"
+    assert mode(path) == 0o640
+
+
+def test_new_digest_follows_the_umask(tmp_path, monkeypatch):
+    monkeypatch.setattr(digest_sinks, "UMASK", 0o027)
+    write_atomic(str(tmp_path / "digest.md"), ["digest"])
+    assert mode(tmp_path / "digest.md") == 0o640
+
+
+def test_one_context_renders_every_format(tmp_path):
+    paper = Paper(id="2401.00001", title="Dendrites & spikes", summary="Abstract.",
+                  published=dt.datetime(2024, 1, 2), authors=["A. Author"], link="http://arxiv.org/abs/2401.00001")
+    paper.why_it_matters = "It matters."
+    context = {"date": "2024-01-03", "now": dt.datetime(2024, 1, 3), "topics": ["dendrites"],
+               "level": "expert", "guidance": "Skim.", "papers": [paper]}
+    paths = [str(tmp_path / name) for name in ("d.md", "d.html", "d.json", "d.rss")]
+    assert write_sinks([sink_for(p) for p in paths], context) > 0
+    assert "Dendrites & spikes" in (tmp_path / "d.md").read_text()   # Markdown is not escaped
+    assert "Dendrites &amp; spikes" in (tmp_path / "d.html").read_text()
+    assert json.loads((tmp_path / "d.json").read_text())["papers"][0]["id"] == "2401.00001"
+    assert "<title>Dendrites &amp; spikes</title>" in (tmp_path / "d.rss").read_text()
+
+
+def test_compiled_templates_follow_the_cache_option(tmp_path):
+    source = tmp_path / "papers.jsonl"
+    source.write_text('{"title": "Cortex maps", "published": "%s"}\n' % dt.date.today().isoformat())
+    argv = ["--topics", "cortex", "--source", f"jsonl:{source}", "--outfile", str(tmp_path / "d.md")]
+    pe.run_digest(argv + ["--cache", str(tmp_path / "cache" / "arxiv.sqlite3")])
+    assert os.listdir(tmp_path / "cache" / "templates")   # bytecode beside the response cache
+    args = pe.parse_args(argv + ["--no-cache"])
+    assert pe.template_cache(args, pe.profile_from_args(args)) is None
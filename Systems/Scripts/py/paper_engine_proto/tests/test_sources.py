@@ -0,0 +1,127 @@
+import asyncio
+import datetime as dt
+import json
+
+import pytest
+
+import paper_engine as pe
+from paper_dedup import dedupe
+from paper_model import Paper
+from paper_sources import JsonlSource, PaperSource, SourcesFailed, fetch_sources, merge_papers
+from run_metrics import RunMetrics
+
+CUTOFF = dt.datetime(2020, 1, 1)
+
+
+def test_source_without_fetch_fails_when_constructed():
+    class Incomplete(PaperSource):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_all_sources_failing_raises_one_error_naming_them(tmp_path):
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text('{"title": "x"\n')
+    sources = [JsonlSource(str(bad)), JsonlSource(str(tmp_path / "missing.jsonl"))]
+    with pytest.raises(SourcesFailed) as e:
+        asyncio.run(fetch_sources(sources, ["x"], CUTOFF))
+    assert [name for name, _ in e.value.failures] == [f"jsonl:{bad}", f"jsonl:{tmp_path / 'missing.jsonl'}"]
+    assert "FileNotFoundError" in str(e.value)
+
+
+def test_one_failing_source_is_skipped(tmp_path):
+    good = tmp_path / "good.jsonl"
+    good.write_text('{"title": "Cortex maps", "published": "2024-05-01"}\n')
+    sources = [JsonlSource(str(tmp_path / "missing.jsonl")), JsonlSource(str(good))]
+    papers = asyncio.run(fetch_sources(sources, ["cortex"], CUTOFF))
+    assert [p.title for p in papers] == ["Cortex maps"]
+
+
+def test_slow_source_is_reported_as_timed_out(tmp_path):
+    class Stalled(PaperSource):
+        name = "stalled"
+
+        async def fetch(self, topics, cutoff):
+            await asyncio.sleep(10)
+
+    good = tmp_path / "good.jsonl"
+    good.write_text('{"title": "Cortex maps", "published": "2024-05-01"}\n')
+    with pytest.raises(SourcesFailed) as e:
+        asyncio.run(fetch_sources([Stalled(timeout=0.05)], ["cortex"], CUTOFF))
+    assert e.value.failures == [("stalled", "timed out after 0.05s")]
+    papers = asyncio.run(fetch_sources([Stalled(timeout=0.05), JsonlSource(str(good))], ["cortex"], CUTOFF))
+    assert [p.title for p in papers] == ["Cortex maps"]
+
+
+def test_cli_reports_failed_sources_without_a_traceback(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        pe.run_digest(["--topics", "x", "--no-cache", "--source", f"jsonl:{tmp_path / 'missing.jsonl'}"])
+    assert str(e.value).startswith("No papers: every source failed (jsonl:")
+
+
+def paper(id, title, doi=None, pdf=None, days=0):
+    return Paper(id=id, title=title, summary="", published=dt.datetime(2024, 5, 1) + dt.timedelta(days=days),
+                 doi=doi, pdf=pdf)
+
+
+def test_merge_by_doi_keeps_the_first_source_and_fills_gaps():
+    arxiv = [paper("2405.00001", "Cortex maps", pdf="https://arxiv.org/pdf/2405.00001")]
+    journal = [paper("10.1000/x", "Mapping cortex: the journal version", doi="10.1000/x")]
+    arxiv[0].doi = "10.1000/x"
+    [merged] = merge_papers([arxiv, journal])
+    assert merged.id == "2405.00001" and merged.pdf
+
+    arxiv[0].doi = None
+    journal[0].title = "Cortex  Maps"
+    [merged] = merge_papers([arxiv, journal])   # same normalized title
+    assert merged.id == "2405.00001" and merged.doi == "10.1000/x"
+    assert arxiv[0].doi is None                 # filled on a copy, not the shared record
+
+
+def test_merge_keeps_distinct_papers_newest_first():
+    merged = merge_papers([[paper("a", "Cortex maps")], [paper("b", "Spike trains", days=2)]])
+    assert [p.id for p in merged] == ["b", "a"]
+
+
+def test_merge_counts_dropped_records():
+    metrics = RunMetrics()
+    merge_papers([[paper("a", "Cortex maps", doi="10.1/a")], [paper("b", "Other title", doi="10.1/A")]], metrics)
+    assert metrics.counters["papers_merged"] == 1
+
+
+ID_LESS = [
+    {"title": "Sparse attention for long documents", "published": "2024-05-03",
+     "abstract": "We make attention sparse so transformers read long documents."},
+    {"title": "Decoding speech from cortical recordings", "published": "2024-05-02",
+     "abstract": "A recurrent decoder turns cortical recordings into speech."},
+    {"title": "Graph networks for reaction chemistry", "published": "2024-05-01",
+     "abstract": "Message passing predicts the products of chemical reactions."},
+]
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    return str(path)
+
+
+def test_records_without_ids_get_distinct_stable_ids(tmp_path):
+    path = write_jsonl(tmp_path / "r.jsonl", ID_LESS)
+    ids = [p.id for p in JsonlSource(path).read([], CUTOFF)]
+    assert len(set(ids)) == 3 and all(i.startswith("jsonl:") for i in ids)
+    assert ids == [p.id for p in JsonlSource(path).read([], CUTOFF)]
+
+
+def test_records_without_ids_survive_dedup(tmp_path):
+    papers = JsonlSource(write_jsonl(tmp_path / "r.jsonl", ID_LESS)).read([], CUTOFF)
+    assert len(dedupe(papers)) == 3
+
+
+def test_batch_runs_records_without_ids(tmp_path):
+    source = write_jsonl(tmp_path / "r.jsonl", ID_LESS)
+    config = tmp_path / "a.yaml"
+    config.write_text("topics: [sparse attention, speech, chemistry]\nn: 3\ndays: 100000\n", encoding="utf-8")
+    pe.run_batch([str(config), "--source", f"jsonl:{source}", "--no-cache"])
+    digest = (tmp_path / "a.md").read_text(encoding="utf-8")
+    assert all(r["title"] in digest for r in ID_LESS)
@@ -0,0 +1,33 @@
+import datetime as dt
+
+import paper_engine as pe
+from paper_model import Paper
+from paper_state import StateStore, topic_key
+
+
+def digest(server, tmp_path):
+    pe.run_digest(["--topics", "neural language models, cortex", "--days", "30", "--harvest",
+                   "--query-plan", "split", "--delay", "0", "--no-cache", "--api-url", server.url,
+                   "--state", str(tmp_path / "state.sqlite3"), "--outfile", str(tmp_path / "digest.md")])
+
+
+def test_incremental_run_needs_one_request_per_topic(stand_in, tmp_path):
+    digest(stand_in, tmp_path)
+    assert stand_in.requests >= 2 * 3   # 100 entries in pages of 50, per topic
+    stand_in.requests = 0
+    digest(stand_in, tmp_path)
+    # Page 0 of each topic already reaches back past the high-water mark
+    assert stand_in.requests == 2
+
+
+def test_high_water_only_moves_forward(tmp_path):
+    old, new = dt.datetime(2024, 5, 1), dt.datetime(2024, 5, 3)
+    papers = [Paper(id="a", title="A", summary="", published=new), Paper(id="b", title="B", summary="", published=old)]
+    with StateStore(str(tmp_path / "state.sqlite3")) as state:
+        key = topic_key(["Cortex", "spike  trains"])
+        state.record(key, ["cortex"], papers, papers[:1])
+        state.record(key, ["cortex"], papers[1:], [])
+        assert state.high_water(key) == new
+        assert state.emitted_ids(key) == {"a"}
+        assert state.high_water(topic_key(["neuroscience"])) is None
+    assert key == topic_key(["spike trains", "cortex"])
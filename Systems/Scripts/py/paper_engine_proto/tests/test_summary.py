@@ -0,0 +1,40 @@
+import random
+
+from paper_summary import (SUMMARY_WORDS, centroid_scores, centroid_scores_np, content_terms,
+                           split_sentences, summarize_abstracts)
+
+WORDS = "cortex neuron signal model network memory spike layer synapse learning brain map".split()
+
+
+def abstract(rng, sentences=5):
+    return " ".join(" ".join(rng.choices(WORDS, k=rng.randint(6, 14))).capitalize() + "."
+                    for _ in range(sentences))
+
+
+def test_summary_does_not_depend_on_the_rest_of_the_batch():
+    rng = random.Random(3)
+    target = abstract(rng)
+    others = [abstract(rng) for _ in range(40)]
+    alone = summarize_abstracts([target])[0]
+    assert summarize_abstracts([target, *others[:5]])[0] == alone
+    assert summarize_abstracts([*others, target])[-1] == alone
+
+
+def test_numpy_scores_match_pure_python():
+    rng = random.Random(5)
+    docs = [[content_terms(s) for s in split_sentences(abstract(rng, rng.randint(1, 6)))] for _ in range(30)]
+    for fast, slow in zip(centroid_scores_np(docs), centroid_scores(docs)):
+        assert [round(x, 9) for x in fast] == [round(x, 9) for x in slow]
+
+
+def test_long_single_sentence_is_cut_at_the_cap():
+    long_sentence = " ".join(["cortical"] * (SUMMARY_WORDS + 20)) + "."
+    summary = summarize_abstracts([long_sentence])[0]
+    assert len(summary.split()) == SUMMARY_WORDS
+    assert summary.endswith("…")
+
+
+def test_shorter_sentence_is_preferred_over_one_past_the_cap():
+    long_sentence = " ".join(["cortical maps"] * SUMMARY_WORDS) + "."
+    short = "Cortical maps shift with learning in adult mice."
+    assert summarize_abstracts([f"{long_sentence} {short}"])[0] == short